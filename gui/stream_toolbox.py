@@ -5,6 +5,7 @@ import os
 import math
 import re
 import threading
+from collections import namedtuple
 
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
@@ -24,12 +25,25 @@ sys.path.append("../lib/mdio_lib/interface/regmap")
 
 from mdio_lib import Driver
 from mdio_lib import Interface
+from mdio_lib import IoWorker
 
+# seconds between two counter refreshes
+POLL_INTERVAL = 1.0
+
+# the chip select of the fpga on the mcp2210 dongle
+CHIP_SELECT = 3
+
+# all 48-bit counters, read in one pass by QsetWindow.poll
+CounterSnapshot = namedtuple("CounterSnapshot", [
+    "tx1_count", "tx2_count",
+    "rx1_count", "rx2_count",
+    "rx1_crc_err", "rx2_crc_err",
+])
 
 #------------------------------------------------------------
 class QsetWindow(QWidget, Ui_stream_gui):
 
-    def __init__(self, phydev = None, smi = None):
+    def __init__(self, phydev = None, smi = None, poll_interval = POLL_INTERVAL):
         super(QsetWindow, self).__init__()
 
         self.phydev = phydev
@@ -39,6 +53,9 @@ class QsetWindow(QWidget, Ui_stream_gui):
 
         self._center()
         self.connect_flag = 0
+        # the toolbox holds one Driver.acquire() of smi at most, only
+        # touched on the I/O worker
+        self.smi_acquired = False
         self.enable_flag1 = 0
         self.enable_flag2 = 0
         self.enable_flag_all = 0
@@ -46,20 +63,80 @@ class QsetWindow(QWidget, Ui_stream_gui):
         self.suspend_flag2 = 0
         self.suspend_flag_all = 0
 
-        # Multi-thread
-        self.work = WorkThread()
+        # Multi-thread: all hardware access goes through the I/O worker of
+        # the dongle, the GUI thread never waits for USB. The last release
+        # of the dongle stops its worker, the next one is started by
+        # smi.worker().
+        self.io_bridge = IoBridge()
+        self.io_bridge.done.connect(self.on_io_done)
+
+        self.polling = False
+        self.poll_future = None
+        self.poll_timer = QTimer(self)
+        self.poll_timer.timeout.connect(self.poll)
+        self.set_poll_interval(poll_interval)
         self.execute()
 
     def __del__(self):
         pass
 
     def closeEvent(self, event):
-    	event.accept()
-     	os._exit(0)
+        event.accept()
+        os._exit(0)
 
     def execute(self):
-        self.work.start()
-        self.work.trigger.connect(self.refresh_view)
+        self.poll_timer.start()
+
+    def set_poll_interval(self, interval):
+        self.poll_timer.setInterval(int(interval * 1000))
+
+    def submit(self, fn, *args, priority = IoWorker.PRIO_USER,
+               ok = None, then = None, fail = None):
+        """
+        Queue fn(*args) to the I/O worker, return the future.
+        On the GUI thread, when it is done:
+          ok:   logged on success
+          then: then(result) on success
+          fail: fail() on error, log the error if it is None
+        """
+        future = self.smi.worker().submit(fn, *args, priority = priority)
+        callbacks = (ok, then, fail)
+        future.add_done_callback(
+            lambda f: self.io_bridge.done.emit(callbacks, f))
+        return future
+
+    def on_io_done(self, callbacks, future):
+        ok, then, fail = callbacks
+        if future.exception() is not None:
+            if fail is not None:
+                fail()
+            else:
+                self.show_activitylog(1, "Please plug in MDIO dongle!")
+            return
+
+        if ok is not None:
+            self.show_activitylog(0, ok)
+        if then is not None:
+            then(future.result())
+
+    def poll(self):
+        """
+        Queue a counter refresh behind the user commands, one at a time.
+        """
+        if not self.polling:
+            self.init_view()
+            return
+
+        if self.poll_future is not None and not self.poll_future.done():
+            return
+        self.poll_future = self.submit(
+            self.read_counters, priority = IoWorker.PRIO_POLL,
+            then = self.refresh_view, fail = self.init_view)
+
+    def read_counters(self):
+        # run on the I/O worker
+        counts = self.phydev.get_composites(*CounterSnapshot._fields)
+        return CounterSnapshot(**counts)
 
     def _center(self):
         frame_geometry = self.frameGeometry()
@@ -128,40 +205,59 @@ class QsetWindow(QWidget, Ui_stream_gui):
         open usb connect
         """
         print(self.connect_flag)
-        # todo how to connect USB
-        try:
-            if(self.connect_flag == 0):
-                self.smi.open()
-                self.smi.dev_sel(3)
-                self.phydev.config_phyid(0)
-                self.btnConnect.setText('Close')
-                self.mdio_is_connect = 1;
-                print("Connect")
-                self.show_activitylog(0, "MDIO dongle is connected.")
-            else:
-                self.smi.close()
-                self.btnConnect.setText('Connect')
-                self.mdio_is_connect = 0;
-                print("Close")
-                self.show_activitylog(0, "MDIO dongle is closed.")
-
-            self.connect_flag = ~self.connect_flag
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
-
+        # one connect or close at a time
+        self.btnConnect.setEnabled(False)
+        if(self.connect_flag == 0):
+            self.submit(self.dongle_open, ok = "MDIO dongle is connected.",
+                        then = self.on_dongle_opened,
+                        fail = self.on_dongle_failed)
+        else:
+            self.polling = False
+            self.submit(self.dongle_close, ok = "MDIO dongle is closed.",
+                        then = self.on_dongle_closed,
+                        fail = self.on_dongle_failed)
+
+    def dongle_open(self):
+        # run on the I/O worker
+        if not self.smi_acquired:
+            Driver.acquire(self.smi)
+            self.smi_acquired = True
+        self.phydev.invalidate_page()
+        self.phydev.shadow_invalidate()
+        self.phydev.config_phyid(0)
+
+    def dongle_close(self):
+        # run on the I/O worker
+        if self.smi_acquired:
+            self.smi_acquired = False
+            Driver.release(self.smi)
+
+    def on_dongle_failed(self):
+        self.btnConnect.setEnabled(True)
+        self.show_activitylog(1, "Please plug in MDIO dongle!")
+
+    def on_dongle_opened(self, _):
+        self.btnConnect.setEnabled(True)
+        self.polling = True
+        self.btnConnect.setText('Close')
+        self.mdio_is_connect = 1;
+        print("Connect")
+        self.connect_flag = ~self.connect_flag
+
+    def on_dongle_closed(self, _):
+        self.btnConnect.setEnabled(True)
+        self.btnConnect.setText('Connect')
+        self.mdio_is_connect = 0;
+        print("Close")
+        self.connect_flag = ~self.connect_flag
 
     @pyqtSlot(bool)
     def on_btnSetConfig_clicked(self):
         """
         apply: get all config
         """
-        try:
-            self.get_gui_val()
-            self.set_regfile_val()
-            self.show_activitylog(0, "Config Success!")
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
-
+        self.get_gui_val()
+        self.submit(self.set_regfile_val, ok = "Config Success!")
 
     def get_gui_val(self):
         self.get_payload     = self.payload_combo.currentIndex()
@@ -185,88 +281,55 @@ class QsetWindow(QWidget, Ui_stream_gui):
         print(self.get_length_val)
         print(self.get_pkt_num)
 
-        self.phydev.set_payload_mode(3 - int(self.get_payload))
-        self.phydev.set_length_mode(1 - int(self.get_length))
-        self.phydev.set_tx1_mode(1 - int(self.get_send_mode))
-        self.phydev.set_tx2_mode(1 - int(self.get_send_mode))
+        # merged into a few masked writes when the block exits
+        with self.phydev.batch():
+            self.phydev.set_payload_mode(3 - int(self.get_payload))
+            self.phydev.set_length_mode(1 - int(self.get_length))
+            self.phydev.set_tx1_mode(1 - int(self.get_send_mode))
+            self.phydev.set_tx2_mode(1 - int(self.get_send_mode))
 
-        self.phydev.set_length_init(int(self.get_length_val))
-        self.phydev.set_payload_init_val(int(self.get_payload_val, 16))
-
-        # IPG clac
-        if(self.get_type == 0):
-            step1 = 100.0 / int(self.get_IPG1)
-            step2 = 100.0 / int(self.get_IPG2)
-        else:
-            step1 = 10.0 / int(self.get_IPG1)
-            step2 = 10.0 / int(self.get_IPG2)
+            self.phydev.set_length_init(int(self.get_length_val))
+            self.phydev.set_payload_init_val(int(self.get_payload_val, 16))
 
-        ipg_num1 = int(step1 * 12)
-        ipg_num2 = int(step2 * 12)
+            # IPG clac
+            if(self.get_type == 0):
+                step1 = 100.0 / int(self.get_IPG1)
+                step2 = 100.0 / int(self.get_IPG2)
+            else:
+                step1 = 10.0 / int(self.get_IPG1)
+                step2 = 10.0 / int(self.get_IPG2)
 
-        print(ipg_num1)
-        print(ipg_num2)
+            ipg_num1 = int(step1 * 12)
+            ipg_num2 = int(step2 * 12)
 
-        self.phydev.set_phy1_ipg(ipg_num1)
-        self.phydev.set_phy2_ipg(ipg_num2)
+            print(ipg_num1)
+            print(ipg_num2)
 
-        # tx pkt calc
-        tx_pkt_lo = (int(self.get_pkt_num)) & 0xffff
-        tx_pkt_mi = (int(self.get_pkt_num)>>16) & 0xffff
-        tx_pkt_hi = (int(self.get_pkt_num)>>32) & 0xffff
+            self.phydev.set_phy1_ipg(ipg_num1)
+            self.phydev.set_phy2_ipg(ipg_num2)
 
-        self.phydev.set_pkt_count_hi(tx_pkt_hi)
-        self.phydev.set_pkt_count_mi(tx_pkt_mi)
-        self.phydev.set_pkt_count_lo(tx_pkt_lo)
+            # tx pkt calc
+            self.phydev.set_pkt_count(int(self.get_pkt_num))
 
     #----------------------------------------------------
-    def get_tx_count_val(self):
-        tx1_count_hi = self.phydev.get_tx1_count_hi()
-        tx1_count_mi = self.phydev.get_tx1_count_mi()
-        tx1_count_lo = self.phydev.get_tx1_count_lo()
-        self.tx1_count = tx1_count_hi*(2**32) + tx1_count_mi*(2**16) + tx1_count_lo
-
-        tx2_count_hi = self.phydev.get_tx2_count_hi()
-        tx2_count_mi = self.phydev.get_tx2_count_mi()
-        tx2_count_lo = self.phydev.get_tx2_count_lo()
-        self.tx2_count = tx2_count_hi*(2**32) + tx2_count_mi*(2**16) + tx2_count_lo
+    def refresh_view(self, snapshot):
+        """
+        snapshot: CounterSnapshot, polled by the I/O worker
+        """
+        self.tx1_count = snapshot.tx1_count
+        self.tx2_count = snapshot.tx2_count
+        self.rx1_count = snapshot.rx1_count
+        self.rx2_count = snapshot.rx2_count
+        self.rx1_crc = snapshot.rx1_crc_err
+        self.rx2_crc = snapshot.rx2_crc_err
 
         self.tx_pkt_cnt.setText(str(self.tx1_count))
         self.tx_pkt_cnt_2.setText(str(self.tx2_count))
-
-    def get_rx_count_val(self):
-        rx1_count_hi = self.phydev.get_rx1_count_hi()
-        rx1_count_mi = self.phydev.get_rx1_count_mi()
-        rx1_count_lo = self.phydev.get_rx1_count_lo()
-        self.rx1_count = rx1_count_hi*(2**32) + rx1_count_mi*(2**16) + rx1_count_lo
-
-        rx2_count_hi = self.phydev.get_rx2_count_hi()
-        rx2_count_mi = self.phydev.get_rx2_count_mi()
-        rx2_count_lo = self.phydev.get_rx2_count_lo()
-        self.rx2_count = rx2_count_hi*(2**32) + rx2_count_mi*(2**16) + rx2_count_lo
-
-        rx1_crc_hi = self.phydev.get_rx1_crc_err_hi()
-        rx1_crc_mi = self.phydev.get_rx1_crc_err_mi()
-        rx1_crc_lo = self.phydev.get_rx1_crc_err_lo()
-        self.rx1_crc = rx1_crc_hi*(2**32) + rx1_crc_mi*(2**16) + rx1_crc_lo
-
-        rx2_crc_hi = self.phydev.get_rx2_crc_err_hi()
-        rx2_crc_mi = self.phydev.get_rx2_crc_err_mi()
-        rx2_crc_lo = self.phydev.get_rx2_crc_err_lo()
-        self.rx2_crc = rx2_crc_hi*(2**32) + rx2_crc_mi*(2**16) + rx2_crc_lo
-
         self.rx_pkt_cnt.setText(str(self.rx1_count))
         self.rx_pkt_cnt_2.setText(str(self.rx2_count))
         self.rx_crc_cnt.setText(str(self.rx1_crc))
         self.rx_crc_cnt_2.setText(str(self.rx2_crc))
 
-    def refresh_view(self):
-        try:
-            self.get_tx_count_val()
-            self.get_rx_count_val()
-        except:
-            self.init_view()
-
     def init_view(self):
         self.tx_start_time.setText('0')
         self.tx_end_time.setText('0')
@@ -284,238 +347,193 @@ class QsetWindow(QWidget, Ui_stream_gui):
         """
         apply: start tx1 send
         """
-        try:
-            if(self.enable_flag1 == 0):
-                self.phydev.set_tx1_enable(1)
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_green_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Send.setIcon(icon1)
-                self.Send.setIconSize(QtCore.QSize(36, 36))
-
-                # get current time
-                curTime = QDateTime.currentDateTime()
-                self.tx_start_time.setText(curTime.toString())
-                self.tx_end_time.setText('0')
-
-                self.show_activitylog(0, "Phy1 Stream Send!")
-
-            else:
-                self.phydev.set_tx1_enable(0)
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Send.setIcon(icon1)
-                self.Send.setIconSize(QtCore.QSize(36, 36))
+        if(self.enable_flag1 == 0):
+            self.submit(self.phydev.set_tx1_enable, 1, ok = "Phy1 Stream Send!")
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_green_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Send.setIcon(icon1)
+            self.Send.setIconSize(QtCore.QSize(36, 36))
+
+            # get current time
+            curTime = QDateTime.currentDateTime()
+            self.tx_start_time.setText(curTime.toString())
+            self.tx_end_time.setText('0')
 
-                # get current time
-                curTime = QDateTime.currentDateTime()
-                self.tx_end_time.setText(curTime.toString())
+        else:
+            self.submit(self.phydev.set_tx1_enable, 0, ok = "Phy1 Stream Stop!")
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Send.setIcon(icon1)
+            self.Send.setIconSize(QtCore.QSize(36, 36))
 
-                self.show_activitylog(0, "Phy1 Stream Stop!")
+            # get current time
+            curTime = QDateTime.currentDateTime()
+            self.tx_end_time.setText(curTime.toString())
 
-            self.enable_flag1 = ~self.enable_flag1
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
+        self.enable_flag1 = ~self.enable_flag1
 
     @pyqtSlot(bool)
     def on_Send_2_clicked(self):
         """
         apply: start tx2 send
         """
-        try:
-            if(self.enable_flag2 == 0):
-                self.phydev.set_tx2_enable(1)
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_green_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Send_2.setIcon(icon1)
-                self.Send_2.setIconSize(QtCore.QSize(36, 36))
-
-                # get current time
-                curTime = QDateTime.currentDateTime()
-                self.tx_start_time_2.setText(curTime.toString())
-                self.tx_end_time_2.setText('0')
-
-                self.show_activitylog(0, "Phy2 Stream Send!")
-            else:
-                self.phydev.set_tx2_enable(0)
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Send_2.setIcon(icon1)
-                self.Send_2.setIconSize(QtCore.QSize(36, 36))
+        if(self.enable_flag2 == 0):
+            self.submit(self.phydev.set_tx2_enable, 1, ok = "Phy2 Stream Send!")
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_green_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Send_2.setIcon(icon1)
+            self.Send_2.setIconSize(QtCore.QSize(36, 36))
+
+            # get current time
+            curTime = QDateTime.currentDateTime()
+            self.tx_start_time_2.setText(curTime.toString())
+            self.tx_end_time_2.setText('0')
 
-                # get current time
-                curTime = QDateTime.currentDateTime()
-                self.tx_end_time_2.setText(curTime.toString())
+        else:
+            self.submit(self.phydev.set_tx2_enable, 0, ok = "Phy2 Stream Stop!")
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Send_2.setIcon(icon1)
+            self.Send_2.setIconSize(QtCore.QSize(36, 36))
 
-                self.show_activitylog(0, "Phy2 Stream Stop!")
+            # get current time
+            curTime = QDateTime.currentDateTime()
+            self.tx_end_time_2.setText(curTime.toString())
 
-            self.enable_flag2 = ~self.enable_flag2
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
+        self.enable_flag2 = ~self.enable_flag2
 
     @pyqtSlot(bool)
     def on_Send_all_clicked(self):
         """
         apply: start tx all send
         """
-        try:
-            if(self.enable_flag_all == 0):
-                self.phydev.get_chip_ver()
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_green_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Send_all.setIcon(icon1)
-                self.Send_all.setIconSize(QtCore.QSize(36, 36))
-
-                if(~self.enable_flag1):
-                    self.on_Send_clicked()
-
-                if(~self.enable_flag2):
-                    self.on_Send_2_clicked()
-            else:
-                self.phydev.get_chip_ver()
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Send_all.setIcon(icon1)
-                self.Send_all.setIconSize(QtCore.QSize(36, 36))
+        if(self.enable_flag_all == 0):
+            self.submit(self.phydev.get_chip_ver)
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_green_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Send_all.setIcon(icon1)
+            self.Send_all.setIconSize(QtCore.QSize(36, 36))
+
+            if(~self.enable_flag1):
+                self.on_Send_clicked()
+
+            if(~self.enable_flag2):
+                self.on_Send_2_clicked()
+        else:
+            self.submit(self.phydev.get_chip_ver)
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_play_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Send_all.setIcon(icon1)
+            self.Send_all.setIconSize(QtCore.QSize(36, 36))
 
-                if(self.enable_flag1):
-                    self.on_Send_clicked()
+            if(self.enable_flag1):
+                self.on_Send_clicked()
 
-                if(self.enable_flag2):
-                    self.on_Send_2_clicked()
+            if(self.enable_flag2):
+                self.on_Send_2_clicked()
 
-            self.enable_flag_all = ~self.enable_flag_all
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
+        self.enable_flag_all = ~self.enable_flag_all
 
     @pyqtSlot(bool)
     def on_Stop_clicked(self):
         """
         apply: start tx1 suspend
         """
-        try:
-            if(self.suspend_flag1 == 0):
-                self.phydev.set_tx1_suspend(1)
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_red_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Stop.setIcon(icon1)
-                self.Stop.setIconSize(QtCore.QSize(36, 36))
-                self.show_activitylog(0, "Phy1 Stream Suspend!")
-            else:
-                self.phydev.set_tx1_suspend(0)
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Stop.setIcon(icon1)
-                self.Stop.setIconSize(QtCore.QSize(36, 36))
-                self.show_activitylog(0, "Phy1 Stream Continue!")
+        if(self.suspend_flag1 == 0):
+            self.submit(self.phydev.set_tx1_suspend, 1, ok = "Phy1 Stream Suspend!")
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_red_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Stop.setIcon(icon1)
+            self.Stop.setIconSize(QtCore.QSize(36, 36))
+        else:
+            self.submit(self.phydev.set_tx1_suspend, 0, ok = "Phy1 Stream Continue!")
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Stop.setIcon(icon1)
+            self.Stop.setIconSize(QtCore.QSize(36, 36))
 
-            self.suspend_flag1 = ~self.suspend_flag1
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
+        self.suspend_flag1 = ~self.suspend_flag1
 
     @pyqtSlot(bool)
     def on_Stop_2_clicked(self):
         """
         apply: start tx2 suspend
         """
-        try:
-            if(self.suspend_flag2 == 0):
-                self.phydev.set_tx2_suspend(1)
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_red_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Stop_2.setIcon(icon1)
-                self.Stop_2.setIconSize(QtCore.QSize(36, 36))
-                self.show_activitylog(0, "Phy2 Stream Suspend!")
-            else:
-                self.phydev.set_tx2_suspend(0)
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Stop_2.setIcon(icon1)
-                self.Stop_2.setIconSize(QtCore.QSize(36, 36))
-                self.show_activitylog(0, "Phy2 Stream Continue!")
+        if(self.suspend_flag2 == 0):
+            self.submit(self.phydev.set_tx2_suspend, 1, ok = "Phy2 Stream Suspend!")
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_red_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Stop_2.setIcon(icon1)
+            self.Stop_2.setIconSize(QtCore.QSize(36, 36))
+        else:
+            self.submit(self.phydev.set_tx2_suspend, 0, ok = "Phy2 Stream Continue!")
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Stop_2.setIcon(icon1)
+            self.Stop_2.setIconSize(QtCore.QSize(36, 36))
 
-            self.suspend_flag2 = ~self.suspend_flag2
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
+        self.suspend_flag2 = ~self.suspend_flag2
 
     @pyqtSlot(bool)
     def on_Stop_all_clicked(self):
         """
         apply: start tx all send
         """
-        try:
-            if(self.suspend_flag_all == 0):
-                self.phydev.get_chip_ver()
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_red_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Stop_all.setIcon(icon1)
-                self.Stop_all.setIconSize(QtCore.QSize(36, 36))
-
-                if(~self.suspend_flag1):
-                    self.on_Stop_clicked()
-
-                if(~self.suspend_flag2):
-                    self.on_Stop_2_clicked()
-            else:
-                self.phydev.get_chip_ver()
-                icon1 = QtGui.QIcon()
-                icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
-                self.Stop_all.setIcon(icon1)
-                self.Stop_all.setIconSize(QtCore.QSize(36, 36))
+        if(self.suspend_flag_all == 0):
+            self.submit(self.phydev.get_chip_ver)
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_red_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Stop_all.setIcon(icon1)
+            self.Stop_all.setIconSize(QtCore.QSize(36, 36))
+
+            if(~self.suspend_flag1):
+                self.on_Stop_clicked()
+
+            if(~self.suspend_flag2):
+                self.on_Stop_2_clicked()
+        else:
+            self.submit(self.phydev.get_chip_ver)
+            icon1 = QtGui.QIcon()
+            icon1.addPixmap(QtGui.QPixmap(":/pic/ic_pause_circle_outline_white_36dp.png"), QtGui.QIcon.Active, QtGui.QIcon.On)
+            self.Stop_all.setIcon(icon1)
+            self.Stop_all.setIconSize(QtCore.QSize(36, 36))
 
-                if(self.suspend_flag1):
-                    self.on_Stop_clicked()
+            if(self.suspend_flag1):
+                self.on_Stop_clicked()
 
-                if(self.suspend_flag2):
-                    self.on_Stop_2_clicked()
+            if(self.suspend_flag2):
+                self.on_Stop_2_clicked()
 
-            self.suspend_flag_all = ~self.suspend_flag_all
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
+        self.suspend_flag_all = ~self.suspend_flag_all
 
     @pyqtSlot()
     def on_Clear_clicked(self):
-        try:
-            # clear time 0
-            self.tx_start_time.setText('0')
-            self.tx_end_time.setText('0')
-            # clear FPGA count
-            self.phydev.set_phy1_count_clr(1)
-            self.phydev.set_phy1_count_clr(0)
-
-            self.show_activitylog(0, "Phy1 Count Clear!")
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
+        # clear time 0
+        self.tx_start_time.setText('0')
+        self.tx_end_time.setText('0')
+        # clear FPGA count
+        self.submit(self.phydev.set_phy1_count_clr, 1)
+        self.submit(self.phydev.set_phy1_count_clr, 0, ok = "Phy1 Count Clear!")
 
     @pyqtSlot()
     def on_Clear_2_clicked(self):
-        try:
-            # clear time 0
-            self.tx_start_time_2.setText('0')
-            self.tx_end_time_2.setText('0')
-            # clear FPGA count
-            self.phydev.set_phy2_count_clr(1)
-            self.phydev.set_phy2_count_clr(0)
-
-            self.show_activitylog(0, "Phy2 Count Clear!")
-        except:
-            self.show_activitylog(1, "Please plug in MDIO dongle!")
+        # clear time 0
+        self.tx_start_time_2.setText('0')
+        self.tx_end_time_2.setText('0')
+        # clear FPGA count
+        self.submit(self.phydev.set_phy2_count_clr, 1)
+        self.submit(self.phydev.set_phy2_count_clr, 0, ok = "Phy2 Count Clear!")
 
     @pyqtSlot()
     def on_Clear_all_clicked(self):
         self.on_Clear_clicked()
         self.on_Clear_2_clicked()
 
-class WorkThread(QThread):
-    trigger = pyqtSignal()
-
-    def __int__(self):
-        super(WorkThread, self).__init__()
-
-    # Refresh Status
-    def run(self):
-        while True:
-            time.sleep(1)
-            self.trigger.emit()
+class IoBridge(QObject):
+    """
+    Carry the completions of the I/O worker back to the GUI thread.
+    """
+    done = pyqtSignal(object, object)
 
 """
 main
@@ -523,14 +541,18 @@ main
 def main():
     print("all interfaces:", Interface.list())
 
-    driver = Driver.find("mcp2210://")
+    # e.g. python stream_toolbox.py fake://0,sim
+    url = sys.argv[1] if len(sys.argv) > 1 else "mcp2210://"
+    bus = Driver.find(url)
+    driver = bus.target(CHIP_SELECT)
     target = Interface.equip(driver, "mdio", "reg_fields")
+    target.shadow_enable(True)
 
     print(driver)
     print(target)
 
     app = QtWidgets.QApplication(sys.argv)
-    ui = QsetWindow(phydev = target, smi = driver)
+    ui = QsetWindow(phydev = target, smi = bus)
     ui.show()
     sys.exit(app.exec_())
 
@@ -1,7 +1,33 @@
 from .driver import Driver
+from .worker import IoWorker
 
-from .fake import *
-from .ftdi import *
-from .mcp2210 import *
+# the backends are imported when their url scheme is first used, a missing
+# libftd2xx or hid only fails the driver which needs it
+Driver.register_lazy("fake", __name__ + ".fake")
+Driver.register_lazy("ftdi", __name__ + ".ftdi")
+Driver.register_lazy("mcp2210", __name__ + ".mcp2210")
+Driver.register_lazy("sim", __name__ + ".sim")
 
-__all__ = ["Driver"]
+from .pool import DriverPool
+
+# {name: module} of the classes of the backends, as they were imported with
+# the package, each module is imported by the first use of its names
+_LAZY_NAMES = {
+    "MdioBase": "mdio",
+    "Fake": "fake",
+    "FtdiCore": "ftdi",
+    "FtdiMdio": "ftdi",
+    "Mcp2210Mdio": "mcp2210",
+    "Mcp2210Target": "mcp2210",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_NAMES.get(name, None)
+    if module is None:
+        raise AttributeError(
+            "module {!r} has no attribute {!r}".format(__name__, name))
+    import importlib
+    return getattr(importlib.import_module(__name__ + "." + module), name)
+
+__all__ = ["Driver", "IoWorker", "DriverPool"]
@@ -1,9 +1,24 @@
+import threading
+import importlib
+from contextlib import contextmanager
 from .mdio import MdioBase
 
 class DriverException(Exception): pass
 
 class Driver:
     _driver_classes = {}
+    # {name: module} of the drivers not imported yet, the module registers
+    # its driver when the url scheme is first used
+    _lazy_modules = {}
+    # the devices opened by acquire(), {device key: [driver, refcount]}
+    _opened = {}
+    # {id(driver): device key} of the acquired drivers, as keyed by
+    # acquire(), the device of a url may not be found again at release()
+    _opened_keys = {}
+    # {url: device key} of the urls given to acquire(), no usb enumeration
+    # to find their device again
+    _opened_urls = {}
+    _opened_lock = threading.RLock()
 
     @classmethod
     def register(cls, name):
@@ -19,38 +34,179 @@ class Driver:
 
             key = str(name).lower()
             if key in cls._driver_classes:
-                raise DriverException("Dubplicated driver {}".foramt(name))
+                raise DriverException("Dubplicated driver {}".format(name))
 
             cls._driver_classes[key] = kls
             return kls
         return inner
 
+    @classmethod
+    def register_lazy(cls, name, module):
+        """
+        The driver name is registered by module, imported only when the
+        driver is first used.
+
+        usage:
+        Driver.register_lazy("name", "package.module")
+        """
+        cls._lazy_modules[str(name).lower()] = module
+
+    @classmethod
+    def get_class(cls, name):
+        """
+        return the driver class of name, None if it is unknown
+        """
+        key = str(name).lower()
+        dkls = cls._driver_classes.get(key, None)
+        if dkls is None and key in cls._lazy_modules:
+            importlib.import_module(cls._lazy_modules[key])
+            dkls = cls._driver_classes.get(key, None)
+        return dkls
+
     @classmethod
     def list(cls):
-        return cls._driver_classes.keys()
+        names = list(cls._driver_classes.keys())
+        return names + [name for name in cls._lazy_modules
+                        if name not in cls._driver_classes]
 
     @classmethod
     def help(cls):
-        for name, dkls in cls._driver_classes.items():
+        for name in cls.list():
             print("--------")
             print("{name}:".format(name = name))
-            print(dkls.HELP)
+            try:
+                print(cls.get_class(name).HELP)
+            except (ImportError, OSError) as e:
+                print("Can not load the driver: {}".format(e))
 
     @classmethod
     def find(cls, url):
         """
         URL: name://arg[0],arg[1],arg[2],...
+        return the driver of url, the one opened by acquire() if it is
+        the same device, else a new one which is not opened.
         """
+        with cls._opened_lock:
+            entry = cls._opened.get(cls._opened_urls.get(url, None), None)
+        if entry is not None:
+            return entry[0]
+
         infos = url.split("://")
-        key = str(infos[0]).lower()
-        dkls = cls._driver_classes.get(key, None)
+        dkls = cls.get_class(infos[0])
         if not dkls:
             return None
 
         try:
             driver = dkls(url)
-            return driver
         except:
-            print(dlks.HELP)
+            print(dkls.HELP)
             return None
 
+        with cls._opened_lock:
+            entry = cls._opened.get(cls._device_key(driver), None)
+        return driver if entry is None else entry[0]
+
+    @staticmethod
+    def _device_key(driver):
+        # a driver of no shared device is only shared with itself
+        key = driver.device_key()
+        return ("driver", id(driver)) if key is None else key
+
+    @classmethod
+    def acquire(cls, target):
+        """
+        target: url or driver
+        Open the device once for the whole process, the next acquire() of
+        the same device only counts a reference, unless its handle is
+        stale and it is opened again.
+        return the opened driver, give it back with release()
+
+        usage:
+        drv = Driver.acquire("mcp2210://")
+        ...
+        Driver.release(drv)
+        """
+        with cls._opened_lock:
+            driver = cls.find(target) if isinstance(target, str) else target
+            if driver is None:
+                raise DriverException("Unknown driver {}".format(target))
+
+            key = cls._opened_keys.get(id(driver), None)
+            if key is None:
+                key = cls._device_key(driver)
+            entry = cls._opened.get(key, None)
+            if entry is None:
+                driver.open()
+                driver.invalidate_cache()
+                cls._opened[key] = [driver, 1]
+                cls._opened_keys[id(driver)] = key
+                cls._opened_url(target, key)
+                return driver
+
+            if entry[0] is not driver:
+                raise DriverException(
+                    "{} is opened by another driver".format(key))
+            if driver.is_stale():
+                try:
+                    driver.close()
+                except Exception:
+                    pass
+                driver.open()
+                driver.invalidate_cache()
+            entry[1] += 1
+            cls._opened_url(target, key)
+            return driver
+
+    @classmethod
+    def _opened_url(cls, target, key):
+        # the url of a driver of no shared device gives a new one each time
+        if isinstance(target, str) and key[0] != "driver":
+            cls._opened_urls[target] = key
+
+    @classmethod
+    def release(cls, driver):
+        """
+        Drop a reference of acquire(), the last one closes the device and
+        stops its IoWorker.
+        """
+        with cls._opened_lock:
+            key = cls._opened_keys.get(id(driver), None)
+            entry = cls._opened.get(key, None)
+            if entry is None or entry[0] is not driver:
+                raise DriverException("{} is not acquired".format(driver))
+
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del cls._opened[key]
+            del cls._opened_keys[id(driver)]
+            for url in [url for url, k in cls._opened_urls.items()
+                        if k == key]:
+                del cls._opened_urls[url]
+        try:
+            driver.close()
+        finally:
+            driver.stop_worker()
+
+    @classmethod
+    @contextmanager
+    def opened(cls, target):
+        """
+        usage:
+        with Driver.opened("ftdi://") as drv:
+            ...
+        """
+        driver = cls.acquire(target)
+        try:
+            yield driver
+        finally:
+            cls.release(driver)
+
+    @classmethod
+    def acquired(cls):
+        """
+        return {device key: refcount}
+        """
+        with cls._opened_lock:
+            return dict((key, entry[1]) for key, entry in cls._opened.items())
+
@@ -5,37 +5,69 @@ from .driver import Driver
 class Fake(MdioBase):
     HELP = "\n".join([
         "This is a fake mdio driver.",
-        "URL: fake://phy_ids",
-        "  phy_ids ::= Nil | phy_id[,phy_id]",
+        "URL: fake://args",
+        "  args ::= Nil | arg[,arg]",
+        "  arg ::= phy_id | sim | log",
         "  phy_id ::= Hex",
+        "  sim: simulate the stream FPGA on every phy id",
+        "  log: print every access",
+        "e.g. fake://0,sim",
     ])
 
+    OPTIONS = ["sim", "log"]
+
     @staticmethod
     def _pack_key(phy, dev, reg):
         return (phy, dev, reg)
 
-    @staticmethod
-    def _log_info(op, phy, dev, reg, val):
+    def _log_info(self, op, phy, dev, reg, val):
+        if not self.__log:
+            return
         print("Fake: {op:5}| 0x{phy:02x}.0x{dev:02x}.0x{reg:04x} = 0x{val:04x}"
             .format(op = op, phy = phy, dev = dev, reg = reg, val = val))
 
     def _parse_args(self, url):
         args = self.fetch_args(url)
         ids = []
-        if not args:
+        opts = []
+        for arg in filter(None, (args or "").split(",")):
+            if arg in self.OPTIONS:
+                opts.append(arg)
+            else:
+                ids.append(int(arg, 16))
+        if not ids:
             ids.append(0x1a)
-        else:
-            [ids.append(int(phyid, 16)) for phyid in args.split(",")]
 
-        print("Fake: Init with phy ids {}".format(ids))
+        self.__log = "log" in opts
         self.__phyids = ids
         self.__regs = dict()
+        self.__sims = None
+        if "sim" in opts:
+            from .stream_sim import StreamSim
+            self.__sims = dict((phy, StreamSim()) for phy in ids)
+
+        if self.__log:
+            print("Fake: Init with phy ids {} {}".format(ids, opts))
+
+    def sim(self, phy = 0x1a):
+        """
+        return the StreamSim of phy, None if not in sim mode
+        """
+        if self.__sims is None:
+            return None
+        return self.__sims[phy]
 
     def open(self):
-        print("Fake: open")
+        if self.__log:
+            print("Fake: open")
 
     def close(self):
-        print("Fake: close")
+        if self.__log:
+            print("Fake: close")
+
+    def dev_sel(self, dev):
+        # one target only, just for the scripts of mcp2210
+        pass
 
     def _read(self, phy, reg):
         dev = 0
@@ -45,6 +77,11 @@ class Fake(MdioBase):
             self._log_info("read", phy, dev, reg, val)
             return val
 
+        if self.__sims is not None:
+            val = self.__sims[phy].read(reg)
+            self._log_info("read", phy, dev, reg, val)
+            return val
+
         key = self._pack_key(phy, dev, reg)
         val = self.__regs.get(key, None)
         if val is None:
@@ -61,6 +98,11 @@ class Fake(MdioBase):
             self._log_info("write", phy, dev, reg, val)
             return val
 
+        if self.__sims is not None:
+            self.__sims[phy].write(reg, val)
+            self._log_info("write", phy, dev, reg, val)
+            return val
+
         key = self._pack_key(phy, dev, reg)
         self.__regs[key] = val
         self._log_info("write", phy, dev, reg, val)
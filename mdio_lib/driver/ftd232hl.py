@@ -1,4 +1,3 @@
-import time
 from .ftd2xx import ftd2xx
 from .ftd2xx.ftd2xx import FTD2XX
 
@@ -42,6 +41,9 @@ class FTD232HLConfig():
     OP_DIVIDE_5_TURN_OFF = 0x8a
     OP_ADAPTIVE_CLK_ENABLE  = 0x96
     OP_ADAPTIVE_CLK_DISABLE = 0x97
+    # not a command, echoed by the mpsse engine as [0xfa, 0xaa]
+    OP_BAD_COMMAND = 0xaa
+    BAD_COMMAND_ECHO = 0xfa
 
     class GPIO():
         def __init__(self, site, bit):
@@ -147,6 +149,9 @@ class FTD232HLConfig():
         return [op]
 
 class FTD232HL(FTD232HLConfig):
+    # tries to echo the bad command after the mpsse mode is set
+    SYNC_RETRIES = 5
+
     def __init__(self):
         self._dev = None
         self.divisor = 0x001d
@@ -155,17 +160,12 @@ class FTD232HL(FTD232HLConfig):
         self.op_divide_5_on = self.OP_DIVIDE_5_TURN_OFF
         self.op_adaptive_clk_en = self.OP_ADAPTIVE_CLK_DISABLE
         self.op_3phase_en = self.OP_3PHASE_DISABLE
+        # the driver defaults if None
+        self.latency = None
+        self.usb_size = None
 
         self._gpio_config = {}
 
-    @staticmethod
-    def _wait():
-        time.sleep(0.005)
-
-    @staticmethod
-    def _long_wait():
-        time.sleep(0.05)
-
     @staticmethod
     def str2arr(s):
         return [c for c in s]
@@ -195,6 +195,9 @@ class FTD232HL(FTD232HLConfig):
 
     @staticmethod
     def __open_device(dev = 0):
+        # by serial number, as listed by list_devices()
+        if isinstance(dev, (bytes, str)):
+            return ftd2xx.openEx(dev)
         dev = ftd2xx.open(dev)
         return dev
 
@@ -214,26 +217,47 @@ class FTD232HL(FTD232HLConfig):
         assert(level in [self.LEVEL_LOW, self.LEVEL_HIGH])
         self._gpio_config[gpio.val()] = level
 
-    def ftdi_write(self, buf):
-        s = self.arr2str(buf)
-        return self._dev.write(s)
+    def ftdi_write(self, buf, nbytes = None):
+        '''
+        buf: uint8[], or bytes/bytearray/memoryview sent as it is
+        nbytes: send only the head of buf
+        '''
+        if not isinstance(buf, (bytes, bytearray, memoryview)):
+            buf = self.arr2str(buf)
+        return self._dev.write(buf, nbytes)
+
+    def ftdi_write_from(self, buf, nbytes = None):
+        '''
+        buf: bytearray kept by the caller and sent again and again, it must
+        not be resized while it is the last buf given here
+        nbytes: send only the head of buf
+        '''
+        return self._dev.write_from(buf, nbytes)
 
     def ftdi_raw_read(self, nbytes):
         rbuf = self._dev.read(nbytes)
         return self.str2arr(rbuf)
 
     def ftdi_read(self, nbytes):
-        timeout = 5
-        while(self._dev.getQueueStatus() < nbytes and timeout >= 0):
-            self._wait()
-            timeout -= 1
-
-        total_read = self._dev.getQueueStatus()
-        if (total_read < nbytes):
-            raise Exception("Couldn't read enough bytes")
-
-        rarr = self.ftdi_raw_read(total_read)
-        return rarr
+        '''
+        Block in FT_Read until nbytes arrive, at most timeout_read ms. The
+        commands before it should end with OP_SEND_IMMEDIATE, or the chip
+        keeps a short packet until its latency timer expires.
+        return memoryview of the read buffer of the device, only valid
+        until the next read
+        A short read resyncs before it raises, the late bytes of it would
+        be taken as the response of the next read.
+        '''
+        rview = self._dev.read_into(nbytes)
+        nread = len(rview)
+        if (nread < nbytes):
+            try:
+                self.ftdi_resync()
+            except Exception:
+                # such as unplugged, the error of the read is raised
+                pass
+            raise Exception("Couldn't read enough bytes", nread, nbytes)
+        return rview
 
     def ftdi_dump_dev_info(self):
         print(self._dev.getModemStatus())
@@ -248,35 +272,105 @@ class FTD232HL(FTD232HLConfig):
     def __config_device(self):
         dev = self._dev
         dev.resetDevice()
+        dev.purge()
         before_read = dev.getQueueStatus()
         if (before_read > 0):
             dev.read(before_read)
 
         dev.setTimeouts(self.timeout_read, self.timeout_write)
+        self.__config_usb()
         dev.setBitMode(0x00, self.BITMODE_RESET)
         dev.setBitMode(0x0b, self.BITMODE_MPSSE)
-        self._wait()
+        self.__sync_mpsse()
 
         buf = list()
         buf.append(self.op_divide_5_on)
         buf.append(self.op_adaptive_clk_en)
         buf.append(self.op_3phase_en)
-        self.ftdi_write(buf)
-        self._wait()
 
         divisor = self.divisor
-        gpio_config = self.__gpio_config()
-
-        buf = list()
-        buf.extend(gpio_config)
+        buf.extend(self.__gpio_config())
         buf.extend([self.OP_CONFIG_DIVSIOR, divisor & 0xff, divisor >> 8])
         self.ftdi_write(buf)
-        self._wait()
 
-        dev.purge()
-        self._long_wait()
+        # the commands run in order, the gpio read back confirms them all
+        self.__confirm_gpio()
         return dev
 
+    def __config_usb(self):
+        if self.latency is not None:
+            self._dev.setLatencyTimer(self.latency)
+        if self.usb_size is not None:
+            self._dev.setUSBParameters(self.usb_size, self.usb_size)
+
+    def ftdi_serial(self):
+        return self._dev.serial
+
+    def ftdi_apply(self, divisor = None, latency = None, usb_size = None):
+        '''
+        Change the mpsse clock divisor, the latency timer(ms) and the usb
+        transfer size(bytes) of the opened device, None keeps the current.
+        '''
+        if latency is not None:
+            self.latency = latency
+        if usb_size is not None:
+            self.usb_size = usb_size
+        self.__config_usb()
+
+        if divisor is not None:
+            self.divisor = divisor
+            self.ftdi_write([self.OP_CONFIG_DIVSIOR, divisor & 0xff, divisor >> 8])
+            self.__confirm_gpio()
+
+    def ftdi_resync(self):
+        '''
+        Drop everything queued, such as the rest of a failed read, and
+        sync the mpsse engine again.
+        '''
+        self._dev.purge()
+        pending = self._dev.getQueueStatus()
+        if pending > 0:
+            self._dev.read(pending)
+        self.__sync_mpsse()
+
+    def __sync_mpsse(self):
+        '''
+        Send a bad command until the mpsse engine echoes it, instead of
+        sleeping after the bit mode is set.
+        '''
+        expect = [self.BAD_COMMAND_ECHO, self.OP_BAD_COMMAND]
+        for i in range(self.SYNC_RETRIES):
+            self.ftdi_write([self.OP_BAD_COMMAND, self.OP_SEND_IMMEDIATE])
+            rarr = self.str2arr(self._dev.read(2))
+            if rarr == expect:
+                return
+            # a late echo of the try before
+            pending = self._dev.getQueueStatus()
+            if pending > 0:
+                self._dev.read(pending)
+        raise Exception("Couldn't sync the mpsse engine")
+
+    def __confirm_gpio(self):
+        '''
+        Read the gpio of each configured site, the output levels should be
+        the ones of the config.
+        '''
+        for site in [self.LOW_BYTES, self.HIGH_BYTES]:
+            bits = dict((bit, level) for (s, bit), level
+                        in self._gpio_config.items() if s == site)
+            if not bits:
+                continue
+            mask = sum(1 << bit for bit in bits)
+            value = sum(level << bit for bit, level in bits.items())
+
+            buf = self.ftdi_prepare_gpio_in(site)
+            buf.append(self.OP_SEND_IMMEDIATE)
+            self.ftdi_write(buf)
+            level = self.ftdi_read(1)[0]
+            if (level & mask) != value:
+                raise Exception("Gpio config not confirmed",
+                                hex(level), hex(value))
+
     def __gpio_config(self):
         gpio_dict = {
             self.LOW_BYTES:{},
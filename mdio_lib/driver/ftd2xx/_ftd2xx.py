@@ -3,6 +3,7 @@
 import sys
 from ctypes import *
 from ctypes.util import find_library
+from ._lazy import LazyLibrary
 
 
 STRING = c_char_p
@@ -32,22 +33,22 @@ else:
     UINT = c_uint
     LPSTR = STRING
 
-_libraries = {}
-
-if sys.platform == 'win32':
+def _load_library():
+    if sys.platform != 'win32':
+        return CDLL('libftd2xx.so')
     try:
-        _libraries['ftd2xx.dll'] = WinDLL('ftd2xx64.dll')
+        return WinDLL('ftd2xx64.dll')
     except OSError: # 32-bit, or 64-bit library with plain name
         try:
-            _libraries['ftd2xx.dll'] = WinDLL('ftd2xx.dll')
+            return WinDLL('ftd2xx.dll')
         except OSError as e:
             if e.winerror == 126:
                 sys.stderr.write('Unable to find D2XX DLL. Please make sure ftd2xx.dll or ftd2xx64.dll is in the path\n')
-                sys.exit(1)
-            else:
-                raise
-else:
-    _libraries['ftd2xx.dll'] = CDLL('libftd2xx.so')
+            raise
+
+# loaded at the first call of a function, see _lazy
+_libraries = {}
+_libraries['ftd2xx.dll'] = LazyLibrary(_load_library, globals())
 
 
 FT_DEVICE_2232C = 4
@@ -1,10 +1,13 @@
 # generated by 'xml2py'
 # flags '-kdefst -d -c -o _ftd2xx_osx.py ftd2xx.xml -l ftd2xx'
 from ctypes import *
+from ._lazy import LazyLibrary
 
 STRING = c_char_p
+# loaded at the first call of a function, see _lazy
 _libraries = {}
-_libraries['/usr/local/lib/libftd2xx.dylib'] = CDLL('/usr/local/lib/libftd2xx.dylib')
+_libraries['/usr/local/lib/libftd2xx.dylib'] = LazyLibrary(
+    lambda: CDLL('/usr/local/lib/libftd2xx.dylib'), globals())
 
 
 FT_IO_ERROR = 4
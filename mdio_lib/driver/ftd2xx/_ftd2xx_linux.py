@@ -1,9 +1,12 @@
 # generated by 'xml2py'
 # flags '-kdefst -d -c -o _ftd2xx_linux.py ftd2xx_linux.xml -l libftd2xx.so'
 from ctypes import *
+from ._lazy import LazyLibrary
 
+# loaded at the first call of a function, see _lazy
 _libraries = {}
-_libraries['libftd2xx.so'] = CDLL('libftd2xx.so')
+_libraries['libftd2xx.so'] = LazyLibrary(
+    lambda: CDLL('libftd2xx.so'), globals())
 STRING = c_char_p
 
 
@@ -0,0 +1,606 @@
+"""
+Pure python stand-in of the libftd2xx function table, selected with the
+environment FTD2XX_BACKEND=sim before ftd2xx is imported.
+
+Every simulated device interprets the MPSSE command stream written to it.
+The bits clocked out by the data shifting commands drive an MDIO slave,
+which decodes clause 22 and clause 45 frames against a register file and
+drives the data bits of read frames back, as the MDIO line is wired to
+both MOSI and MISO. The read bytes are queued when their bits have been
+clocked at the MPSSE clock, and are handed to the host when the latency
+timer expires, when SEND_IMMEDIATE is seen or when a usb packet is full.
+
+usage:
+    FTD2XX_BACKEND=sim python ...
+
+    from mdio_lib.driver.ftd2xx import _ftd2xx_sim
+    _ftd2xx_sim.device(0).regfile = Driver.find("fake://0,sim")
+"""
+import time
+from collections import deque
+from ctypes import *
+
+from ..mdio_slave import RegFile, MdioSlave
+
+STRING = c_char_p
+DWORD = c_ulong
+ULONG = c_ulong
+USHORT = c_ushort
+SHORT = c_short
+UCHAR = c_ubyte
+WORD = c_ushort
+BYTE = c_ubyte
+LPBYTE = POINTER(c_ubyte)
+BOOL = c_int
+PUCHAR = POINTER(c_ubyte)
+PVOID = c_void_p
+HANDLE = c_void_p
+LPDWORD = POINTER(DWORD)
+LPVOID = PVOID
+FT_HANDLE = POINTER(DWORD)
+FT_STATUS = ULONG
+
+FT_OK = 0
+FT_INVALID_HANDLE = 1
+FT_DEVICE_NOT_FOUND = 2
+FT_DEVICE_NOT_OPENED = 3
+FT_IO_ERROR = 4
+FT_INVALID_PARAMETER = 6
+FT_NOT_SUPPORTED = 17
+
+FT_DEVICE_232H = 8
+
+LIST_NUMBER_ONLY = 0x80000000
+LIST_BY_INDEX = 0x40000000
+LIST_ALL = 0x20000000
+
+OPEN_BY_SERIAL_NUMBER = 1
+OPEN_BY_DESCRIPTION = 2
+
+PURGE_RX = 1
+PURGE_TX = 2
+
+BITMODE_RESET = 0x00
+BITMODE_MPSSE = 0x02
+
+
+class ft_program_data(Structure):
+    pass
+ft_program_data._fields_ = [
+    ('Signature1', DWORD),
+    ('Signature2', DWORD),
+    ('Version', DWORD),
+    ('VendorId', WORD),
+    ('ProductId', WORD),
+    ('Manufacturer', STRING),
+    ('ManufacturerId', STRING),
+    ('Description', STRING),
+    ('SerialNumber', STRING),
+    ('MaxPower', WORD),
+    ('PnP', WORD),
+    ('SelfPowered', WORD),
+    ('RemoteWakeup', WORD),
+    ('Rev4', UCHAR),
+    ('IsoIn', UCHAR),
+    ('IsoOut', UCHAR),
+    ('PullDownEnable', UCHAR),
+    ('SerNumEnable', UCHAR),
+    ('USBVersionEnable', UCHAR),
+    ('USBVersion', WORD),
+    ('Rev5', UCHAR),
+    ('IsoInA', UCHAR),
+    ('IsoInB', UCHAR),
+    ('IsoOutA', UCHAR),
+    ('IsoOutB', UCHAR),
+    ('PullDownEnable5', UCHAR),
+    ('SerNumEnable5', UCHAR),
+    ('USBVersionEnable5', UCHAR),
+    ('USBVersion5', WORD),
+    ('AIsHighCurrent', UCHAR),
+    ('BIsHighCurrent', UCHAR),
+    ('IFAIsFifo', UCHAR),
+    ('IFAIsFifoTar', UCHAR),
+    ('IFAIsFastSer', UCHAR),
+    ('AIsVCP', UCHAR),
+    ('IFBIsFifo', UCHAR),
+    ('IFBIsFifoTar', UCHAR),
+    ('IFBIsFastSer', UCHAR),
+    ('BIsVCP', UCHAR),
+    ('UseExtOsc', UCHAR),
+    ('HighDriveIOs', UCHAR),
+    ('EndpointSize', UCHAR),
+    ('PullDownEnableR', UCHAR),
+    ('SerNumEnableR', UCHAR),
+    ('InvertTXD', UCHAR),
+    ('InvertRXD', UCHAR),
+    ('InvertRTS', UCHAR),
+    ('InvertCTS', UCHAR),
+    ('InvertDTR', UCHAR),
+    ('InvertDSR', UCHAR),
+    ('InvertDCD', UCHAR),
+    ('InvertRI', UCHAR),
+    ('Cbus0', UCHAR),
+    ('Cbus1', UCHAR),
+    ('Cbus2', UCHAR),
+    ('Cbus3', UCHAR),
+    ('Cbus4', UCHAR),
+    ('RIsVCP', UCHAR),
+]
+PFT_PROGRAM_DATA = POINTER(ft_program_data)
+FT_PROGRAM_DATA = ft_program_data
+
+
+class SimDevice(object):
+    """
+    One FT232H in MPSSE mode.
+    """
+    # the read data of one usb packet, 2 of 512 bytes are the modem status
+    PACKET_DATA = 510
+    LATENCY = 16
+
+    def __init__(self, serial, regfile = None,
+                 description = b"Single RS232-HS", clock = time.monotonic):
+        self.serial = serial
+        self.description = description
+        self.regfile = regfile if regfile is not None else RegFile()
+        self._clock = clock
+        self.opened = False
+        self.reset()
+
+    @property
+    def regfile(self):
+        return self._mdio.regfile
+
+    @regfile.setter
+    def regfile(self, regfile):
+        self._mdio = MdioSlave(regfile)
+
+    def reset(self):
+        self.bitmode = BITMODE_RESET
+        self.latency = self.LATENCY
+        self.timeout_read = 0
+        self.timeout_write = 0
+        self.divisor = 0
+        self.divide_5 = True
+        self.three_phase = False
+        self.gpio = [0, 0]
+        self.gpio_dir = [0, 0]
+        self.purge(PURGE_RX | PURGE_TX)
+
+    def purge(self, mask):
+        if mask & PURGE_RX:
+            # [[deliver time, ready time, bytearray], ...]
+            self._rx = deque()
+        if mask & PURGE_TX:
+            self._cmd = bytearray()
+        self._busy = self._clock()
+
+    def sck(self):
+        base = 12e6 if self.divide_5 else 60e6
+        return base / ((1 + self.divisor) * 2)
+
+    # rx queue
+    def _queue(self, data, nbits):
+        now = self._clock()
+        bit_time = (1.5 if self.three_phase else 1.0) / self.sck()
+        self._busy = max(self._busy, now) + nbits * bit_time
+        if data:
+            self._rx.append([self._busy + self.latency / 1000.0,
+                             self._busy, bytearray(data)])
+
+        pending = sum(len(item[2]) for item in self._rx if item[0] > item[1])
+        if pending >= self.PACKET_DATA:
+            self._flush()
+
+    def _flush(self):
+        for item in self._rx:
+            item[0] = item[1]
+
+    def available(self):
+        now = self._clock()
+        n = 0
+        for deliver, _, data in self._rx:
+            if deliver > now:
+                break
+            n += len(data)
+        return n
+
+    def read(self, nbytes):
+        deadline = self._clock() + self.timeout_read / 1000.0
+        while self.available() < nbytes:
+            now = self._clock()
+            # the time the queue would hold enough bytes
+            n, until = 0, None
+            for deliver, _, data in self._rx:
+                n += len(data)
+                if n >= nbytes:
+                    until = deliver
+                    break
+            if until is None or until > deadline:
+                until = deadline
+            if until <= now:
+                break
+            time.sleep(until - now)
+
+        out = bytearray()
+        now = self._clock()
+        while self._rx and len(out) < nbytes and self._rx[0][0] <= now:
+            data = self._rx[0][2]
+            take = nbytes - len(out)
+            out += data[:take]
+            if take >= len(data):
+                self._rx.popleft()
+            else:
+                del data[:take]
+        return bytes(out)
+
+    # mpsse
+    def write(self, data):
+        if self.bitmode != BITMODE_MPSSE:
+            return len(data)
+
+        self._cmd += data
+        while self._cmd:
+            size = self._command(self._cmd)
+            if size is None:
+                # wait for the rest of the command
+                break
+            del self._cmd[:size]
+        return len(data)
+
+    def _shift(self, op, nbits, data):
+        """
+        clock nbits out, return the bytes read in
+        """
+        lsb = op & 0x08
+        out = bytearray()
+        for i in range(nbits):
+            byte, bit = divmod(i, 8)
+            if data is None:
+                mosi = 1
+            elif lsb:
+                mosi = (data[byte] >> bit) & 1
+            else:
+                mosi = (data[byte] >> (7 - bit)) & 1
+            miso = self._mdio.clock(mosi)
+
+            if bit == 0:
+                out.append(0)
+            if lsb:
+                out[byte] |= miso << bit
+            else:
+                out[byte] |= miso << (7 - bit)
+
+        if op & 0x02 and not lsb:
+            # bit mode shifts the read bits in from the lsb
+            out[0] >>= (8 - nbits)
+        return out
+
+    def _command(self, buf):
+        """
+        run the command at the head of buf, return its size or None if
+        it is not complete
+        """
+        op = buf[0]
+        if op & 0x80 == 0:
+            return self._data_command(buf)
+
+        fixed = {
+            0x80: 3, 0x82: 3, 0x81: 1, 0x83: 1, 0x84: 1, 0x85: 1,
+            0x86: 3, 0x87: 1, 0x8a: 1, 0x8b: 1, 0x8c: 1, 0x8d: 1,
+            0x8e: 2, 0x8f: 3, 0x96: 1, 0x97: 1,
+        }
+        size = fixed.get(op, 1)
+        if len(buf) < size:
+            return None
+
+        if op in (0x80, 0x82):
+            site = (op - 0x80) >> 1
+            self.gpio[site] = buf[1]
+            self.gpio_dir[site] = buf[2]
+        elif op in (0x81, 0x83):
+            site = (op - 0x81) >> 1
+            # the inputs are pulled up
+            level = (self.gpio[site] & self.gpio_dir[site]) | \
+                    (~self.gpio_dir[site] & 0xff)
+            self._queue([level], 0)
+        elif op == 0x86:
+            self.divisor = buf[1] | (buf[2] << 8)
+        elif op == 0x87:
+            self._flush()
+        elif op in (0x8a, 0x8b):
+            self.divide_5 = op == 0x8b
+        elif op in (0x8c, 0x8d):
+            self.three_phase = op == 0x8c
+        elif op == 0x8e:
+            self._queue(None, buf[1] + 1)
+        elif op == 0x8f:
+            self._queue(None, ((buf[1] | (buf[2] << 8)) + 1) * 8)
+        elif op not in fixed:
+            # bad command
+            self._queue([0xfa, op], 0)
+        return size
+
+    def _data_command(self, buf):
+        op = buf[0]
+        data_out = op & 0x10
+        data_in = op & 0x20
+
+        if op & 0x40:
+            # tms, never seen by mdio
+            if len(buf) < 3:
+                return None
+            nbits = buf[1] + 1
+            self._queue([buf[2]] if data_in else None, nbits)
+            return 3
+
+        if op & 0x02:
+            if len(buf) < 2 + (1 if data_out else 0):
+                return None
+            nbits = buf[1] + 1
+            data = buf[2:3] if data_out else None
+            size = 2 + (1 if data_out else 0)
+        else:
+            if len(buf) < 3:
+                return None
+            nbytes = (buf[1] | (buf[2] << 8)) + 1
+            size = 3 + (nbytes if data_out else 0)
+            if len(buf) < size:
+                return None
+            nbits = nbytes * 8
+            data = buf[3:size] if data_out else None
+
+        res = self._shift(op, nbits, data)
+        self._queue(res if data_in else None, nbits)
+        return size
+
+
+_devices = [SimDevice(b"FTSIM0")]
+_handles = dict()
+
+
+def reset(count = 1):
+    """
+    Replace the devices with count new ones.
+    """
+    global _devices
+    _devices = [SimDevice("FTSIM{}".format(i).encode()) for i in range(count)]
+    _handles.clear()
+
+
+def device(index = 0):
+    return _devices[index]
+
+
+def devices():
+    return list(_devices)
+
+
+def _val(x):
+    return getattr(x, "value", x)
+
+
+def _out(ref, val):
+    # the object of c.byref()
+    obj = getattr(ref, "_obj", ref)
+    obj.value = val
+
+
+def _dev(handle):
+    try:
+        dev = _handles.get(handle.contents.value, None)
+    except ValueError:
+        # NULL handle
+        dev = None
+    return dev
+
+
+def _open(dev, phandle):
+    if dev.opened:
+        return FT_DEVICE_NOT_OPENED
+    dev.opened = True
+    key = id(dev)
+    _handles[key] = dev
+    # keep the target of the pointer alive with the device
+    dev._hval = DWORD(key)
+    getattr(phandle, "_obj", phandle).contents = dev._hval
+    return FT_OK
+
+
+def _with_dev(fn):
+    def inner(handle, *args):
+        dev = _dev(handle)
+        if dev is None:
+            return FT_INVALID_HANDLE
+        res = fn(dev, *args)
+        return FT_OK if res is None else res
+    inner.__name__ = fn.__name__
+    return inner
+
+
+def FT_ListDevices(arg1, arg2, flags):
+    flags = _val(flags)
+    if flags & LIST_NUMBER_ONLY:
+        _out(arg1, len(_devices))
+        return FT_OK
+
+    if flags & LIST_BY_INDEX:
+        return FT_NOT_SUPPORTED
+
+    # arg1 is an array of char * to the buffers
+    ptrs = cast(arg1, POINTER(c_void_p))
+    for i, dev in enumerate(_devices):
+        name = dev.description if flags & OPEN_BY_DESCRIPTION else dev.serial
+        memmove(ptrs[i], name + b"\0", len(name) + 1)
+    if arg2 is not None:
+        _out(arg2, len(_devices))
+    return FT_OK
+
+
+def FT_CreateDeviceInfoList(pnum):
+    _out(pnum, len(_devices))
+    return FT_OK
+
+
+def FT_GetDeviceInfoDetail(index, pflags, ptype, pid, ploc,
+                           serial, desc, phandle):
+    index = _val(index)
+    if index >= len(_devices):
+        return FT_DEVICE_NOT_FOUND
+    dev = _devices[index]
+    _out(pflags, 1 if dev.opened else 0)
+    _out(ptype, FT_DEVICE_232H)
+    _out(pid, 0x04036014)
+    _out(ploc, index + 1)
+    serial.value = dev.serial
+    desc.value = dev.description
+    return FT_OK
+
+
+def FT_Open(index, phandle):
+    index = _val(index)
+    if index >= len(_devices):
+        return FT_DEVICE_NOT_FOUND
+    return _open(_devices[index], phandle)
+
+
+def FT_OpenEx(arg, flags, phandle):
+    flags = _val(flags)
+    if isinstance(arg, str):
+        arg = arg.encode()
+    for dev in _devices:
+        name = dev.description if flags & OPEN_BY_DESCRIPTION else dev.serial
+        if name == arg:
+            return _open(dev, phandle)
+    return FT_DEVICE_NOT_FOUND
+
+
+def FT_GetLibraryVersion(pversion):
+    _out(pversion, 0x00010404)
+    return FT_OK
+
+
+@_with_dev
+def FT_Close(dev):
+    dev.opened = False
+    _handles.pop(id(dev), None)
+
+
+@_with_dev
+def FT_Read(dev, buf, nbytes, pread):
+    data = dev.read(_val(nbytes))
+    memmove(buf, data, len(data))
+    _out(pread, len(data))
+
+
+@_with_dev
+def FT_Write(dev, data, nbytes, pwritten):
+    data = bytes(memoryview(data)[:_val(nbytes)])
+    _out(pwritten, dev.write(data))
+
+
+@_with_dev
+def FT_ResetDevice(dev):
+    dev.reset()
+
+
+@_with_dev
+def FT_Purge(dev, mask):
+    dev.purge(_val(mask))
+
+
+@_with_dev
+def FT_SetTimeouts(dev, read, write):
+    dev.timeout_read = _val(read)
+    dev.timeout_write = _val(write)
+
+
+@_with_dev
+def FT_GetQueueStatus(dev, pamount):
+    _out(pamount, dev.available())
+
+
+@_with_dev
+def FT_GetStatus(dev, prx, ptx, pevent):
+    _out(prx, dev.available())
+    _out(ptx, 0)
+    _out(pevent, 0)
+
+
+@_with_dev
+def FT_GetModemStatus(dev, pstatus):
+    _out(pstatus, 0)
+
+
+@_with_dev
+def FT_GetEventStatus(dev, pevent):
+    _out(pevent, 0)
+
+
+@_with_dev
+def FT_SetLatencyTimer(dev, latency):
+    latency = _val(latency)
+    if latency < 2:
+        return FT_INVALID_PARAMETER
+    dev.latency = latency
+
+
+@_with_dev
+def FT_GetLatencyTimer(dev, platency):
+    _out(platency, dev.latency)
+
+
+@_with_dev
+def FT_SetBitMode(dev, mask, mode):
+    dev.bitmode = _val(mode)
+    dev.purge(PURGE_TX)
+
+
+@_with_dev
+def FT_GetBitMode(dev, pmode):
+    _out(pmode, dev.gpio[0])
+
+
+@_with_dev
+def FT_SetUSBParameters(dev, in_size, out_size):
+    pass
+
+
+@_with_dev
+def FT_GetDeviceInfo(dev, ptype, pid, serial, desc, dummy):
+    _out(ptype, FT_DEVICE_232H)
+    _out(pid, 0x04036014)
+    serial.value = dev.serial
+    desc.value = dev.description
+
+
+@_with_dev
+def FT_GetDriverVersion(dev, pversion):
+    _out(pversion, 0x00010404)
+
+
+@_with_dev
+def FT_EE_Read(dev, pdata):
+    pass
+
+
+@_with_dev
+def FT_EE_UASize(dev, psize):
+    _out(psize, 0)
+
+
+@_with_dev
+def FT_EE_UARead(dev, buf, nbytes, pread):
+    _out(pread, 0)
+
+
+@_with_dev
+def _not_supported(dev, *args):
+    return FT_NOT_SUPPORTED
+
+
+def __getattr__(name):
+    # the rest of the function table
+    if name.startswith("FT_"):
+        return _not_supported
+    raise AttributeError(name)
@@ -0,0 +1,81 @@
+"""
+The symbols of a ctypes library, resolved on demand.
+
+The generated bindings look up some hundred functions of the library at
+import and set their restype, argtypes and __doc__. LazyLibrary hands out
+a LazySymbol for each of them instead, which keeps these attributes. The
+library is loaded at the first call of any symbol, and each function is
+looked up at its own first call, then replaces its LazySymbol in the
+namespace of the binding, so _ft.FT_Read is the ctypes function again.
+"""
+from __future__ import absolute_import
+import threading
+
+_UNSET = object()
+
+
+class LazySymbol(object):
+    def __init__(self, library, name):
+        self._library = library
+        self._func = None
+        self.__name__ = name
+        self.__doc__ = None
+        self.restype = _UNSET
+        self.argtypes = _UNSET
+        self.errcheck = _UNSET
+
+    def resolve(self):
+        """
+        return the ctypes function, loads the library at the first call
+        """
+        if self._func is None:
+            func = getattr(self._library.load(), self.__name__)
+            for attr in ("restype", "argtypes", "errcheck"):
+                val = getattr(self, attr)
+                if val is not _UNSET:
+                    setattr(func, attr, val)
+            self._func = func
+
+            namespace = self._library.namespace
+            if namespace.get(self.__name__, None) is self:
+                namespace[self.__name__] = func
+        return self._func
+
+    def __call__(self, *args):
+        return self.resolve()(*args)
+
+    def __repr__(self):
+        return "<LazySymbol {}>".format(self.__name__)
+
+
+class LazyLibrary(object):
+    """
+    usage:
+    _libraries['libftd2xx.so'] = LazyLibrary(
+        lambda: CDLL('libftd2xx.so'), globals())
+    FT_Open = _libraries['libftd2xx.so'].FT_Open
+    """
+    def __init__(self, loader, namespace):
+        """
+        loader: return the ctypes library
+        namespace: globals() of the binding
+        """
+        self.namespace = namespace
+        self._loader = loader
+        self._lib = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        if self._lib is None:
+            with self._lock:
+                if self._lib is None:
+                    self._lib = self._loader()
+        return self._lib
+
+    def __getattr__(self, name):
+        if name.startswith("__"):
+            raise AttributeError(name)
+        symbol = LazySymbol(self, name)
+        # found in the instance from now on
+        setattr(self, name, symbol)
+        return symbol
@@ -7,9 +7,12 @@ except this uses ctypes instead of an extension approach.
 from __future__ import absolute_import
 from builtins import range
 from builtins import object
+import os
 import sys
 
-if sys.platform == 'win32':
+if os.environ.get('FTD2XX_BACKEND', '') == 'sim':
+    from . import _ftd2xx_sim as _ft
+elif sys.platform == 'win32':
     from . import _ftd2xx as _ft
 elif sys.platform.startswith('linux'):
     from . import _ftd2xx_linux as _ft
@@ -140,6 +143,13 @@ class FTD2XX(object):
         update to False to avoid a slow call to createDeviceInfoList."""
         self.handle = handle
         self.status = 1
+        # reused by read_into and write_from, no allocation per call
+        self._rbuf = c.create_string_buffer(0)
+        self._rview = memoryview(self._rbuf).cast('B')
+        self._count = _ft.DWORD()
+        self._count_ref = c.byref(self._count)
+        self._wsrc = None
+        self._wdata = None
         # createDeviceInfoList is slow, only run if update is True
         if update: createDeviceInfoList()
         self.__dict__.update(self.getDeviceInfo())
@@ -157,12 +167,66 @@ class FTD2XX(object):
         call_ft(_ft.FT_Read, self.handle, b, nchars, c.byref(b_read))
         return b.raw[:b_read.value] if raw else b.value[:b_read.value]
 
-    def write(self, data):
-        """Send the data to the device. Data must be a string representing the
-        bytes to be sent"""
-        w = _ft.DWORD()
-        call_ft(_ft.FT_Write, self.handle, data, len(data), c.byref(w))
-        return w.value
+    def read_into(self, nchars, buffer=None):
+        """Read up to nchars bytes into a writable buffer such as a
+        bytearray, without a copy. With no buffer the bytes go to one kept
+        by the instance, grown to nchars as needed. Return a memoryview of
+        the bytes read, the one of the kept buffer is only valid until the
+        next read_into"""
+        if buffer is None:
+            if nchars > len(self._rbuf):
+                self._rbuf = c.create_string_buffer(nchars)
+                self._rview = memoryview(self._rbuf).cast('B')
+            call_ft(_ft.FT_Read, self.handle, self._rbuf, nchars,
+                    self._count_ref)
+            return self._rview[:self._count.value]
+        view = memoryview(buffer).cast('B')
+        if nchars > len(view):
+            raise ValueError("nchars is larger than the buffer", nchars,
+                             len(view))
+        # the export of buffer ends with the call, it can be resized after
+        b = (c.c_char * len(view)).from_buffer(view)
+        try:
+            call_ft(_ft.FT_Read, self.handle, b, nchars, self._count_ref)
+        finally:
+            del b
+        return view[:self._count.value]
+
+    def write(self, data, nchars=None):
+        """Send the first nchars bytes of data, all of it by default. Data is
+        bytes, or any buffer such as a bytearray or memoryview, sent without
+        a copy if it is writable. The buffer is only held during the call,
+        see write_from to send the same buffer again and again"""
+        if isinstance(data, bytes):
+            return self._write(data, len(data) if nchars is None else nchars)
+        view = memoryview(data).cast('B')
+        if nchars is None:
+            nchars = len(view)
+        if view.readonly:
+            return self._write(view[:nchars].tobytes(), nchars)
+        b = (c.c_char * len(view)).from_buffer(view)
+        try:
+            return self._write(b, nchars)
+        finally:
+            del b
+            view.release()
+
+    def write_from(self, buf, nchars=None):
+        """Send the first nchars bytes of buf, a writable buffer owned by
+        the caller and sent again and again, with no allocation per call.
+        The ctypes view of buf is kept until write_from is given another
+        buffer, so buf can't be resized in between"""
+        if buf is not self._wsrc:
+            self._wdata = None
+            self._wdata = (c.c_char * len(buf)).from_buffer(buf)
+            self._wsrc = buf
+        if nchars is None:
+            nchars = len(buf)
+        return self._write(self._wdata, nchars)
+
+    def _write(self, data, nchars):
+        call_ft(_ft.FT_Write, self.handle, data, nchars, self._count_ref)
+        return self._count.value
 
     def ioctl(self):
         """Not implemented"""
@@ -31,9 +31,27 @@ class TestFTD2XX(unittest.TestCase):
         self.device.setTimeouts(1000, 0)
         self.assertTrue(isinstance(self.device.read(1), bytes))
 
+    def testread_into(self):
+        self.device.setTimeouts(1000, 0)
+        buf = bytearray(4)
+        self.assertTrue(isinstance(self.device.read_into(1, buf), memoryview))
+        self.assertTrue(isinstance(self.device.read_into(1), memoryview))
+        buf += b'\x00'
+
     def testwrite(self):
         self.assertTrue(isinstance(self.device.write(b'%c' % 0x0), int))
 
+    def testwrite_memoryview(self):
+        buf = bytearray([0x0, 0x0])
+        self.assertTrue(self.device.write(memoryview(buf)[:1]) == 1)
+        self.assertTrue(self.device.write(buf, 1) == 1)
+        buf += b'\x00'
+
+    def testwrite_from(self):
+        buf = bytearray([0x0, 0x0])
+        self.assertTrue(self.device.write_from(buf, 1) == 1)
+        self.assertTrue(self.device.write_from(buf) == 2)
+
     def testioctl(self):
         pass
 
@@ -1,9 +1,40 @@
 from .ftd232hl import FTD232HL
+from . import mdio_codec
+from .mdio_codec import FrameCodec
 from .mdio import MdioBase
 from .driver import Driver
 
 
 class FtdiCore(FTD232HL):
+    # bytes clocked for one mdio22 frame, a read frame returns the same size
+    MDIO22_FRAME_SIZE = 10
+
+    # the mpsse commands of the mdio frames, bytes msb first
+    OP_MDIO_OUT = FTD232HL.ftdi_gen_opcode(
+        order = FTD232HL.ORDER_MSB,
+        mode = FTD232HL.MODE_BYTES,
+        data_out = FTD232HL.ENABLE,
+        edge_out = FTD232HL.EDGE_RISING,
+    )
+    OP_MDIO_IO = FTD232HL.ftdi_gen_opcode(
+        order = FTD232HL.ORDER_MSB,
+        mode = FTD232HL.MODE_BYTES,
+        data_out = FTD232HL.ENABLE,
+        edge_out = FTD232HL.EDGE_RISING,
+        data_in = FTD232HL.ENABLE,
+        edge_in = FTD232HL.EDGE_FALLING,
+    )
+
+    # [opcode, length - 1] + frame + idle tail
+    MDIO22 = FrameCodec(
+        read_head = bytes([OP_MDIO_IO, MDIO22_FRAME_SIZE - 1, 0]),
+        write_head = bytes([OP_MDIO_OUT, MDIO22_FRAME_SIZE - 1, 0]),
+        tail = b"\x7f\x87")
+    MDIO45_OUT = bytes([OP_MDIO_OUT, mdio_codec.FRAME_SIZE - 1, 0])
+    MDIO45_IO = bytes([OP_MDIO_IO, mdio_codec.FRAME_SIZE - 1, 0])
+    # after the read frames, hand the read bytes to the host at once
+    FLUSH = bytes([FTD232HL.OP_SEND_IMMEDIATE])
+
     def __init__(self):
         FTD232HL.__init__(self)
 
@@ -18,148 +49,96 @@ class FtdiCore(FTD232HL):
         self.ftdi_gpio_init(self.GPIO_CLK, self.LEVEL_HIGH)
         self.ftdi_gpio_init(self.GPIO_MOSI, self.LEVEL_HIGH)
 
-    def __gen_mdio22(self, mode, phy, reg, data = None):
-        if mode == "read":
-            code = 0x60
-            data = [0xff, 0xff]
-        else:
-            code = 0x50
-            data = [data >> 8, data]
-
-        preamble = [0xff, 0xff, 0xff, 0xff]
-        addr = [
-            (0x0f & (phy >> 1)) | code,
-            (phy << 7) | (reg << 2) | 0x02]
-        end = [0x7f, 0x87]
-        return preamble + addr + data + end
-
-    def __gen_mdio45(self, mode, phy, devtype, reg, data = None):
-        addr_code = 0x00
-
-        if mode == "read":
-            code = 0x30
-            data = [0xff, 0xff]
-        else:
-            code = 0x10
-            data = [data >> 8, data]
-
-        reg = [reg >> 8, reg]
-
-        preamble = [0xff, 0xff, 0xff, 0xff]
-        dev_cmd = [
-            (0x0f & (phy >> 1)) | addr_code,
-            (phy << 7) | (devtype << 2) | 0x02]
-
-        op_cmd = [
-            (0x0f & (phy >> 1)) | code,
-            (phy << 7) | (devtype << 2) | 0x02]
-
-        return (preamble + dev_cmd + reg,
-                preamble + op_cmd + data)
+        # the frames of mdio22 ops are packed here, and sent from its head
+        self._wbuf = bytearray(self.MDIO22.size * 8)
+
+    def __write_mdio22(self, ops, flush):
+        size = len(ops) * self.MDIO22.size
+        if len(self._wbuf) < size + 1:
+            self._wbuf = bytearray(size + 1)
+        wbuf = self.MDIO22.pack(ops, self._wbuf)
+        if flush:
+            wbuf[size] = self.OP_SEND_IMMEDIATE
+            size += 1
+        return self.ftdi_write_from(wbuf, size)
+
+    def __gen_mdio45(self, code, phy, devtype, reg, data = None):
+        addr = self.MDIO45_OUT + mdio_codec.frame(
+            mdio_codec.C45_ADDR, phy, devtype, reg)
+        head = self.MDIO45_IO if data is None else self.MDIO45_OUT
+        return addr + head + mdio_codec.frame(code, phy, devtype, data)
 
     def write_mdio45(self, phy, dev, reg, data):
-        opcode = self.ftdi_gen_opcode(
-            order = self.ORDER_MSB,
-            mode = self.MODE_BYTES,
-            data_out = self.ENABLE,
-            edge_out = self.EDGE_RISING,
-        )
-        addr_cmd, value_cmd = self.__gen_mdio45("write", phy, dev, reg, data)
-
-        addr_buf = self.ftdi_prepare_write_buf(opcode, addr_cmd)
-        value_buf = self.ftdi_prepare_write_buf(opcode, value_cmd)
-
-        return self.ftdi_write(addr_buf + value_buf)
+        wbuf = self.__gen_mdio45(mdio_codec.C45_WRITE, phy, dev, reg, data)
+        return self.ftdi_write(wbuf)
 
     def read_mdio45(self, phy, dev, reg):
-        addr_opcode = self.ftdi_gen_opcode(
-            order = self.ORDER_MSB,
-            mode = self.MODE_BYTES,
-            data_out = self.ENABLE,
-            edge_out = self.EDGE_RISING,
-        )
-
-        value_opcode = self.ftdi_gen_opcode(
-            order = self.ORDER_MSB,
-            mode = self.MODE_BYTES,
-            data_out = self.ENABLE,
-            edge_out = self.EDGE_RISING,
-            data_in = self.ENABLE,
-            edge_in = self.EDGE_FALLING,
-        )
-        addr_cmd, value_cmd = self.__gen_mdio45("read", phy, dev, reg)
-
-        addr_buf = self.ftdi_prepare_write_buf(addr_opcode, addr_cmd)
-        value_buf = self.ftdi_prepare_write_buf(value_opcode, value_cmd)
-
-        self.ftdi_write(addr_buf + value_buf)
-
-        nsend = len(value_cmd)
-        timeout = 5
-        while (self._dev.getQueueStatus() < nsend and timeout >= 0):
-            self._wait()
-            timeout -= 1
-
-        total_read = self._dev.getQueueStatus()
-        if (total_read < nsend):
-            raise Exception("Couldn't read enough bytes")
-
-        rarr = self.ftdi_raw_read(total_read)
-        rdata = rarr[6] << 8 | rarr[7];
-        return rdata
+        wbuf = self.__gen_mdio45(mdio_codec.C45_READ, phy, dev, reg)
+        self.ftdi_write(wbuf + self.FLUSH)
+
+        nsend = mdio_codec.FRAME_SIZE
+        rarr = self.ftdi_read(nsend)
+        return rarr[6] << 8 | rarr[7]
 
     def write_mdio22(self, phy, reg, data):
-        opcode = self.ftdi_gen_opcode(
-            order = self.ORDER_MSB,
-            mode = self.MODE_BYTES,
-            data_out = self.ENABLE,
-            edge_out = self.EDGE_RISING,
-        )
-        data = self.__gen_mdio22("write", phy, reg, data)
-        wbuf = self.ftdi_prepare_write_buf(opcode, data)
-        return self.ftdi_write(wbuf)
+        return self.__write_mdio22(((phy, reg, data),), False)
 
     def read_mdio22(self, phy, reg):
-        opcode = self.ftdi_gen_opcode(
-            order = self.ORDER_MSB,
-            mode = self.MODE_BYTES,
-            data_out = self.ENABLE,
-            edge_out = self.EDGE_RISING,
-            data_in = self.ENABLE,
-            edge_in = self.EDGE_FALLING,
-        )
-        data = self.__gen_mdio22("read", phy, reg)
-        nsend = len(data)
-        wbuf = self.ftdi_prepare_write_buf(opcode, data)
-        self.ftdi_write(wbuf)
-
-        timeout = 5
-        while (self._dev.getQueueStatus() < nsend and timeout >= 0):
-            self._wait()
-            timeout -= 1
-
-        total_read = self._dev.getQueueStatus()
-        if (total_read < nsend):
-            raise Exception("Couldn't read enough bytes")
-
-        rarr = self.ftdi_raw_read(total_read)
-        rdata = rarr[6] << 8 | rarr[7];
-        return rdata
+        self.__write_mdio22(((phy, reg),), True)
+        nsend = self.MDIO22_FRAME_SIZE
+
+        rarr = self.ftdi_read(nsend)
+        return rarr[6] << 8 | rarr[7]
+
+    def transact_mdio22(self, ops):
+        """
+        ops: [(phy, reg) | (phy, reg, data), ...]
+        All frames go out with one ftdi_write, and the responses of all read
+        frames come back with one read.
+        """
+        return self.recv_mdio22(ops, self.send_mdio22(ops))
+
+    def send_mdio22(self, ops):
+        """
+        Queue the frames of ops, return the number of read frames to
+        receive with recv_mdio22(). The chip clocks them out while the
+        host goes on.
+        """
+        nread = sum(1 for op in ops if len(op) == 2)
+        self.__write_mdio22(ops, nread > 0)
+        return nread
+
+    def recv_mdio22(self, ops, nread):
+        """
+        return the results of the ops of send_mdio22(), in order
+        """
+        vals = list()
+        if nread:
+            size = self.MDIO22_FRAME_SIZE
+            rarr = self.ftdi_read(nread * size)
+            vals = mdio_codec.decode(rarr, nread, stride = size)
+
+        vals.reverse()
+        return [vals.pop() if len(op) == 2 else op[2] for op in ops]
 
 
 @Driver.register("ftdi")
 class FtdiMdio(MdioBase):
     HELP = "\n".join([
         "Control Mdio Over ftdi",
-        "URL: ftdi://dev_idx",
-        "  dev_id ::= Nil | Int"
+        "URL: ftdi://dev",
+        "  dev ::= Nil | Int | serial",
+        "  Int: the index of the device, serial: its serial number",
+        "The profile saved by tune() for the serial number is applied on open"
     ])
 
     def _parse_args(self, url):
         args = self.fetch_args(url)
         dev = 0
-        if args:
+        if args and args.isdigit():
             dev = int(args, 10)
+        elif args:
+            dev = args.encode()
         else:
             devices = FtdiCore.list_devices() or []
             if devices:
@@ -169,10 +148,51 @@ class FtdiMdio(MdioBase):
 
         self._dev = dev
         self._ftdi = FtdiCore()
+        self.profile = None
+
+    @staticmethod
+    def list_devices():
+        """
+        return the serial numbers of the attached devices, [bytes, ...]
+        """
+        return FtdiCore.list_devices() or []
+
+    def device_key(self):
+        dev = self._dev
+        if isinstance(dev, int):
+            devices = self.list_devices()
+            if dev < len(devices):
+                dev = devices[dev]
+        return ("ftdi", dev)
+
+    def is_stale(self):
+        try:
+            self._ftdi._dev.getQueueStatus()
+        except Exception:
+            return True
+        return False
 
     def open(self):
+        from . import ftdi_tune
         self._ftdi.open(self._dev)
 
+        self.profile = ftdi_tune.find_profile(self._ftdi.ftdi_serial())
+        if self.profile is not None:
+            self._ftdi.ftdi_apply(**dict(
+                (k, self.profile[k]) for k in ftdi_tune.SETTINGS
+                if k in self.profile))
+
+    def tune(self, phy = 0, save = True, **kw):
+        """
+        Sweep the transport settings against the stream FPGA at phy, keep
+        the fastest reliable ones, return and save them as the profile of
+        this dongle. kw are the options of FtdiTuner.
+        """
+        from . import ftdi_tune
+        with self.lock():
+            self.profile = ftdi_tune.FtdiTuner(self, phy, **kw).run(save)
+        return self.profile
+
     def close(self):
         self._ftdi.close()
 
@@ -181,3 +201,13 @@ class FtdiMdio(MdioBase):
 
     def _write(self, phy, reg, val):
         return self._ftdi.write_mdio22(phy, reg, val)
+
+    def _transact(self, ops):
+        return self._ftdi.transact_mdio22(ops)
+
+    def _submit(self, ops):
+        # the frames wait in the chip, read back by _collect()
+        return ops, self._ftdi.send_mdio22(ops)
+
+    def _collect(self, handle):
+        return self._ftdi.recv_mdio22(*handle)
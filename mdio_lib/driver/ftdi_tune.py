@@ -0,0 +1,200 @@
+"""
+Transport tuning of the FTDI dongle.
+
+The mpsse clock divisor and the usb transfer size are swept one after
+the other, each at the best value of the ones before. The latency timer
+is not swept: every read ends with SEND_IMMEDIATE, so the chip never
+waits for the timer and any change of it is noise of the measure. At
+each setting the stream FPGA is checked with repeated CHIP_VER reads and
+write/readback of phy1_ipg, then the ops/s of a read polling loop is
+measured. The fastest setting without error is saved as the profile of
+the serial number of the dongle, FtdiMdio.open() applies it.
+
+usage:
+    python -m mdio_lib.driver.ftdi_tune [url [phy]]
+
+    drv = Driver.find("ftdi://")
+    drv.open()
+    profile = drv.tune(phy = 0)
+"""
+
+import os
+import sys
+import json
+import time
+
+PROFILE_PATH = os.environ.get(
+    "MDIO_FTDI_PROFILES",
+    os.path.join(os.path.expanduser("~"), ".mdio_lib", "ftdi_profiles.json"))
+
+# the settings of a profile, as taken by FtdiCore.ftdi_apply()
+SETTINGS = ["divisor", "latency", "usb_size"]
+
+
+def _key(serial):
+    if isinstance(serial, bytes):
+        serial = serial.decode("ascii", "replace")
+    return serial
+
+
+def load_profiles(path = None):
+    """
+    return {serial: profile}
+    """
+    try:
+        with open(path or PROFILE_PATH) as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return dict()
+
+
+def find_profile(serial, path = None):
+    return load_profiles(path).get(_key(serial), None)
+
+
+def save_profile(serial, profile, path = None):
+    path = path or PROFILE_PATH
+    profiles = load_profiles(path)
+    profiles[_key(serial)] = profile
+
+    folder = os.path.dirname(path)
+    if folder and not os.path.isdir(folder):
+        os.makedirs(folder)
+    tmp = path + ".tmp"
+    with open(tmp, "w") as f:
+        json.dump(profiles, f, indent = 2, sort_keys = True)
+    os.replace(tmp, path)
+
+
+class FtdiTuner(object):
+    CHIP_VER = 0xbeef
+    CHIP_VER_REG = 0x01
+    PATTERNS = [0x5555, 0xaaaa, 0x0000, 0xffff]
+
+    # from the default 0x000d to the fastest clock
+    DIVISORS = [0x000d, 0x0009, 0x0006, 0x0004, 0x0002, 0x0001, 0x0000]
+    USB_SIZES = [65536, 4096, 512, 64]
+    # a setting replaces the best one only if faster by this ratio, more
+    # than the noise of the measure
+    GAIN = 0.05
+
+    def __init__(self, drv, phy = 0, reads = 200, batch = 8,
+                 duration = 0.2, log = print):
+        """
+        drv: an opened FtdiMdio
+        reads: CHIP_VER reads to trust a setting
+        batch: the reads of each read_many() of the measure
+        duration: seconds to measure each setting
+        """
+        from ..interface import Interface
+        self.drv = drv
+        self.phy = phy
+        self.reads = reads
+        self.batch = batch
+        self.duration = duration
+        self.log = log or (lambda *args: None)
+
+        self.target = Interface.equip(drv, "mdio", "reg_fields")
+        self.target.config_phyid(phy)
+
+    def verify(self):
+        """
+        return True if every CHIP_VER read and phy1_ipg readback is right
+        """
+        ops = [(self.phy, self.CHIP_VER_REG)] * self.batch
+        for i in range(0, self.reads, self.batch):
+            if any(v != self.CHIP_VER for v in self.drv.read_many(ops)):
+                return False
+
+        target = self.target
+        target.invalidate_page()
+        old = target.get_phy1_ipg()
+        try:
+            for val in self.PATTERNS:
+                target.set_phy1_ipg(val)
+                if target.get_phy1_ipg() != val:
+                    return False
+        finally:
+            target.set_phy1_ipg(old)
+        return target.get_phy1_ipg() == old
+
+    def measure(self):
+        """
+        return ops/s of a single read and a read_many() of batch reads
+        """
+        op = (self.phy, self.CHIP_VER_REG)
+        ops = [op] * self.batch
+        n = 0
+        start = time.monotonic()
+        deadline = start + self.duration
+        while True:
+            self.drv.read(*op)
+            self.drv.read_many(ops)
+            n += 1 + len(ops)
+            now = time.monotonic()
+            if now >= deadline:
+                break
+        return n / (now - start)
+
+    def trial(self, **settings):
+        """
+        return ops/s of the settings, or None if they are not reliable
+        """
+        core = self.drv._ftdi
+        try:
+            core.ftdi_apply(**settings)
+            ok = self.verify()
+            rate = self.measure() if ok else None
+        except Exception as e:
+            self.log("  {}: {}".format(settings, e))
+            rate = None
+        if rate is None:
+            core.ftdi_resync()
+        self.log("  {} -> {}".format(
+            settings, "failed" if rate is None else "{:.0f} ops/s".format(rate)))
+        return rate
+
+    def run(self, save = True, path = None):
+        """
+        return the best profile, saved for the serial of the dongle
+        """
+        core = self.drv._ftdi
+        best = dict(divisor = core.divisor,
+                    latency = core.latency or 16,
+                    usb_size = core.usb_size or 4096)
+        best_rate = self.trial(**best)
+        if best_rate is None:
+            raise Exception("The default settings are not reliable")
+
+        for name, values in (("divisor", self.DIVISORS),
+                             ("usb_size", self.USB_SIZES)):
+            self.log("sweep {}".format(name))
+            for val in values:
+                if val == best[name]:
+                    continue
+                settings = dict(best)
+                settings[name] = val
+                rate = self.trial(**settings)
+                if rate is not None and rate > best_rate * (1 + self.GAIN):
+                    best, best_rate = settings, rate
+
+        core.ftdi_apply(**best)
+        profile = dict(best, ops_per_s = round(best_rate, 1))
+        if save:
+            save_profile(core.ftdi_serial(), profile, path)
+        self.log("best {}".format(profile))
+        return profile
+
+
+def main(argv):
+    from .driver import Driver
+
+    url = argv[1] if len(argv) > 1 else "ftdi://"
+    phy = int(argv[2], 0) if len(argv) > 2 else 0
+    with Driver.opened(url) as drv:
+        drv.tune(phy = phy)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
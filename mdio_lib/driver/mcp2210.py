@@ -1,7 +1,13 @@
-import hid
+import time
 
-from .mdio import MdioBase
+try:
+    import hid
+except ImportError:
+    hid = None
+
+from .mdio import MdioBase, DeviceCache
 from .driver import Driver
+from .mdio_codec import FrameCodec
 
 import os
 
@@ -13,6 +19,9 @@ is_win = os.name == 'nt'
 
 
 
+MCP2210_VID = 0x04d8
+MCP2210_PID = 0x00de
+
 CMD_CANCEL    = [0x0] * is_win + \
                 [0x11, 0x00, 0x00, 0x00]
 CMD_CHIP_CFG_READ  = [0x0] * is_win + \
@@ -35,27 +44,82 @@ CMD_CFG       = [0x0] * is_win + \
 CMD_CFG_READ  = [0x0] * is_win + \
                 [0x41] + [0] * 63
 
-CMD_RW_HEAD   = [0x0] * is_win + [0x42, 0x08, 0x00, 0x00,
-                 0xff, 0xff, 0xff, 0xff]
+# offset of "bytes per spi transaction" in CMD_CFG
+CFG_XFER_LEN  = 18 + is_win
+# offset of the idle/active chip select value in CMD_CFG
+CFG_IDLE_CS   = 8 + is_win
+CFG_ACTIVE_CS = 10 + is_win
+# offset of the pin designations in CMD_CHIP_CFG, 1 for chip select
+CHIP_CFG_PINS = 4 + is_win
+CS_PINS = 8
 
-CMD_RW_TAIL   = [0xff, 0xff]
+# byte 1 of the CMD_RW response, the data of the command is not taken
+SPI_BUSY = 0xf8
+# byte 3 of the CMD_RW response, the status of the spi engine
+SPI_ENGINE_FINISHED = 0x10
+
+# preamble(4) + frame(4)
+MDIO_FRAME_SIZE = 8
+# the spi data of one HID report is up to 60 bytes
+MDIO_FRAMES_PER_REPORT = 7
+# a batch of frames is sent in the room of MDIO_FRAMES_PER_REPORT frames,
+# the unused room is idle high, so batches of any size share the transfer
+# settings. A single frame, the unbatched read() and write(), is sent at
+# its own length, not clocked 7 times over.
+MDIO_XFER_LEN = MDIO_FRAME_SIZE * MDIO_FRAMES_PER_REPORT
+# the frames are sent as they are, no bytes around them
+MDIO_CODEC = FrameCodec()
 
 @Driver.register("mcp2210")
 class Mcp2210Mdio(MdioBase):
+    # seconds for one spi transaction, and the busy statuses allowed in a row
+    SPI_TIMEOUT = 0.1
+    SPI_RETRIES = 10
+    # stream() fills every spi transaction
+    STREAM_CHUNK = MDIO_FRAMES_PER_REPORT
+
     HELP = "\n".join([
         "Control Mdio Over ftdi",
-        "URL: mcp2210://",
+        "URL: mcp2210://[sim | path]",
+        "  sim: the HID emulator, with fake://0,sim on every chip select",
+        "  path: the HID path of the dongle, see list_devices(), the first",
+        "        one by default",
+        "The hid device is created by hid_factory, replace it to inject",
+        "another one.",
+        "GP0~GP7 are chip selects driven by the spi engine, target(cs)",
+        "returns the driver of the device on one of them.",
     ])
 
     def _parse_args(self, url):
         args = self.fetch_args(url)
-        print(args)
 
         self._mcp2210 = None
+        self.hid = None
+        self._stale = False
+        self._path = args if args and args != "sim" else None
+        self._sim = args == "sim"
+        self._xfer_cfg = None
+        self._cs = 0
+        # {cs: DeviceCache}, each chip select is its own device
+        self._cs_caches = dict()
+        self.cs_switches = 0
+        self.last_wait = 0.0
+        self.spi_stats_clean()
+        self.hid_factory = hid.device if hid is not None else None
+        if args == "sim":
+            from .mcp2210_sim import Mcp2210Sim
+            self.hid_factory = lambda: Mcp2210Sim(
+                default_target = lambda: Driver.find("fake://0,sim"))
 
     def open(self):
-        self.hid = hid.device()
-        self.hid.open(0x04d8, 0x00de)
+        if self.hid_factory is None:
+            raise Exception("hidapi is not installed")
+        self.hid = self.hid_factory()
+        self._stale = False
+        if self._path is not None:
+            self.hid.open_path(self._path.encode("latin-1"))
+        else:
+            self.hid.open(MCP2210_VID, MCP2210_PID)
         
         self.hid.write(CMD_CANCEL)
         rsp = self.hid.read(64)
@@ -65,7 +129,9 @@ class Mcp2210Mdio(MdioBase):
         # self.hid.write(CMD_CHIP_CFG_READ)
         # rsp = self.hid.read(64)
         # print(", ".join(map(lambda x: '0x%02x' %x, rsp)))
-        self.hid.write(CMD_CHIP_CFG)
+        cfg = CMD_CHIP_CFG[:]
+        cfg[CHIP_CFG_PINS:CHIP_CFG_PINS + CS_PINS] = [0x01] * CS_PINS
+        self.hid.write(cfg)
         rsp = self.hid.read(64)
         assert(rsp[1] == 0)
         # print(rsp)
@@ -73,64 +139,271 @@ class Mcp2210Mdio(MdioBase):
         # self.hid.write(CMD_CFG_READ)
         # rsp = self.hid.read(64)
         # print(", ".join(map(lambda x: '0x%02x' %x, rsp)))
-        self.hid.write(CMD_CFG)
-        rsp = self.hid.read(64)
-        assert(rsp[1] == 0)
-        # print(rsp)
+        self._xfer_cfg = None
+        self._set_xfer_cfg(MDIO_FRAME_SIZE, self._cs)
 
     def close(self):
         self.hid.close()
+        self.hid = None
 
-    def _read(self, phy, reg):
-        op_phy_reg = (0x6 << 12) | ((phy & 0x1f) << 7) | ((reg & 0x1f)  << 2) | 0x2
-        cmd = CMD_RW_HEAD + [(op_phy_reg >> 8), (op_phy_reg & 0xFF)] + CMD_RW_TAIL
+    def device_key(self):
+        if self._sim:
+            # every emulator is a device of its own
+            return None
+        path = self._path
+        if path is None:
+            paths = self.list_devices()
+            path = paths[0] if paths else None
+        return ("mcp2210", path)
+
+    def is_stale(self):
+        return self.hid is None or self._stale
+
+    @staticmethod
+    def list_devices():
+        """
+        return the HID paths of the attached dongles, [str, ...]
+        """
+        if hid is None:
+            return list()
+        return [info["path"].decode("latin-1")
+                for info in hid.enumerate(MCP2210_VID, MCP2210_PID)]
+
+    def _set_xfer_cfg(self, length, cs):
+        """
+        Update the bytes per spi transaction and the chip select driven low
+        during it, only when they are changed.
+        """
+        if self._xfer_cfg == (length, cs):
+            return
+
+        active = 0x1ff ^ (1 << cs)
+        cfg = CMD_CFG[:]
+        cfg[CFG_IDLE_CS] = 0xff
+        cfg[CFG_IDLE_CS + 1] = 0x01
+        cfg[CFG_ACTIVE_CS] = active & 0xff
+        cfg[CFG_ACTIVE_CS + 1] = active >> 8
+        cfg[CFG_XFER_LEN] = length & 0xff
+        cfg[CFG_XFER_LEN + 1] = (length >> 8) & 0xff
+        self.hid.write(cfg)
+        rsp = self.hid.read(64)
+        assert(rsp[1] == 0)
+        if self._xfer_cfg is not None and self._xfer_cfg[1] != cs:
+            self.cs_switches += 1
+        self._xfer_cfg = (length, cs)
+
+    def _spi_transfer(self, data):
+        """
+        Send data with one CMD_RW, then poll with empty CMD_RW until the spi
+        engine finishes the transaction, return the bytes received.
+        The data is sent again only if the chip is busy and did not take it.
+        """
+        expect = len(data)
+        cmd = bytes([0x0] * is_win + [0x42, expect, 0x00, 0x00]) + data
+        poll = [0x0] * is_win + [0x42, 0x00, 0x00, 0x00]
 
-        received = 0
-        expect = 8
+        start = time.monotonic()
+        deadline = start + self.SPI_TIMEOUT
+        busy = 0
+        retries = 0
+        polls = 0
+        sent = False
         buf = list()
 
-        while received < expect:
-            self.hid.write(cmd)
+        while True:
+            self.hid.write(poll if sent else cmd)
             rsp = self.hid.read(64)
-            if rsp[1] != 0:
-                raise Exception("Error when HID write")
+            if rsp[1] == SPI_BUSY:
+                busy += 1
+                retries += 1
+            elif rsp[1] != 0:
+                raise Exception("Error when HID write", rsp[1])
             else:
+                sent = True
+                retries = 0
                 length = rsp[2]
-                received += length
                 buf += rsp[4:4+length]
+                if rsp[3] == SPI_ENGINE_FINISHED or len(buf) >= expect:
+                    break
+                polls += 1
 
-        #print(cmd[4+is_win:10+is_win], buf[:6])
-        assert(cmd[4+is_win:10+is_win] == buf[:6])
-        return (buf[6] << 8) | (buf[7])
+            if retries > self.SPI_RETRIES or time.monotonic() > deadline:
+                self.hid.write(CMD_CANCEL)
+                self.hid.read(64)
+                raise Exception("Timeout of spi transfer",
+                                "busy {}, polls {}".format(busy, polls))
 
-    def _write(self, phy, reg, val):
-        op_phy_reg = (0x5 << 12) | ((phy & 0x1f) << 7) | ((reg & 0x1f)  << 2) | 0x2
-        cmd = CMD_RW_HEAD + [(op_phy_reg >> 8), (op_phy_reg & 0xFF), (val >> 8) & 0xff, val & 0xff]
+        wait = time.monotonic() - start
+        stats = self._spi_stats
+        stats["transfers"] += 1
+        stats["polls"] += polls
+        stats["busy"] += busy
+        stats["wait"] += wait
+        stats["wait_max"] = max(stats["wait_max"], wait)
+        self.last_wait = wait
+        return buf
 
-        received = 0
-        expect = 8
-        buf = list()
+    def spi_stats_clean(self):
+        self._spi_stats = dict(transfers = 0, polls = 0, busy = 0,
+                               wait = 0.0, wait_max = 0.0)
 
-        while received < expect:
-            self.hid.write(cmd)
-            rsp = self.hid.read(64)
-            if rsp[1] != 0:
-                raise Exception("Error when HID write")
+    def spi_stats(self):
+        """
+        return dict of the spi transactions, the empty polls and busy
+        statuses they took, and the time waited for them in seconds
+        """
+        s = dict(self._spi_stats)
+        s["wait_avg"] = s["wait"] / s["transfers"] if s["transfers"] else 0.0
+        return s
+
+    def _transfer_frames(self, ops, cs = None):
+        """
+        Send up to MDIO_FRAMES_PER_REPORT frames in one spi transaction to
+        chip select cs, the one of dev_sel() by default.
+        """
+        nframe = len(ops) * MDIO_FRAME_SIZE
+        length = MDIO_FRAME_SIZE if len(ops) == 1 else MDIO_XFER_LEN
+        data = MDIO_CODEC.pack(ops, pad = length - nframe)
+
+        try:
+            self._set_xfer_cfg(len(data), self._cs if cs is None else cs)
+            buf = bytes(self._spi_transfer(data))
+        except (IOError, OSError, ValueError):
+            # hidapi lost the device
+            self._stale = True
+            raise
+
+        res = list()
+        for off, op in zip(range(0, nframe, MDIO_FRAME_SIZE), ops):
+            end = off + MDIO_FRAME_SIZE
+            if len(op) == 2:
+                assert(data[off:end - 2] == buf[off:end - 2])
+                res.append((buf[end - 2] << 8) | buf[end - 1])
             else:
-                length = rsp[2]
-                received += length
-                buf += rsp[4:4+length]
+                assert(data[off:end] == buf[off:end])
+                res.append(op[2])
+        return res
+
+    def _transact(self, ops, cs = None):
+        res = list()
+        for i in range(0, len(ops), MDIO_FRAMES_PER_REPORT):
+            res += self._transfer_frames(ops[i:i + MDIO_FRAMES_PER_REPORT], cs)
+        return res
+
+    def _read(self, phy, reg):
+        return self._transfer_frames([(phy, reg)])[0]
 
-        assert(cmd[4+is_win:12+is_win] == buf[:8])
+    def _write(self, phy, reg, val):
+        self._transfer_frames([(phy, reg, val)])
 
     def dev_sel(self, dev):
-        assert(dev >= 0 and dev < 8)
-        cfg = CMD_CHIP_CFG[:]
-        cfg[13+is_win] = 0xFF ^ (1 << dev)
+        """
+        Select the chip select of the ops of this driver. It only takes
+        effect with the next spi transaction.
+        """
+        assert(dev >= 0 and dev < CS_PINS)
+        self._cs = dev
 
-        self.hid.write(cfg)
-        rsp = self.hid.read(64)
-        assert(rsp[1] == 0)
+    def target(self, cs):
+        """
+        return Mcp2210Target, the driver of the device on chip select cs
+        """
+        return Mcp2210Target(self, cs)
+
+    def _cache_of(self, cs):
+        cache = self._cs_caches.get(cs, None)
+        if cache is None:
+            cache = self._cs_caches[cs] = DeviceCache()
+        return cache
+
+    def _device_cache(self):
+        return self._cache_of(self._cs)
+
+    def schedule(self, jobs):
+        """
+        jobs: [(cs | Mcp2210Target, ops), ...]
+        Run the ops of all jobs grouped by chip select, starting with the
+        current one, so each chip select is configured once. The ops of one
+        chip select are packed together.
+        return the results of every job, in order
+        """
+        jobs = list(jobs)
+        targets = [t for t, ops in jobs if isinstance(t, MdioBase)]
+        jobs = [(getattr(t, "cs", t), list(ops)) for t, ops in jobs]
+        groups = dict()
+        for i, (cs, ops) in enumerate(jobs):
+            groups.setdefault(cs, list()).append(i)
+
+        res = [None] * len(jobs)
+        with self._lock:
+            # the ops of stream() before them go first, as in transact()
+            self._drain()
+            for target in targets:
+                target._drain()
+
+            current = self._xfer_cfg[1] if self._xfer_cfg else self._cs
+            order = sorted(groups, key = lambda cs: cs != current)
+            for cs in order:
+                ops = list()
+                for i in groups[cs]:
+                    ops += jobs[i][1]
+                try:
+                    vals = self._transact(ops, cs) if ops else list()
+                except BaseException:
+                    self._forget_ops(ops, self._cache_of(cs))
+                    raise
+                self._track_ops(ops, vals, self._cache_of(cs))
+                self._store_ops(ops, vals)
+                for i in groups[cs]:
+                    n = len(jobs[i][1])
+                    res[i], vals = vals[:n], vals[n:]
+        return res
+
+
+class Mcp2210Target(MdioBase):
+    """
+    The device on one chip select of a shared Mcp2210Mdio. It shares the
+    bus lock and the IoWorker of the dongle, which is opened and closed by
+    the owner of the Mcp2210Mdio.
+
+    usage:
+    bus = Driver.find("mcp2210://")
+    bus.open()
+    fpga = Interface.equip(bus.target(3), "mdio", "reg_fields")
+    """
+    HELP = "The device on one chip select, see Mcp2210Mdio.target()"
+    STREAM_CHUNK = MDIO_FRAMES_PER_REPORT
+
+    def __init__(self, bus, cs):
+        assert(cs >= 0 and cs < CS_PINS)
+        self.bus = bus
+        self.cs = cs
+        super().__init__("mcp2210://")
+        self._lock = bus.lock()
+
+    def _parse_args(self, url):
+        pass
+
+    def worker(self):
+        return self.bus.worker()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _read(self, phy, reg):
+        return self.bus._transfer_frames([(phy, reg)], self.cs)[0]
+
+    def _write(self, phy, reg, val):
+        self.bus._transfer_frames([(phy, reg, val)], self.cs)
+
+    def _transact(self, ops):
+        return self.bus._transact(ops, self.cs)
+
+    def _device_cache(self):
+        return self.bus._cache_of(self.cs)
 
 if __name__ == '__main__':
     mdio_inst = Mcp2210Mdio() 
@@ -0,0 +1,251 @@
+import time
+import random
+
+from .mdio_slave import MdioSlave
+
+"""
+Emulator of the MCP2210 HID interface, with the api of hid.device.
+
+Commands:
+    0x11 cancel the spi transfer
+    0x20/0x21 get/set the chip settings: pin designation, gpio value and
+              direction
+    0x40/0x41 set/get the spi transfer settings: bit rate, idle/active
+              chip select value, bytes per spi transaction
+    0x42 transfer spi data
+
+Every report round trip takes one full speed usb frame of the emulated
+time, the spi bytes are clocked at the bit rate of the transfer settings.
+A 0x42 command starts a transfer of "bytes per spi transaction" bytes,
+more data is taken by the next 0x42 commands until the transfer is fed.
+The response carries the bytes received so far, with the engine status:
+    0x20 started, no data to receive
+    0x30 not finished, data received
+    0x10 finished
+If the data of the command can not be taken yet, the status is 0xf8,
+transfer in progress.
+
+Each chip select pin may have an MDIO target, the pins are chip select
+by the designation 1, or gpio outputs by designation 0 as used by
+Mcp2210Mdio.dev_sel(). The selected targets decode the MDIO frames of
+the spi data and drive the MISO line.
+
+usage:
+    sim = Mcp2210Sim({3: Driver.find("fake://0,sim")})
+    drv = Driver.find("mcp2210://")
+    drv.hid_factory = lambda: sim
+    drv.open()
+"""
+
+STATUS_OK = 0x00
+STATUS_BUSY = 0xf8
+STATUS_UNKNOWN = 0xf9
+
+ENGINE_STARTED = 0x20
+ENGINE_DATA = 0x30
+ENGINE_FINISHED = 0x10
+
+PINS = 9
+SPI_DATA_MAX = 60
+
+
+class Mcp2210Sim(object):
+    USB_FRAME = 1e-3
+
+    def __init__(self, targets = None, default_target = None,
+                 busy = 0.0, partial = None, seed = None, realtime = False):
+        """
+        targets: {pin: regfile}, regfile has read(phy, reg) and
+                 write(phy, reg, val), such as a mdio driver
+        default_target: called to create the target of a pin without one
+        busy: the rate of injected transfer in progress statuses
+        partial: the most bytes returned by one response
+        realtime: sleep the usb frames, else only account them
+        """
+        self._slaves = dict((pin, MdioSlave(regfile))
+                            for pin, regfile in (targets or {}).items())
+        self._default_target = default_target
+        self.busy = busy
+        self.partial = partial
+        self.realtime = realtime
+        self._rand = random.Random(seed)
+
+        self.now = 0.0
+        self.opened = False
+        self.stats = dict(reports = 0, busy = 0, transfers = 0)
+
+        self.designation = [0] * PINS
+        self.gpio = 0x1ff
+        self.gpio_dir = 0x000
+        self.bitrate = 12000000
+        self.idle_cs = 0x1ff
+        self.active_cs = 0x000
+        self.xfer_len = 4
+        self.mode = 0
+        self._xfer = None
+        self._rsp = None
+
+    # hid.device
+    def open(self, vid = None, pid = None):
+        self.opened = True
+
+    def open_path(self, path):
+        self.opened = True
+
+    def close(self):
+        self.opened = False
+
+    def write(self, report):
+        report = list(report)
+        # the report id of windows
+        if len(report) == 65:
+            report = report[1:]
+        self.now += self.USB_FRAME
+        self.stats["reports"] += 1
+        if self.realtime:
+            time.sleep(self.USB_FRAME)
+
+        handler = {
+            0x11: self._cancel,
+            0x20: self._get_chip_cfg,
+            0x21: self._set_chip_cfg,
+            0x40: self._set_cfg,
+            0x41: self._get_cfg,
+            0x42: self._transfer,
+        }.get(report[0], None)
+        report += [0] * (64 - len(report))
+
+        rsp = [report[0], STATUS_UNKNOWN] + [0] * 62
+        if handler is not None:
+            res = handler(report)
+            rsp[1:1 + len(res)] = res
+        self._rsp = rsp[:64]
+        return len(report)
+
+    def read(self, size, timeout_ms = 0):
+        rsp, self._rsp = self._rsp, None
+        return (rsp or [])[:size]
+
+    # targets
+    def target(self, pin):
+        slave = self._slaves.get(pin, None)
+        if slave is None and self._default_target is not None:
+            slave = MdioSlave(self._default_target())
+            self._slaves[pin] = slave
+        return slave
+
+    def selected(self, active = True):
+        """
+        return the pins driven low
+        """
+        pins = list()
+        for pin in range(PINS):
+            if self.designation[pin] == 1:
+                level = (self.active_cs if active else self.idle_cs) >> pin
+            else:
+                level = self.gpio >> pin
+            if not level & 1:
+                pins.append(pin)
+        return pins
+
+    # commands, return the response from its status byte
+    @staticmethod
+    def _word(report, offset):
+        return report[offset] | (report[offset + 1] << 8)
+
+    def _cancel(self, report):
+        self._xfer = None
+        return [STATUS_OK]
+
+    def _get_chip_cfg(self, report):
+        return [STATUS_OK, 0, 0] + self.designation + [
+            self.gpio & 0xff, self.gpio >> 8,
+            self.gpio_dir & 0xff, self.gpio_dir >> 8]
+
+    def _set_chip_cfg(self, report):
+        if self._xfer is not None:
+            return [STATUS_BUSY]
+        self.designation = report[4:4 + PINS]
+        self.gpio = self._word(report, 13)
+        self.gpio_dir = self._word(report, 15)
+        return [STATUS_OK]
+
+    def _get_cfg(self, report):
+        rate = self.bitrate
+        return [STATUS_OK, 17, 0,
+                rate & 0xff, (rate >> 8) & 0xff,
+                (rate >> 16) & 0xff, (rate >> 24) & 0xff,
+                self.idle_cs & 0xff, self.idle_cs >> 8,
+                self.active_cs & 0xff, self.active_cs >> 8,
+                0, 0, 0, 0, 0, 0,
+                self.xfer_len & 0xff, self.xfer_len >> 8, self.mode]
+
+    def _set_cfg(self, report):
+        if self._xfer is not None:
+            return [STATUS_BUSY]
+        self.bitrate = (report[4] | (report[5] << 8) |
+                        (report[6] << 16) | (report[7] << 24)) or 1
+        self.idle_cs = self._word(report, 8)
+        self.active_cs = self._word(report, 10)
+        self.xfer_len = self._word(report, 18)
+        self.mode = report[20]
+        return [STATUS_OK]
+
+    def _clock(self, data):
+        """
+        clock data out to the selected targets, return [(ready time, byte)]
+        """
+        xfer = self._xfer
+        miso = bytearray(data)
+        for pin in self.selected():
+            slave = self.target(pin)
+            if slave is None:
+                continue
+            out = slave.shift(data)
+            miso = bytearray(a & b for a, b in zip(miso, out))
+
+        byte_time = 8.0 / self.bitrate
+        start = max(self.now, xfer["end"])
+        xfer["end"] = start + len(data) * byte_time
+        return [(start + (i + 1) * byte_time, b) for i, b in enumerate(miso)]
+
+    def _transfer(self, report):
+        n = report[1]
+        data = report[4:4 + min(n, SPI_DATA_MAX)]
+        xfer = self._xfer
+
+        if self.busy and self._rand.random() < self.busy:
+            self.stats["busy"] += 1
+            return [STATUS_BUSY]
+
+        if xfer is None:
+            if not data:
+                return [STATUS_OK, 0, ENGINE_FINISHED]
+            xfer = self._xfer = dict(left = self.xfer_len, end = self.now,
+                                     rx = list())
+            self.stats["transfers"] += 1
+
+        if data:
+            # the data sent before is still clocked out
+            if self.now < xfer["end"]:
+                return [STATUS_BUSY]
+            take = data[:xfer["left"]]
+            xfer["left"] -= len(take)
+            xfer["rx"] += self._clock(take)
+
+        rx = xfer["rx"]
+        count = 0
+        limit = min(SPI_DATA_MAX, self.partial or SPI_DATA_MAX)
+        while count < len(rx) and count < limit and rx[count][0] <= self.now:
+            count += 1
+        out = [b for _, b in rx[:count]]
+        del rx[:count]
+
+        if xfer["left"] == 0 and not rx:
+            engine = ENGINE_FINISHED
+            self._xfer = None
+        elif out:
+            engine = ENGINE_DATA
+        else:
+            engine = ENGINE_STARTED
+        return [STATUS_OK, len(out), engine] + out
@@ -1,4 +1,8 @@
 import time
+import itertools
+import threading
+from collections import deque
+from .worker import IoWorker
 
 class MdioException(Exception): pass
 
@@ -72,13 +76,78 @@ class HasMdioCommand:
             super().__init__("write", info)
 
 
+class DeviceCache(object):
+    """
+    What the host knows of the registers of one device, shared by every
+    user of its driver.
+    """
+    def __init__(self):
+        # {phy: page} last written to REG_PAGE
+        self.pages = dict()
+        # {(phy, page << 5 | reg): val} copies kept by the interfaces
+        self.shadow = dict()
+
+    def drop_phy(self, phy):
+        # the page and the registers of phy are unknown
+        self.pages.pop(phy, None)
+        for key in [key for key in self.shadow if key[0] == phy]:
+            del self.shadow[key]
+
+
 class MdioBase(Storable, HasMdioCommand):
     HELP = "None"
 
+    # the page register of the stream FPGA, the page written to it is
+    # kept for each phy, shared by every user of the driver
+    REG_PAGE = 31
+
     def __init__(self, url):
         super().__init__();
+        # serialize the bus access from many threads
+        self._lock = threading.RLock()
+        # not the bus lock, the GUI thread takes it and never waits for usb
+        self._worker_lock = threading.Lock()
+        self._worker = None
+        # [ops, handle of _submit(), results], in the order of the bus
+        self._inflight = deque()
+        # [(ops, Future), ...] of atransact() not taken by the worker yet
+        self._abatch = list()
+        self._abatch_lock = threading.Lock()
+        # see _device_cache()
+        self._cache = DeviceCache()
         self._parse_args(url)
 
+    def lock(self):
+        """
+        usage:
+        with driver.lock():
+            ...
+        """
+        return self._lock
+
+    def worker(self):
+        """
+        return the IoWorker dedicated to this device, started on first use
+        """
+        with self._worker_lock:
+            if self._worker is None:
+                self._worker = IoWorker(name = type(self).__name__)
+                self._worker.start()
+        return self._worker
+
+    def stop_worker(self):
+        """
+        Stop the IoWorker after its queued commands and wait for it, unless
+        called on it. The next worker() starts a new one.
+        """
+        with self._worker_lock:
+            worker, self._worker = self._worker, None
+        if worker is None:
+            return
+        worker.stop()
+        if worker is not threading.current_thread():
+            worker.join()
+
     @staticmethod
     def fetch_args(url):
         infos = url.split("://")
@@ -92,6 +161,101 @@ class MdioBase(Storable, HasMdioCommand):
     def _parse_args(self, url):
         raise NotImplemented
 
+    def device_key(self):
+        """
+        return the key of the device for Driver.acquire(), the same for
+        every url of one device, or None if the driver is not shared
+        """
+        return None
+
+    def target(self, cs):
+        """
+        return the driver of the device on chip select cs, this driver
+        itself if it has no chip selects
+        """
+        return self
+
+    def is_stale(self):
+        """
+        return True if the opened handle of the device is gone, such as
+        unplugged, Driver.acquire() opens it again
+        """
+        return False
+
+    def _device_cache(self):
+        """
+        return the DeviceCache of the device the ops go to, a driver of
+        many devices on one bus keeps one for each
+        """
+        return self._cache
+
+    def cached_page(self, phy):
+        """
+        return the page last written to REG_PAGE of phy, or None if it is
+        not known
+        """
+        with self._lock:
+            return self._device_cache().pages.get(phy, None)
+
+    def invalidate_page(self, phy = None):
+        """
+        Forget the page of phy, or of all phys if phy is None. It should
+        be called when the page is changed behind the driver, such as a
+        reset of the target.
+        """
+        with self._lock:
+            pages = self._device_cache().pages
+            if phy is None:
+                pages.clear()
+            else:
+                pages.pop(phy, None)
+
+    def invalidate_cache(self):
+        """
+        Forget the pages and the shadow of the device, such as after it is
+        opened again.
+        """
+        with self._lock:
+            cache = self._device_cache()
+            cache.pages.clear()
+            cache.shadow.clear()
+
+    def shadow(self):
+        """
+        return {(phy, page << 5 | reg): val}, the copies of registers kept
+        by the interfaces, to be used under lock(). A write through the
+        driver drops the copy of the register it changes.
+        """
+        return self._device_cache().shadow
+
+    def _track_ops(self, ops, res = None, cache = None):
+        """
+        Keep the pages written by ops, and read by them if res is given,
+        drop the shadow of the registers they write.
+        """
+        cache = self._device_cache() if cache is None else cache
+        pages, shadow = cache.pages, cache.shadow
+        reg_page = self.REG_PAGE
+        for i, op in enumerate(ops):
+            phy, reg = op[0], op[1]
+            if reg == reg_page:
+                if len(op) == 3:
+                    pages[phy] = op[2]
+                elif res is not None:
+                    pages[phy] = res[i]
+            elif len(op) == 3 and shadow:
+                page = pages.get(phy, None)
+                if page is None:
+                    cache.drop_phy(phy)
+                else:
+                    shadow.pop((phy, (page << 5) | reg), None)
+
+    def _forget_ops(self, ops, cache = None):
+        # the ops failed, what they write is unknown
+        cache = self._device_cache() if cache is None else cache
+        for phy in set(op[0] for op in ops if len(op) == 3):
+            cache.drop_phy(phy)
+
     def _read(self, phy, reg):
         raise NotImplemented
 
@@ -105,11 +269,215 @@ class MdioBase(Storable, HasMdioCommand):
         raise NotImplemented
 
     def read(self, phy, reg):
-        val = self._read(phy, reg)
-        self.store(self.MdioRead(phy, reg, val))
+        with self._lock:
+            self._drain()
+            val = self._read(phy, reg)
+            if reg == self.REG_PAGE:
+                self._device_cache().pages[phy] = val
+            self.store(self.MdioRead(phy, reg, val))
         return val
 
     def write(self, phy, reg, val):
-        self._write(phy, reg, val)
-        self.store(self.MdioWrite(phy, reg, val))
+        with self._lock:
+            self._drain()
+            try:
+                self._write(phy, reg, val)
+            except BaseException:
+                self._forget_ops([(phy, reg, val)])
+                raise
+            self._track_ops([(phy, reg, val)])
+            self.store(self.MdioWrite(phy, reg, val))
         return val
+
+    @staticmethod
+    def is_read_op(op):
+        return len(op) == 2
+
+    def _transact(self, ops):
+        """
+        Generic fallback: one bus round trip for each op.
+        The driver should override it if it can pack many ops into
+        fewer transfers.
+        """
+        res = list()
+        for op in ops:
+            if self.is_read_op(op):
+                res.append(self._read(*op))
+            else:
+                self._write(*op)
+                res.append(op[2])
+        return res
+
+    def transact(self, ops):
+        """
+        ops: [(phy, reg) | (phy, reg, val), ...]
+          (phy, reg)      => read
+          (phy, reg, val) => write
+        return the results in order, the written value for write ops.
+        """
+        ops = list(ops)
+        if not ops:
+            return list()
+
+        with self._lock:
+            self._drain()
+            try:
+                res = self._transact(ops)
+            except BaseException:
+                self._forget_ops(ops)
+                raise
+            self._track_ops(ops, res)
+            self._store_ops(ops, res)
+        return res
+
+    def _store_ops(self, ops, res):
+        for op, val in zip(ops, res):
+            if self.is_read_op(op):
+                self.store(self.MdioRead(op[0], op[1], val))
+            else:
+                self.store(self.MdioWrite(op[0], op[1], val))
+
+    # ops of stream() the bus will answer later, the number of ops
+    # submitted at a time, None for half the window
+    STREAM_CHUNK = None
+
+    def _submit(self, ops):
+        """
+        Start the transfer of ops, return the handle of _collect(). The
+        generic one runs the whole transaction, a driver that can queue
+        frames on the bus should override both.
+        """
+        return self._transact(ops)
+
+    def _collect(self, handle):
+        """
+        return the results of the ops of _submit()
+        """
+        return handle
+
+    def _drain(self, until = None):
+        """
+        Collect the submitted ops in order, all of them or up to the
+        entry until. Every other bus access drains them first.
+        """
+        inflight = self._inflight
+        while inflight:
+            entry = inflight.popleft()
+            try:
+                entry[2] = self._collect(entry[1])
+            except BaseException:
+                self._forget_ops(entry[0])
+                raise
+            if entry is until:
+                break
+
+    def stream(self, ops, window = 64):
+        """
+        ops: iterable of (phy, reg) | (phy, reg, val), may be unbounded
+        window: the most ops submitted and not yet yielded
+        yield the result of each op in order, as transact().
+        The ops are taken from the iterable only to fill the window, the
+        bus works on them while the results before are used.
+
+        usage:
+        for val in driver.stream((phy, reg) for reg in range(32)):
+            ...
+        """
+        ops = iter(ops)
+        chunk = self.STREAM_CHUNK or max(window // 2, 1)
+        mine = deque()
+        queued = 0
+        while True:
+            with self._lock:
+                while queued < window:
+                    batch = list(itertools.islice(
+                        ops, min(chunk, window - queued)))
+                    if not batch:
+                        break
+                    # the page of the ops after them is the one they
+                    # write, even before they are collected
+                    self._track_ops(batch)
+                    try:
+                        handle = self._submit(batch)
+                    except BaseException:
+                        self._forget_ops(batch)
+                        raise
+                    entry = [batch, handle, None]
+                    self._inflight.append(entry)
+                    mine.append(entry)
+                    queued += len(batch)
+
+                if not mine:
+                    return
+                entry = mine.popleft()
+                if entry[2] is None:
+                    self._drain(until = entry)
+                batch, _, res = entry
+                self._store_ops(batch, res)
+            queued -= len(batch)
+            for val in res:
+                yield val
+
+    def read_many(self, regs):
+        """
+        regs: [(phy, reg), ...]
+        """
+        return self.transact([(phy, reg) for phy, reg in regs])
+
+    def write_many(self, regs):
+        """
+        regs: [(phy, reg, val), ...]
+        """
+        return self.transact([(phy, reg, val) for phy, reg, val in regs])
+
+    # asyncio
+    async def arun(self, fn, *args, **kw):
+        """
+        await fn(*args, **kw), run on the worker of this device
+        """
+        # not imported with the module, a running loop has it already
+        import asyncio
+        return await asyncio.wrap_future(self.worker().submit(fn, *args, **kw))
+
+    async def atransact(self, ops):
+        """
+        The coroutine of transact(). The ops of all atransact() awaited
+        before the worker gets to them are merged into one transact().
+        """
+        import asyncio
+        from concurrent.futures import Future
+        ops = list(ops)
+        future = Future()
+        with self._abatch_lock:
+            self._abatch.append((ops, future))
+            if len(self._abatch) == 1:
+                self.worker().submit(self._aflush)
+        return await asyncio.wrap_future(future)
+
+    async def aread(self, phy, reg):
+        return (await self.atransact([(phy, reg)]))[0]
+
+    async def awrite(self, phy, reg, val):
+        return (await self.atransact([(phy, reg, val)]))[0]
+
+    def _aflush(self):
+        with self._abatch_lock:
+            batch, self._abatch = self._abatch, list()
+        # drop the cancelled ones
+        batch = [(ops, future) for ops, future in batch
+                 if future.set_running_or_notify_cancel()]
+
+        ops = list()
+        for each, _ in batch:
+            ops += each
+        try:
+            res = self.transact(ops)
+        except BaseException as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for each, future in batch:
+            future.set_result(res[offset:offset + len(each)])
+            offset += len(each)
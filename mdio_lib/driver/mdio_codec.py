@@ -0,0 +1,110 @@
+"""
+MDIO frame codec shared by the dongles.
+
+One frame on the wire is 8 bytes, msb first:
+    PRE(32 ones) ST(2) OP(2) PHYAD(5) REGAD(5) TA(2) DATA(16)
+The two header bytes of every (code, phy, reg) are computed once, where
+code is ST and OP:
+    0x5/0x6 clause 22 write/read
+    0x0/0x1/0x3 clause 45 address/write/read
+
+FrameCodec precomputes the whole frame of every (op, phy, reg) of clause
+22, wrapped with the bytes a dongle needs around it, and packs a batch of
+ops into one bytearray by slice assignment.
+"""
+
+PREAMBLE = b"\xff" * 4
+# preamble(4) + header(2) + data(2)
+FRAME_SIZE = 8
+# offset of the data in a frame
+FRAME_DATA = 6
+
+C22_WRITE = 0x5
+C22_READ  = 0x6
+C45_ADDR  = 0x0
+C45_WRITE = 0x1
+C45_READ  = 0x3
+
+CODES = [C22_WRITE, C22_READ, C45_ADDR, C45_WRITE, C45_READ]
+
+# the data of a read frame, the line is released for the target
+IDLE = b"\xff\xff"
+
+
+def _header(code, phy, reg):
+    # TA is 10, a read target drives the 0
+    return bytes([((code << 4) | (phy >> 1)) & 0xff,
+                  ((phy << 7) | (reg << 2) | 0x2) & 0xff])
+
+
+# {code: [header of (phy << 5 | reg), ...]}
+HEADERS = dict((code, [_header(code, i >> 5, i & 0x1f) for i in range(1024)])
+               for code in CODES)
+
+
+def frame(code, phy, reg, data = None):
+    """
+    return the bytes of one frame, reg is the devad of clause 45
+    """
+    head = HEADERS[code][((phy & 0x1f) << 5) | (reg & 0x1f)]
+    if data is None:
+        return PREAMBLE + head + IDLE
+    return PREAMBLE + head + bytes([(data >> 8) & 0xff, data & 0xff])
+
+
+def decode(buf, count, stride = FRAME_SIZE, offset = FRAME_DATA):
+    """
+    return the data of count frames in buf, stride bytes apart
+    """
+    end = offset + stride * count
+    hi = buf[offset:end:stride]
+    lo = buf[offset + 1:end:stride]
+    return [(h << 8) | l for h, l in zip(hi, lo)]
+
+
+class FrameCodec(object):
+    """
+    Clause 22 frames, each wrapped with the head and tail bytes of a dongle.
+
+    usage:
+    codec = FrameCodec()
+    buf = codec.pack([(phy, reg), (phy, reg, val)])
+    """
+    def __init__(self, read_head = b"", write_head = b"", tail = b""):
+        assert(len(read_head) == len(write_head))
+        self.size = len(read_head) + FRAME_SIZE + len(tail)
+        # offset of the data of a frame in its wrapped bytes
+        self.data_at = len(read_head) + FRAME_DATA
+
+        self._read = [read_head + PREAMBLE + h + IDLE + tail
+                      for h in HEADERS[C22_READ]]
+        self._write = [write_head + PREAMBLE + h + b"\x00\x00" + tail
+                       for h in HEADERS[C22_WRITE]]
+
+    def pack(self, ops, buf = None, pad = 0):
+        """
+        ops: [(phy, reg) | (phy, reg, val), ...]
+        Fill buf from its start, a new bytearray if buf is None or too
+        small, then pad bytes of 0xff.
+        return buf
+        """
+        size = self.size
+        total = len(ops) * size + pad
+        if buf is None or len(buf) < total:
+            buf = bytearray(total)
+
+        off = 0
+        at = self.data_at
+        for op in ops:
+            key = ((op[0] & 0x1f) << 5) | (op[1] & 0x1f)
+            if len(op) == 2:
+                buf[off:off + size] = self._read[key]
+            else:
+                buf[off:off + size] = self._write[key]
+                val = op[2]
+                buf[off + at] = (val >> 8) & 0xff
+                buf[off + at + 1] = val & 0xff
+            off += size
+        if pad:
+            buf[off:off + pad] = b"\xff" * pad
+        return buf
@@ -0,0 +1,122 @@
+from collections import deque
+
+"""
+The MDIO side of the simulated dongles: a register file and a slave that
+decodes the frames from the bits clocked on the MDIO line.
+"""
+
+
+class RegFile(object):
+    """
+    Clause 22 registers, all zero at start. Any object with the same
+    read/write, such as a mdio driver, can replace it.
+    """
+    def __init__(self):
+        self._regs = dict()
+
+    def read(self, phy, reg):
+        return self._regs.get((phy, reg), 0)
+
+    def write(self, phy, reg, val):
+        self._regs[(phy, reg)] = val
+        return val
+
+
+class MdioSlave(object):
+    """
+    Decode the MDIO frames bit by bit:
+        PRE(32 ones) ST(2) OP(2) PHYAD(5) REGAD/DEVAD(5) TA(2) DATA(16)
+    ST = 01: clause 22, OP = 01 write, 10 read
+    ST = 00: clause 45, OP = 00 address, 01 write, 11 read, 10 read and
+             increase the address
+    """
+    PREAMBLE = 32
+    HEADER = 14
+    FRAME = 32
+
+    def __init__(self, regfile):
+        self.regfile = regfile
+        # {(prtad, devad): reg}, the address and data of clause 45
+        self.mmd_addr = dict()
+        self.mmd = dict()
+        self._ones = 0
+        self._frame = None
+        self._drive = None
+
+    @staticmethod
+    def _bits2int(bits):
+        val = 0
+        for b in bits:
+            val = (val << 1) | b
+        return val
+
+    def _header(self):
+        f = self._frame
+        st, op = self._bits2int(f[0:2]), self._bits2int(f[2:4])
+        phy, reg = self._bits2int(f[4:9]), self._bits2int(f[9:14])
+
+        data = None
+        if st == 0b01 and op == 0b10:
+            data = self.regfile.read(phy, reg)
+        elif st == 0b00 and op in (0b11, 0b10):
+            key = (phy, reg)
+            addr = self.mmd_addr.get(key, 0)
+            data = self.mmd.get(key + (addr,), 0)
+            if op == 0b10:
+                self.mmd_addr[key] = (addr + 1) & 0xffff
+
+        if data is not None:
+            # TA: Z, 0
+            self._drive = deque([1, 0] + [(data >> (15 - i)) & 1 for i in range(16)])
+
+    def _finish(self):
+        f = self._frame
+        st, op = self._bits2int(f[0:2]), self._bits2int(f[2:4])
+        phy, reg = self._bits2int(f[4:9]), self._bits2int(f[9:14])
+        data = self._bits2int(f[16:32])
+
+        if st == 0b01 and op == 0b01:
+            self.regfile.write(phy, reg, data)
+        elif st == 0b00 and op == 0b00:
+            self.mmd_addr[(phy, reg)] = data
+        elif st == 0b00 and op == 0b01:
+            key = (phy, reg)
+            self.mmd[key + (self.mmd_addr.get(key, 0),)] = data
+
+    def clock(self, mosi):
+        """
+        return the level of MISO of this bit
+        """
+        if self._frame is None:
+            if mosi:
+                self._ones += 1
+            else:
+                if self._ones >= self.PREAMBLE:
+                    self._frame = [0]
+                self._ones = 0
+            return mosi
+
+        miso = mosi
+        if self._drive:
+            miso = mosi & self._drive.popleft()
+        self._frame.append(mosi)
+
+        if len(self._frame) == self.HEADER:
+            self._header()
+        elif len(self._frame) == self.FRAME:
+            self._finish()
+            self._frame = None
+            self._drive = None
+        return miso
+
+    def shift(self, data):
+        """
+        clock the bytes of data out msb first, return the bytes read in
+        """
+        out = bytearray()
+        for byte in data:
+            val = 0
+            for i in range(7, -1, -1):
+                val |= self.clock((byte >> i) & 1) << i
+            out.append(val)
+        return out
@@ -0,0 +1,136 @@
+from .driver import Driver, DriverException
+
+
+class DriverPool(object):
+    """
+    Many dongles, each wired to its own stream FPGA board. Every device is
+    opened once and owns one IoWorker thread, map() runs a function on all
+    boards at the same time, so N boards take about the time of one.
+
+    usage:
+    with DriverPool.discover() as pool:
+        fpgas = pool.equip("mdio", "reg_fields", phy = 0)
+        vers = pool.map(lambda fpga: fpga.get_chip_ver(), fpgas)
+
+    pool = DriverPool(["ftdi://FT1234", "mcp2210://sim"])
+    """
+
+    def __init__(self, urls, cs = 3):
+        """
+        urls: the drivers of the devices
+        cs: the chip select of the board behind a mcp2210
+        """
+        self.urls = list(urls)
+        self.cs = cs
+        self.drivers = list()
+        self.boards = list()
+
+    @staticmethod
+    def enumerate():
+        """
+        return the urls of all attached FTDI and MCP2210 dongles
+        """
+        urls = list()
+        for name, decode in (("ftdi", lambda serial: serial.decode("ascii")),
+                             ("mcp2210", lambda path: path)):
+            try:
+                devices = Driver.get_class(name).list_devices()
+            except (ImportError, OSError):
+                # the library of the dongle is not installed
+                continue
+            urls += ["{}://{}".format(name, decode(dev)) for dev in devices]
+        return urls
+
+    @classmethod
+    def discover(cls, cs = 3):
+        return cls(cls.enumerate(), cs)
+
+    @staticmethod
+    def _gather(futures):
+        """
+        wait all futures, return their results or raise the first error
+        """
+        res = list()
+        err = None
+        for future in futures:
+            try:
+                res.append(future.result())
+            except Exception as e:
+                err = err or e
+                res.append(None)
+        if err is not None:
+            raise err
+        return res
+
+    @staticmethod
+    def _worker(board):
+        # a driver, or an interface equipped on one
+        get_driver = getattr(board, "get_driver", None)
+        drv = get_driver() if get_driver is not None else board
+        return drv.worker()
+
+    def open(self):
+        for url in self.urls:
+            drv = Driver.find(url)
+            if drv is None:
+                raise DriverException("Can not create driver {}".format(url))
+            self.drivers.append(drv)
+
+        # each device is opened by its own worker, once for the process
+        futures = [drv.worker().submit(Driver.acquire, drv)
+                   for drv in self.drivers]
+        try:
+            self._gather(futures)
+        except Exception:
+            for drv, future in zip(self.drivers, futures):
+                if future.exception() is None:
+                    Driver.release(drv)
+            self.drivers = list()
+            raise
+
+        # the device behind a mcp2210 is on a chip select
+        self.boards = [drv.target(self.cs) for drv in self.drivers]
+        return self
+
+    def close(self):
+        drivers, self.drivers, self.boards = self.drivers, list(), list()
+        workers = [drv.worker() for drv in drivers]
+        futures = [worker.submit(Driver.release, drv)
+                   for drv, worker in zip(drivers, workers)]
+        try:
+            self._gather(futures)
+        finally:
+            # the last release stops the worker it runs on
+            for drv, worker in zip(drivers, workers):
+                drv.stop_worker()
+                worker.join()
+
+    def equip(self, *names, phy = None):
+        """
+        return the interfaces names equipped on each board
+        """
+        from ..interface import Interface
+        targets = [Interface.equip(board, *names) for board in self.boards]
+        if phy is not None:
+            for target in targets:
+                target.config_phyid(phy)
+        return targets
+
+    def map(self, fn, boards = None):
+        """
+        Run fn(board) for each board on the worker of its device, all at
+        the same time.
+        return [result, ...] in the order of boards
+        """
+        boards = self.boards if boards is None else boards
+        return self._gather([self._worker(board).submit(fn, board)
+                             for board in boards])
+
+    def __len__(self):
+        return len(self.boards)
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
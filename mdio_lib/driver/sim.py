@@ -0,0 +1,255 @@
+import time
+import random
+
+from .mdio import MdioBase
+from .driver import Driver
+
+
+class SimFault(Exception): pass
+
+
+class UsbModel(object):
+    """
+    Time of the bus round trips of a dongle, in seconds.
+    """
+    # bits clocked for one mdio frame
+    FRAME_BITS = 64
+    # ops carried by one round trip of transact(), None for no limit
+    OPS_PER_TRIP = None
+    MDC = 1e6
+
+    def __init__(self, mdc = None, latency = None):
+        self.mdc = mdc or self.MDC
+
+    def wire(self, nops):
+        return nops * self.FRAME_BITS / self.mdc
+
+    def trip(self, nops, nread):
+        raise NotImplementedError
+
+
+class Mcp2210Model(UsbModel):
+    """
+    Full speed HID, the interrupt endpoints are polled every 1ms frame:
+    the command report goes out in one frame, the response in the next.
+    """
+    USB_FRAME = 1e-3
+    # preamble(32) + frame(32)
+    FRAME_BITS = 64
+    OPS_PER_TRIP = 7
+    # the spi bit rate of CMD_CFG
+    MDC = 500e3
+
+    def trip(self, nops, nread):
+        return 2 * self.USB_FRAME
+
+
+class FtdiModel(UsbModel):
+    """
+    High speed bulk endpoints with 125us micro frames. The chip keeps a
+    short read packet until its latency timer expires.
+    """
+    USB_FRAME = 125e-6
+    # the read data of one usb packet, 2 of 512 bytes are the modem status
+    PACKET_DATA = 510
+    LATENCY = 16e-3
+    # 10 bytes for one mdio22 frame
+    FRAME_BITS = 80
+    # 60MHz / ((1 + divisor 0x0d) * 2), 3 phase clocking takes 2/3 of it
+    MDC = 60e6 / ((1 + 0x0d) * 2) * 2 / 3
+
+    def __init__(self, mdc = None, latency = None):
+        UsbModel.__init__(self, mdc)
+        self.latency = self.LATENCY if latency is None else latency
+
+    def trip(self, nops, nread):
+        t = self.USB_FRAME
+        if nread:
+            t += self.USB_FRAME
+            if (nread * self.FRAME_BITS // 8) % self.PACKET_DATA:
+                t += self.latency
+        return t
+
+
+@Driver.register("sim")
+class SimMdio(MdioBase):
+    HELP = "\n".join([
+        "Latency and fault model of a dongle, over any other driver.",
+        "URL: sim://opts@url",
+        "  opts ::= Nil | opt[,opt]",
+        "  opt ::= mcp2210 | ftdi | mdc=Hz | latency=ms | jitter=Float",
+        "        | short=Float | busy=Float | seed=Int | realtime | strict",
+        "  mcp2210/ftdi: the usb model, mcp2210 by default",
+        "  mdc: the clock of the mdio frames",
+        "  latency: the latency timer of ftdi, 16ms by default",
+        "  jitter: the random extra time of a round trip, in its ratio",
+        "  short/busy: the rate of short reads/busy statuses, the",
+        "      round trip is repeated, or SimFault is raised if strict",
+        "  realtime: sleep the modeled time, else only account it",
+        "e.g. sim://ftdi,latency=2,jitter=0.1@fake://0,sim",
+    ])
+
+    MODELS = {
+        "mcp2210": Mcp2210Model,
+        "ftdi": FtdiModel,
+    }
+
+    def _parse_args(self, url):
+        args = url.split("://", 1)[-1]
+        opts, _, inner = args.partition("@")
+        if not inner:
+            raise SimFault("No driver to simulate", url)
+
+        kw = dict()
+        for opt in filter(None, opts.split(",")):
+            key, _, val = opt.partition("=")
+            kw[key] = val
+
+        model = "mcp2210"
+        for name in self.MODELS:
+            if name in kw:
+                model = name
+        latency = kw.get("latency", None)
+        if latency is not None:
+            latency = float(latency) / 1000
+        mdc = kw.get("mdc", None)
+        self.model = self.MODELS[model](
+            mdc = float(mdc) if mdc else None, latency = latency)
+
+        self.jitter = float(kw.get("jitter", 0))
+        self.short = float(kw.get("short", 0))
+        self.busy = float(kw.get("busy", 0))
+        self.realtime = "realtime" in kw
+        self.strict = "strict" in kw
+        self._rand = random.Random(kw.get("seed", None))
+
+        self.inner = Driver.find(inner)
+        if self.inner is None:
+            raise SimFault("Unknow driver", inner)
+        self.stats_clean()
+
+    def __getattr__(self, name):
+        # the special methods of the inner driver, such as dev_sel
+        inner = self.__dict__.get("inner", None)
+        if inner is None:
+            raise AttributeError(name)
+        return getattr(inner, name)
+
+    def target(self, cs):
+        """
+        return the driver of the device on chip select cs of the inner
+        driver, its ops go through the model of this dongle
+        """
+        inner = self.inner.target(cs)
+        if inner is self.inner:
+            return self
+        return SimTarget(self, inner)
+
+    def stats_clean(self):
+        self._stats = dict(ops = 0, trips = 0, short = 0, busy = 0,
+                           elapsed = 0.0)
+
+    def stats(self):
+        """
+        return dict of the modeled ops, round trips, faults and time
+        """
+        s = dict(self._stats)
+        s["ops_per_s"] = s["ops"] / s["elapsed"] if s["elapsed"] else 0.0
+        return s
+
+    def _fault(self, kind, rate):
+        if not rate or self._rand.random() >= rate:
+            return False
+        self._stats[kind] += 1
+        if self.strict:
+            raise SimFault("Injected {}".format(kind))
+        return True
+
+    def _trip(self, nops, nread):
+        t = self.model.trip(nops, nread) + self.model.wire(nops)
+        # repeated until the dongle is not busy and the read is complete
+        while self._fault("busy", self.busy) or \
+                (nread and self._fault("short", self.short)):
+            t += self.model.trip(nops, nread)
+            self._stats["trips"] += 1
+        if self.jitter:
+            t *= 1 + self._rand.uniform(0, self.jitter)
+
+        self._stats["trips"] += 1
+        self._stats["elapsed"] += t
+        if self.realtime:
+            time.sleep(t)
+
+    def _account(self, ops):
+        self._stats["ops"] += len(ops)
+        per_trip = self.model.OPS_PER_TRIP or len(ops)
+        for i in range(0, len(ops), per_trip):
+            chunk = ops[i:i + per_trip]
+            self._trip(len(chunk), sum(1 for op in chunk if self.is_read_op(op)))
+
+    def open(self):
+        self.inner.open()
+
+    def close(self):
+        self.inner.close()
+
+    def _read(self, phy, reg):
+        self._account([(phy, reg)])
+        return self.inner.read(phy, reg)
+
+    def _write(self, phy, reg, val):
+        self._account([(phy, reg, val)])
+        return self.inner.write(phy, reg, val)
+
+    def _transact(self, ops):
+        self._account(ops)
+        return self.inner.transact(ops)
+
+
+class SimTarget(MdioBase):
+    """
+    The device on one chip select of a SimMdio, see SimMdio.target(). It
+    shares the bus lock, the IoWorker, the model and the stats of the
+    SimMdio.
+    """
+    HELP = "The device on one chip select, see SimMdio.target()"
+
+    def __init__(self, sim, inner):
+        self.sim = sim
+        self.inner = inner
+        super().__init__("sim://")
+        self._lock = sim.lock()
+
+    def _parse_args(self, url):
+        pass
+
+    def __getattr__(self, name):
+        # the special methods of the inner target, such as cs
+        inner = self.__dict__.get("inner", None)
+        if inner is None:
+            raise AttributeError(name)
+        return getattr(inner, name)
+
+    def worker(self):
+        return self.sim.worker()
+
+    def stats(self):
+        return self.sim.stats()
+
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def _read(self, phy, reg):
+        self.sim._account([(phy, reg)])
+        return self.inner.read(phy, reg)
+
+    def _write(self, phy, reg, val):
+        self.sim._account([(phy, reg, val)])
+        return self.inner.write(phy, reg, val)
+
+    def _transact(self, ops):
+        self.sim._account(ops)
+        return self.inner.transact(ops)
@@ -0,0 +1,148 @@
+import time
+from ..interface.regmap.reg_parser import RegCSVParser
+from ..interface.fields import get_csv_path
+
+
+class StreamSim(object):
+    """
+    Model of the stream FPGA behind one phy address.
+    - The registers start with the defaults of regfile.csv.
+    - The RD fields can not be written, REG_PAGE selects the page.
+    - While tx*_enable is set and tx*_suspend is not, port n sends packets
+      of length_init bytes with phy*_ipg bytes between them. The ports are
+      cross connected, tx1 is counted by rx2 and tx2 by rx1.
+    - In fixed count mode(tx*_mode = 0) port n stops after pkt_count packets
+      and sets tx*_done.
+    - phy*_count_clr holds the counters of port n at zero.
+    """
+    REG_PAGE = 31
+
+    # bit/s of each port
+    LINE_RATE = 1e9
+    # preamble + sfd
+    PREAMBLE = 8
+
+    __parser = None
+
+    @classmethod
+    def _parser(cls):
+        if cls.__parser is None:
+            cls.__parser = RegCSVParser(get_csv_path("regfile.csv"))
+        return cls.__parser
+
+    def __init__(self, clock = time.monotonic):
+        parser = self._parser()
+        self._clock = clock
+        self._last = clock()
+        self._page = 0
+
+        self._fields = dict()
+        self._regs = dict()
+        self._wmask = dict()
+        for f in parser.functions():
+            self._fields[f.name] = f
+            self._regs[f.addr] = self._regs.get(f.addr, 0) | \
+                ((f.default << f.shift) & f.bitmask)
+            if f.readonly is not True:
+                self._wmask[f.addr] = self._wmask.get(f.addr, 0) | f.bitmask
+            else:
+                self._wmask.setdefault(f.addr, 0)
+
+        # {addr: (name, word from the most significant one)}
+        self._counter_words = dict()
+        self._counters = dict()
+        for c in parser.composites():
+            if c.readonly is not True:
+                continue
+            self._counters[c.name] = 0
+            for i, part in enumerate(c.parts):
+                self._counter_words[part.addr] = (c.name, len(c.parts) - 1 - i)
+
+        # packets sent by each port since it was enabled
+        self._sent = {1: 0, 2: 0}
+        self._frac = {1: 0.0, 2: 0.0}
+
+    def field(self, name):
+        f = self._fields[name]
+        return (self._regs.get(f.addr, 0) & f.bitmask) >> f.shift
+
+    def _set_field(self, name, val):
+        f = self._fields[name]
+        old = self._regs.get(f.addr, 0) & ~f.bitmask
+        self._regs[f.addr] = old | ((val << f.shift) & f.bitmask)
+
+    def counter(self, name):
+        return self._counters[name]
+
+    def _count(self, port, name, n):
+        if not self.field("phy{}_count_clr".format(port)):
+            self._counters[name] += n
+
+    def advance(self):
+        now = self._clock()
+        dt = now - self._last
+        self._last = now
+
+        for port in (1, 2):
+            tx = "tx{}".format(port)
+            if not self.field(tx + "_enable") or self.field(tx + "_suspend"):
+                continue
+            if self.field(tx + "_done"):
+                continue
+
+            nbytes = (self.field("length_init") + self.PREAMBLE +
+                      self.field("phy{}_ipg".format(port)))
+            self._frac[port] += dt * self.LINE_RATE / (8 * max(nbytes, 1))
+            n = int(self._frac[port])
+            self._frac[port] -= n
+
+            # fixed count of pkts
+            if self.field(tx + "_mode") == 0:
+                total = ((self.field("pkt_count_hi") << 32) |
+                         (self.field("pkt_count_mi") << 16) |
+                         self.field("pkt_count_lo"))
+                if self._sent[port] + n >= total:
+                    n = max(total - self._sent[port], 0)
+                    self._frac[port] = 0.0
+                    self._set_field(tx + "_done", 1)
+
+            self._sent[port] += n
+            peer = 3 - port
+            self._count(port, "tx{}_count".format(port), n)
+            self._count(peer, "rx{}_count".format(peer), n)
+
+    def read(self, reg):
+        if reg == self.REG_PAGE:
+            return self._page
+
+        self.advance()
+        addr = (self._page << 5) | reg
+        word = self._counter_words.get(addr, None)
+        if word is not None:
+            name, idx = word
+            return (self._counters[name] >> (16 * idx)) & 0xffff
+        return self._regs.get(addr, 0)
+
+    def write(self, reg, val):
+        if reg == self.REG_PAGE:
+            self._page = val
+            return
+
+        # the packets before this write are sent with the old config
+        self.advance()
+        addr = (self._page << 5) | reg
+        enabled = [self.field("tx{}_enable".format(p)) for p in (1, 2)]
+
+        mask = self._wmask.get(addr, 0xffff)
+        self._regs[addr] = (self._regs.get(addr, 0) & ~mask) | (val & mask)
+
+        for port in (1, 2):
+            # start a new run
+            if not enabled[port - 1] and self.field("tx{}_enable".format(port)):
+                self._sent[port] = 0
+                self._frac[port] = 0.0
+                self._set_field("tx{}_done".format(port), 0)
+
+            if self.field("phy{}_count_clr".format(port)):
+                for name in ("tx{}_count", "rx{}_count", "rx{}_crc_err"):
+                    self._counters[name.format(port)] = 0
@@ -0,0 +1,74 @@
+import queue
+import itertools
+import threading
+
+
+class IoWorker(threading.Thread):
+    """
+    One thread owns the bus of a device, all commands are queued to it.
+    Commands with a lower priority value run first, the ones with the same
+    priority run in order. A running command is never interrupted.
+
+    usage:
+    worker = IoWorker("mcp2210")
+    worker.start()
+    future = worker.submit(target.get_chip_ver)
+    future.result()
+    """
+    PRIO_USER = 0
+    PRIO_POLL = 10
+
+    __STOP = object()
+
+    def __init__(self, name = None):
+        super().__init__(name = name, daemon = True)
+        self._queue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        # set when the worker has stopped, no command runs after
+        self._stopped = False
+        self._stop_lock = threading.Lock()
+        # concurrent.futures pulls in logging, it is left out of the import
+        # of mdio_lib until a worker is made
+        from concurrent.futures import Future
+        self._future = Future
+
+    def submit(self, fn, *args, priority = PRIO_USER, **kw):
+        """
+        return concurrent.futures.Future of fn(*args, **kw)
+        """
+        future = self._future()
+        with self._stop_lock:
+            if self._stopped:
+                raise RuntimeError("{} is stopped".format(self.name))
+            self._queue.put((priority, next(self._seq), future, fn, args, kw))
+        return future
+
+    def stop(self):
+        # after the queued commands, and the ones submitted until it stops
+        self._queue.put((float("inf"), next(self._seq),
+                         None, self.__STOP, None, None))
+
+    def pending(self):
+        return self._queue.qsize()
+
+    def run(self):
+        while True:
+            _, _, future, fn, args, kw = self._queue.get()
+            if fn is self.__STOP:
+                with self._stop_lock:
+                    self._stopped = True
+                # submitted while the stop was taken
+                while not self._queue.empty():
+                    future = self._queue.get()[2]
+                    if future is not None:
+                        future.cancel()
+                break
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                res = fn(*args, **kw)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(res)
@@ -4,6 +4,23 @@ from .mdio import *
 from .raw import *
 from .sram_loader import *
 from .sram_loader_tiny import *
-from .reg import *
+
+# the register map of reg_fields is parsed when its class is created, so
+# it is imported at the first equip() of reg_fields
+Interface.register_lazy("reg_fields", __name__ + ".reg")
+
+# the names of reg, as they were imported with the package
+_REG_NAMES = ["RegFields", "RegFunctionCreatorImpl", "RegCSVParser",
+              "FieldsCreatorBase", "FieldsBase", "FieldsDumper",
+              "get_csv_path"]
+
+
+def __getattr__(name):
+    if name in _REG_NAMES:
+        from . import reg
+        return getattr(reg, name)
+    raise AttributeError(
+        "module {!r} has no attribute {!r}".format(__name__, name))
+
 
 __all__ = ["Interface"]
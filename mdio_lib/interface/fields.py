@@ -1,7 +1,5 @@
 import os
 import re
-import inspect
-import datetime
 from six import with_metaclass
 
 def get_csv_path(name):
@@ -28,6 +26,8 @@ class FunctionConstructor(type):
       `.regmap.CSVParserBase`
     - optional: The __ATTACH__ attatches some extra informations.
         def attach(cls, name, base, attrs, flist): pass
+    - optional: if the __PARSER__ has composites(), the __CREATOR__ must have
+      create_composites(clist).
 
     Note:
     - This is the metaclass of FieldsBase.
@@ -60,6 +60,11 @@ class FunctionConstructor(type):
         funcs = creator.create_functions(flist)
         attrs = cls.merge_dict(attrs, funcs)
 
+        # Calling creator for the fields across many registers
+        if parser is not None and hasattr(parser, "composites"):
+            funcs = creator.create_composites(parser.composites())
+            attrs = cls.merge_dict(attrs, funcs)
+
         if attach is not None:
             attach(cls, name, bases, attrs, flist)
 
@@ -156,6 +161,34 @@ class FieldsCreatorBase(FunctionCreatorBase):
         funcs[name] = func
         return funcs
 
+    def create_composites(self, clist):
+        """
+        @clist: list of CSVComposite(.regmap.csv_parser.CSVComposite)
+        """
+        d = dict()
+        for c in clist:
+            d.update(self._create_one_composite(c))
+        return d
+
+    def _create_composite_getter(self, composite):
+        raise NotImplementedError
+
+    def _create_composite_setter(self, composite):
+        raise NotImplementedError
+
+    def _create_one_composite(self, composite):
+        funcs = dict()
+        name, func = self._create_composite_getter(composite)
+        funcs[name] = func
+
+        if composite.readonly is not True:
+            name, func = self._create_composite_setter(composite)
+            funcs[name] = func
+
+        name, func = self._create_doc(composite)
+        funcs[name] = func
+        return funcs
+
 
 class FieldsDumper:
     """
@@ -266,12 +299,15 @@ class FieldsDumper:
 
     @classmethod
     def __format_additional_code(cls):
+        # inspect and datetime are only for the dumper, not the import
+        import inspect
         manual = getattr(cls, "MANUAL_PATTERN", [])
         return [inspect.getsource(getattr(cls, func))
                 for func in manual]
 
     @classmethod
     def __format_header(cls):
+        import datetime
         today = datetime.date.today().strftime("%Y %b %d")
         header = (
         "class {0}(object):\n" +
@@ -282,6 +318,7 @@ class FieldsDumper:
 
     @classmethod
     def __funcode(cls, func_dict, func_name):
+        import inspect
         func = getattr(cls, func_name)
         code = inspect.getsource(func)
         code = cls.__format_code_indent(code)
@@ -1,3 +1,5 @@
+import importlib
+
 class InterfaceException(Exception): pass
 
 
@@ -11,6 +13,9 @@ class HasDriver(object):
 
 class Interface:
     _interface_classes = {}
+    # {name: module} of the interfaces not imported yet, the module
+    # registers its interface when it is first equipped
+    _lazy_modules = {}
 
     @classmethod
     def register(cls, name, dep = None):
@@ -21,7 +26,7 @@ class Interface:
         def inner(kls):
             key = str(name).lower()
             if key in cls._interface_classes:
-                raise InterfaceException("Dubplicated interface {}".foramt(name))
+                raise InterfaceException("Dubplicated interface {}".format(name))
 
             if (dep is not None) and (type(dep) != list):
                 raise InterfaceException("Error dependency input")
@@ -30,18 +35,38 @@ class Interface:
             return kls
         return inner
 
+    @classmethod
+    def register_lazy(cls, name, module):
+        """
+        The interface name is registered by module, imported only when the
+        interface is first equipped.
+
+        usage:
+        Interface.register_lazy("name", "package.module")
+        """
+        cls._lazy_modules[str(name).lower()] = module
+
+    @classmethod
+    def _find(cls, name):
+        # (kls, dep) of name
+        if name not in cls._interface_classes and name in cls._lazy_modules:
+            importlib.import_module(cls._lazy_modules[name])
+        return cls._interface_classes[name]
+
     @classmethod
     def list(cls):
-        return cls._interface_classes.keys()
+        names = list(cls._interface_classes.keys())
+        return names + [name for name in cls._lazy_modules
+                        if name not in cls._interface_classes]
 
     @classmethod
     def equip(cls, driver, *wrapper_names):
         def find_class(name):
-            kls, _ = cls._interface_classes[name]
+            kls, _ = cls._find(name)
             return kls
 
         def find_dep(name):
-            _, dep = cls._interface_classes[name]
+            _, dep = cls._find(name)
             return dep
 
 
@@ -7,6 +7,7 @@ class Mdio(HasDriver):
     def __init__(self, driver, phy = 0x1a):
         super().__init__(driver)
         self._phy = phy
+        self._page_writes_avoided = 0
 
     def config_phyid(self, phyid):
         self._phy = phyid
@@ -14,18 +15,51 @@ class Mdio(HasDriver):
     def phyid(self):
         return self._phy
 
+    def invalidate_page(self, phy = None):
+        """
+        Forget the cached page of `phy`, or of all phys if phy is None.
+        The page is cached by the driver, for all of its users. It should
+        be called after reconnecting the driver.
+        """
+        self.get_driver().invalidate_page(phy)
+
+    def page_writes_avoided(self):
+        return self._page_writes_avoided
+
     def set_page(self, page):
-        return self.get_driver().write(self._phy, self.REG_PAGE, page)
+        driver = self.get_driver()
+        with driver.lock():
+            if driver.cached_page(self._phy) == page:
+                self._page_writes_avoided += 1
+                return page
+            # the driver keeps the page it writes
+            return driver.write(self._phy, self.REG_PAGE, page)
 
     def get_page(self):
         return self.get_driver().read(self._phy, self.REG_PAGE)
 
     def read(self, reg, page = None):
-        if page is not None:
+        driver = self.get_driver()
+        # no other user of the driver changes the page in between
+        with driver.lock():
+            if page is not None:
+                self.set_page(page)
+            return driver.read(self._phy, reg)
+
+    def page_transact(self, page, ops):
+        """
+        ops: [(phy, reg) | (phy, reg, val), ...] as driver.transact()
+        Run ops on page, no other user of the driver changes the page in
+        between.
+        """
+        driver = self.get_driver()
+        with driver.lock():
             self.set_page(page)
-        return self.get_driver().read(self._phy, reg)
+            return driver.transact(ops)
 
     def write(self, reg, val, page = None):
-        if page is not None:
-            self.set_page(page)
-        return self.get_driver().write(self._phy, reg, val)
+        driver = self.get_driver()
+        with driver.lock():
+            if page is not None:
+                self.set_page(page)
+            return driver.write(self._phy, reg, val)
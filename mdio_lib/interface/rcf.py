@@ -0,0 +1,151 @@
+import mmap
+from array import array
+
+"""
+Shared decoder of the .rcf firmware text:
+    0000000000000001
+    1000000000000110
+    ...
+Every line is one 16-bit word in binary, ended by "\n" or "\r\n".
+
+The file is memory-mapped and decoded into a compact uint16 buffer. With
+numpy all lines are decoded at once, chunk by chunk, otherwise line by line.
+The words are returned as a memoryview(format "H"), so slices of it are views
+and indexing it gives python ints.
+"""
+
+WORD_BITS = 16
+
+# lines decoded at once by numpy, keeps the temporary memory flat
+CHUNK_LINES = 1 << 16
+
+
+class RCFFormatError(ValueError): pass
+
+
+# numpy is slow to import, it is only imported by the first _np()
+_numpy = False
+
+def _np():
+    '''
+    return the numpy module, or None without numpy
+    '''
+    global _numpy
+    if _numpy is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _numpy = numpy
+    return _numpy
+
+
+def _layout(m):
+    '''
+    return (stride, nlines, terminator)
+    '''
+    if len(m) == WORD_BITS:
+        # one line without terminator
+        return WORD_BITS + 1, 1, b"\n"
+
+    term = m[WORD_BITS:WORD_BITS + 2]
+    if term[:1] == b"\n":
+        term = b"\n"
+    elif term != b"\r\n":
+        raise RCFFormatError("Line 0 must be {} bits".format(WORD_BITS))
+
+    stride = WORD_BITS + len(term)
+    nlines, rest = divmod(len(m), stride)
+    # the last line may come without terminator
+    if rest == WORD_BITS:
+        nlines += 1
+    elif rest != 0:
+        raise RCFFormatError("Lines must be {} bits".format(WORD_BITS))
+    return stride, nlines, term
+
+
+def _decode_numpy(m, stride, nlines, term):
+    # no view of the mmap may be alive when it is closed, so errors are
+    # raised after the views are released
+    np = _np()
+    buf = np.frombuffer(m, dtype=np.uint8)
+    out = np.empty(nlines, dtype=np.uint16)
+    err = None
+    for i, ch in enumerate(term):
+        if not (buf[WORD_BITS + i::stride] == ch).all():
+            err = "Lines must be {} bits".format(WORD_BITS)
+
+    for start in range(0, nlines if err is None else 0, CHUNK_LINES):
+        n = min(CHUNK_LINES, nlines - start)
+        rows = np.lib.stride_tricks.as_strided(
+            buf[start * stride:], shape=(n, WORD_BITS),
+            strides=(stride, 1), writeable=False)
+        # '0' is 0x30, '1' is 0x31
+        if not ((rows | 1) == ord("1")).all():
+            err = "Only 0 and 1 are allowed"
+            del rows
+            break
+
+        packed = np.packbits(rows == ord("1"), axis=1)
+        out[start:start + n] = (packed[:, 0].astype(np.uint16) << 8) | packed[:, 1]
+        del rows, packed
+
+    del buf
+    if err is not None:
+        raise RCFFormatError(err)
+    return out
+
+
+def _decode_python(m, stride, nlines, term):
+    out = array("H")
+    for start in range(0, len(m), stride):
+        line = m[start:start + WORD_BITS]
+        if len(line) != WORD_BITS or line.strip(b"01"):
+            raise RCFFormatError("Bad line {}".format(start // stride))
+        if m[start + WORD_BITS:start + stride] not in (term, b""):
+            raise RCFFormatError("Lines must be {} bits".format(WORD_BITS))
+        out.append(int(line, 2))
+    return out
+
+
+def rcf_load(path):
+    '''
+    return memoryview of uint16 words
+    '''
+    with open(path, "rb") as f:
+        try:
+            m = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # empty file
+            return memoryview(array("H"))
+
+    with m:
+        stride, nlines, term = _layout(m)
+        if _np() is not None:
+            words = _decode_numpy(m, stride, nlines, term)
+        else:
+            words = _decode_python(m, stride, nlines, term)
+    return memoryview(words)
+
+
+def rcf_find(words, value, start = 0, step = 1):
+    '''
+    return the first index i of words[start::step] with value, or -1
+    '''
+    heads = words[start::step]
+    np = _np()
+    if np is not None:
+        hit = np.flatnonzero(np.asarray(heads) == value)
+        return int(hit[0]) if len(hit) else -1
+
+    try:
+        return heads.tolist().index(value)
+    except ValueError:
+        return -1
+
+
+def rcf_all_equal(words, value):
+    np = _np()
+    if np is not None:
+        return bool((np.asarray(words) == value).all())
+    return all(w == value for w in words)
@@ -1,3 +1,4 @@
+from contextlib import contextmanager
 from .interface import Interface
 from .regmap.reg_parser import RegCSVParser
 from .fields import FieldsCreatorBase, FieldsBase, FieldsDumper, get_csv_path
@@ -5,30 +6,77 @@ from .fields import FieldsCreatorBase, FieldsBase, FieldsDumper, get_csv_path
 class RegFunctionCreatorImpl(FieldsCreatorBase):
     def _create_getter(self, field):
         def getter(self):
-            page = (field.addr >> 5)
-            reg = (field.addr & 0x1f)
-            res = self.read(page=page, reg=reg)
+            res = self.reg_read(field.addr)
             if res is None:
                 return None
             return (res & field.bitmask) >> field.shift
         return "get_{}".format(field.name), getter
 
     def _create_setter(self, field):
-        def setter(self, val):
-            page = (field.addr >> 5)
-            reg = (field.addr & 0x1f)
+        def setter(self, val, raw = False):
+            # Check whether bitmask is 0xffff
+            raw = raw or (field.bitmask == 0xffff)
             v = (val << field.shift) & field.bitmask
-            v_ori = self.read(page=page, reg=reg)
-            v_ori &= ~field.bitmask
-            v = v | v_ori
-            self.write(page=page, reg=reg, val=v)
+            mask = 0xffff if raw else field.bitmask
+            return self.reg_update(field.addr, mask, v)
         return "set_{}".format(field.name), setter
 
+    def _create_composite_getter(self, composite):
+        def getter(self):
+            return self.composite_read(composite)[0]
+        return "get_{}".format(composite.name), getter
+
+    def _create_composite_setter(self, composite):
+        def setter(self, val):
+            nparts = len(composite.parts)
+            with self.batch():
+                for i, part in enumerate(composite.parts):
+                    word = (val >> (16 * (nparts - 1 - i))) & 0xffff
+                    self.reg_update(part.addr, 0xffff, word)
+            return True
+        return "set_{}".format(composite.name), setter
+
     def _create_doc(self, field):
         def doc(self):
             return field.desc
         return "doc_{}".format(field.name), doc
 
+    def _create_async_getter(self, field):
+        async def getter(self):
+            res = await self.areg_read(field.addr)
+            if res is None:
+                return None
+            return (res & field.bitmask) >> field.shift
+        return "aget_{}".format(field.name), getter
+
+    def _create_async_setter(self, field):
+        async def setter(self, val, raw = False):
+            raw = raw or (field.bitmask == 0xffff)
+            v = (val << field.shift) & field.bitmask
+            mask = 0xffff if raw else field.bitmask
+            return await self.areg_update(field.addr, mask, v)
+        return "aset_{}".format(field.name), setter
+
+    def _create_async_composite_getter(self, composite):
+        async def getter(self):
+            return (await self.acomposite_read(composite))[0]
+        return "aget_{}".format(composite.name), getter
+
+    def _create_one_field(self, field):
+        funcs = super()._create_one_field(field)
+        name, func = self._create_async_getter(field)
+        funcs[name] = func
+        if field.readonly is not True:
+            name, func = self._create_async_setter(field)
+            funcs[name] = func
+        return funcs
+
+    def _create_one_composite(self, composite):
+        funcs = super()._create_one_composite(composite)
+        name, func = self._create_async_composite_getter(composite)
+        funcs[name] = func
+        return funcs
+
 @Interface.register("reg_fields", dep = ["mdio"])
 class RegFields(FieldsBase, FieldsDumper):
     __PARSER__ = RegCSVParser(get_csv_path("regfile.csv"))
@@ -37,3 +85,281 @@ class RegFields(FieldsBase, FieldsDumper):
         "^set_",
         "^get_",
     ]
+
+    # registers without any RD field, their host copies can be trusted
+    CACHEABLE_REGS = frozenset(
+        addr for addr, fields in __PARSER__.registers().items()
+        if not any(f.readonly for f in fields))
+
+    COMPOSITES = dict((c.name, c) for c in __PARSER__.composites())
+    # retries of a composite read torn by a carry
+    COMPOSITE_RETRY = 4
+
+    @staticmethod
+    def _split_addr(addr):
+        # (page, reg)
+        return (addr >> 5), (addr & 0x1f)
+
+    def _shadow(self):
+        # kept by the driver for all of its users, under its lock
+        return self.get_driver().shadow()
+
+    def _shadow_cacheable(self, addr):
+        return self.shadow_enable() and addr in self.CACHEABLE_REGS
+
+    def shadow_enable(self, b = None):
+        """
+        The shadow keeps host copies of the CACHEABLE_REGS. It is off by
+        default. The copies are kept by the driver, a write through it by
+        any interface or Raw.raw_write() drops the copy it changes. Call
+        shadow_invalidate() after the target is changed behind the driver.
+        """
+        if type(b) == bool:
+            self._shadow_on = b
+            self.shadow_invalidate()
+        return getattr(self, "_shadow_on", False)
+
+    def shadow_invalidate(self):
+        with self.get_driver().lock():
+            self._shadow().clear()
+
+    def shadow_sync(self):
+        """
+        Reload all cacheable registers from the target.
+        """
+        if not self.shadow_enable():
+            return
+
+        phy = self.phyid()
+        with self.get_driver().lock():
+            shadow = self._shadow()
+            for page, addrs in self._group_by_page(
+                    sorted(self.CACHEABLE_REGS)):
+                ops = [(phy, self._split_addr(addr)[1]) for addr in addrs]
+                vals = self.page_transact(page, ops)
+                for addr, val in zip(addrs, vals):
+                    shadow[(phy, addr)] = val
+
+    def reg_read(self, addr):
+        cacheable = self._shadow_cacheable(addr)
+        key = (self.phyid(), addr)
+        page, reg = self._split_addr(addr)
+        with self.get_driver().lock():
+            if cacheable:
+                val = self._shadow().get(key, None)
+                if val is not None:
+                    return val
+
+            val = self.read(page=page, reg=reg)
+            if cacheable and val is not None:
+                self._shadow()[key] = val
+        return val
+
+    def reg_write(self, addr, val):
+        cacheable = self._shadow_cacheable(addr)
+        key = (self.phyid(), addr)
+        page, reg = self._split_addr(addr)
+        with self.get_driver().lock():
+            # the driver drops the copy
+            self.write(page=page, reg=reg, val=val)
+            if cacheable:
+                self._shadow()[key] = val
+        return val
+
+    def reg_update(self, addr, mask, val):
+        """
+        Write the `mask` bits of register `addr`, the other bits are kept.
+        Inside batch() the update is queued until the block exits.
+        """
+        val &= mask
+        pending = getattr(self, "_batch_regs", None)
+        if pending is not None:
+            m, v = pending.get(addr, (0, 0))
+            pending[addr] = (m | mask, (v & ~mask) | val)
+            return True
+
+        # no other user of the driver writes between the read and the write
+        with self.get_driver().lock():
+            v_ori = 0 if mask == 0xffff else self.reg_read(addr)
+            if v_ori is None:
+                return False
+
+            self.reg_write(addr, (v_ori & ~mask) | val)
+        return True
+
+    # asyncio, the driver merges the ops of concurrent coroutines
+    async def areg_read(self, addr):
+        """
+        The coroutine of reg_read(). The page is written in the same
+        transaction as the read, as other coroutines may change it, the
+        driver keeps it for its other users.
+        """
+        phy = self.phyid()
+        if self._shadow_cacheable(addr):
+            with self.get_driver().lock():
+                val = self._shadow().get((phy, addr), None)
+            if val is not None:
+                return val
+
+        # not kept in the shadow, a write may come in before this
+        # coroutine resumes
+        page, reg = self._split_addr(addr)
+        _, val = await self.get_driver().atransact(
+            [(phy, self.REG_PAGE, page), (phy, reg)])
+        return val
+
+    async def areg_update(self, addr, mask, val):
+        """
+        The coroutine of reg_update(). A write of the whole register is
+        merged with the ops of other coroutines. A masked one runs as
+        reg_update() on the worker of the driver, so no other op comes
+        between its read and its write.
+        """
+        if mask != 0xffff:
+            return await self.get_driver().arun(
+                self.reg_update, addr, mask, val)
+
+        # the driver drops the copy in the shadow
+        phy = self.phyid()
+        page, reg = self._split_addr(addr)
+        await self.get_driver().atransact(
+            [(phy, self.REG_PAGE, page), (phy, reg, val & mask)])
+        return True
+
+    async def acomposite_read(self, *composites):
+        return await self.get_driver().arun(self.composite_read, *composites)
+
+    @contextmanager
+    def batch(self):
+        """
+        usage:
+        with target.batch():
+            target.set_tx1_mode(1)
+            target.set_tx2_mode(1)
+            ...
+        All set_* calls in the block are merged into one masked write per
+        register and sent when the outermost block exits. Getters still see
+        the values before the block. The queued writes are dropped if the
+        block raises.
+        """
+        depth = getattr(self, "_batch_depth", 0)
+        if depth == 0:
+            self._batch_regs = dict()
+        self._batch_depth = depth + 1
+        try:
+            yield self
+            if depth == 0:
+                with self.get_driver().lock():
+                    self._batch_flush(self._batch_regs)
+        finally:
+            self._batch_depth = depth
+            if depth == 0:
+                self._batch_regs = None
+
+    def _batch_flush(self, pending):
+        self._batch_regs = None
+        phy = self.phyid()
+
+        # fetch the bits not covered by the batch
+        vals = dict()
+        fetch = list()
+        for addr, (mask, val) in pending.items():
+            if mask == 0xffff:
+                vals[addr] = val
+                continue
+
+            v_ori = None
+            if self._shadow_cacheable(addr):
+                v_ori = self._shadow().get((phy, addr), None)
+            if v_ori is None:
+                fetch.append(addr)
+            else:
+                vals[addr] = (v_ori & ~mask) | val
+
+        for page, addrs in self._group_by_page(fetch):
+            ops = [(phy, self._split_addr(addr)[1]) for addr in addrs]
+            for addr, v_ori in zip(addrs, self.page_transact(page, ops)):
+                mask, val = pending[addr]
+                vals[addr] = (v_ori & ~mask) | val
+                if self._shadow_cacheable(addr):
+                    self._shadow()[(phy, addr)] = v_ori
+
+        for page, addrs in self._group_by_page(pending.keys()):
+            ops = [(phy, self._split_addr(addr)[1], vals[addr])
+                   for addr in addrs]
+            self.page_transact(page, ops)
+            for addr in addrs:
+                if self._shadow_cacheable(addr):
+                    self._shadow()[(phy, addr)] = vals[addr]
+
+    @classmethod
+    def _group_by_page(cls, addrs):
+        """
+        return [(page, [addr, ...]), ...], the order of addrs is kept
+        """
+        pages = dict()
+        for addr in addrs:
+            page, _ = cls._split_addr(addr)
+            pages.setdefault(page, []).append(addr)
+        return list(pages.items())
+
+    def composite_read(self, *composites):
+        """
+        Read composites in one transaction, return [value, ...].
+        Every word except the least significant one is read again after it,
+        a composite whose upper words changed was torn by a carry and is
+        read again.
+        """
+        phy = self.phyid()
+        res = [None] * len(composites)
+        todo = list(range(len(composites)))
+        for _ in range(self.COMPOSITE_RETRY):
+            if not todo:
+                break
+
+            pages = dict()
+            for idx in todo:
+                page, _ = self._split_addr(composites[idx].parts[0].addr)
+                pages.setdefault(page, []).append(idx)
+
+            vals = list()
+            todo = list()
+            for page, idxs in pages.items():
+                ops = list()
+                for idx in idxs:
+                    parts = composites[idx].parts
+                    ops += [(phy, part.addr & 0x1f) for part in parts]
+                    ops += [(phy, part.addr & 0x1f) for part in parts[:-1]]
+                vals += self.page_transact(page, ops)
+                todo += idxs
+
+            torn = list()
+            offset = 0
+            for idx in todo:
+                nparts = len(composites[idx].parts)
+                words = vals[offset:offset + nparts]
+                again = vals[offset + nparts:offset + 2 * nparts - 1]
+                offset += 2 * nparts - 1
+                if words[:-1] != again:
+                    torn.append(idx)
+                    continue
+
+                val = 0
+                for word in words:
+                    val = (val << 16) | word
+                res[idx] = val
+            todo = torn
+
+        if todo:
+            raise ValueError("composite keeps changing: {}".format(
+                ", ".join(composites[idx].name for idx in todo)))
+        return res
+
+    def get_composites(self, *names):
+        """
+        Read the composites `names`, or all of them, in one pass.
+        return {name: value}
+        """
+        names = names or sorted(self.COMPOSITES.keys())
+        composites = [self.COMPOSITES[name] for name in names]
+        return dict(zip(names, self.composite_read(*composites)))
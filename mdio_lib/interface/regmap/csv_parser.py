@@ -24,6 +24,18 @@ CSVFunction = namedtuple("CSVFunction", [
     "group", "default", "fields",
 ])
 
+"""
+A field across many registers, such as a 48-bit counter.
+@name:     the name of field
+@parts:    list of CSVFunction, from the most significant word, all in
+           one page, read in one transaction
+@readonly: if all parts are readonly
+@desc:     the description of field
+"""
+CSVComposite = namedtuple("CSVComposite", [
+    "name", "parts", "readonly", "desc",
+])
+
 class _CSVRegisterMapper(object):
     def __init__(self):
         self._func_list = []
@@ -37,6 +49,7 @@ class _CSVRegisterMapper(object):
 
 class CSVParserBase:
     CSVFunction = CSVFunction
+    CSVComposite = CSVComposite
     CSVRegisterMapper = _CSVRegisterMapper
 
     @staticmethod
@@ -75,15 +88,87 @@ class CSVParserBase:
     def _extract_internal(s):
         return s == "internal"
 
+    # word suffixes of the derived composites, from the most significant one
+    COMPOSITE_SUFFIXES = ["hi", "mi", "lo"]
+
     def __init__(self, file_path):
         self._file_path = file_path
         self._mapper = _CSVRegisterMapper()
+        self._composite_decl = []
 
     def functions(self):
         return self._mapper.func_list()
 
+    def registers(self):
+        '''
+        return {addr: [CSVFunction, ...]}
+        '''
+        regs = dict()
+        for f in self.functions():
+            regs.setdefault(f.addr, []).append(f)
+        return regs
+
     def file(self):
         return self._file_path
 
     def _set_func(self, **kw):
         self._mapper.set_func(**kw)
+
+    def _set_composite(self, name, part_names):
+        self._composite_decl.append((name, part_names))
+
+    @staticmethod
+    def _composite_word(f):
+        # a whole 16-bit register
+        return f.bitmask == 0xffff and f.shift == 0
+
+    def _new_composite(self, name, parts):
+        desc = "{} = {}".format(name, ", ".join(p.name for p in parts))
+        readonly = all(p.readonly is True for p in parts)
+        return CSVComposite(name = name, parts = parts,
+                            readonly = readonly, desc = desc)
+
+    def composites(self):
+        '''
+        return [CSVComposite, ...]
+        The declared ones come first, then the ones derived from the
+        ${name}_hi, ${name}_mi, ${name}_lo fields.
+        '''
+        fdict = dict((f.name, f) for f in self.functions())
+        used = set()
+        clist = []
+        for name, part_names in self._composite_decl:
+            parts = []
+            for pname in part_names:
+                f = fdict.get(pname, None)
+                if f is None:
+                    raise ValueError("Unknow composite part", name, pname)
+                if not self._composite_word(f):
+                    raise ValueError("Composite part must be [15:0]", pname)
+                parts.append(f)
+            if len(set(p.addr >> 5 for p in parts)) != 1:
+                raise ValueError("Composite parts must be in one page", name)
+            used.update(part_names)
+            clist.append(self._new_composite(name, parts))
+
+        declared = set(c.name for c in clist)
+        suffixes = self.COMPOSITE_SUFFIXES
+        groups = dict()
+        for f in self.functions():
+            match = re.match("^(.*)_({})$".format("|".join(suffixes)), f.name)
+            if not match or f.name in used or not self._composite_word(f):
+                continue
+            name, word = match.groups()
+            groups.setdefault(name, dict())[word] = f
+
+        for name, words in groups.items():
+            # at least the hi and lo words, all in the same page
+            if name in declared or name in fdict:
+                continue
+            if suffixes[0] not in words or suffixes[-1] not in words:
+                continue
+            parts = [words[w] for w in suffixes if w in words]
+            if len(set(p.addr >> 5 for p in parts)) != 1:
+                continue
+            clist.append(self._new_composite(name, parts))
+        return clist
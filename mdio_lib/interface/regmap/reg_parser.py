@@ -9,6 +9,7 @@ class RegCSVParser(CSVParserBase):
     __TYPE_FUNCTION  = "FUNCTION"
     __TYPE_UNKNOW    = "UNKNOW"
     __TYPE_TAG       = "TAG"
+    __TYPE_COMPOSITE = "COMPOSITE"
 
     def __init__(self, file_path):
         super().__init__(file_path)
@@ -47,6 +48,16 @@ class RegCSVParser(CSVParserBase):
         match = re.match("^\$ TAG:\s*(.*)\s*$", row[0])
         self._tag = match.group(1)
 
+    def _set_composite_row(self, row):
+        '''
+        $ COMPOSITE: name = part_hi part_mi part_lo
+        '''
+        line = " ".join(row)
+        match = re.match("^\$ COMPOSITE:\s*(\w+)\s*=\s*(.*)$", line)
+        parts = list(filter(lambda x: x != "",
+                            re.split("[\s,]+", match.group(2).lower())))
+        self._set_composite(match.group(1).lower(), parts)
+
     def _parse_csv(self):
         '''
         head_line0
@@ -68,6 +79,8 @@ class RegCSVParser(CSVParserBase):
                     self._set_row(reg, row)
                 elif row_type == self.__TYPE_TAG:
                     self._set_tag(row)
+                elif row_type == self.__TYPE_COMPOSITE:
+                    self._set_composite_row(row)
                 # else ignore
 
     def __row_type(self, row):
@@ -80,6 +93,9 @@ class RegCSVParser(CSVParserBase):
         if re.match("^\$ TAG:.*$", row[0]):
             return self.__TYPE_TAG
 
+        if re.match("^\$ COMPOSITE:.*$", row[0]):
+            return self.__TYPE_COMPOSITE
+
         s = row[1]
         if re.match("^#\s*addr.*=.*$", s):
             return self.__TYPE_HEADER
@@ -1,6 +1,7 @@
 import sys
 import time
 from .interface import Interface
+from .rcf import rcf_load, rcf_find, rcf_all_equal
 
 MAGIC_COPY = 0x8006
 MAGIC_EXECUTE = 0x4000
@@ -74,6 +75,7 @@ class RCFDecoder(object):
                 offset += self.BLOCK_SIZE
                 if o != MAGIC_COPY:
                     raise Exception("Error: sending data size must be 6")
+                # d is a view of the firmware
                 blocks.append((d, o))
 
             return blocks
@@ -96,34 +98,35 @@ class RCFDecoder(object):
         return fw
 
     def _load_firmware(self):
-        with open(self._name, "r") as f:
-            self._file = f.read()
+        self._file = rcf_load(self._name)
 
     def _split_firmware(self):
         # except end of file
-        lines = self._file.split("\n")
-        data = list(map(self.bin2int, lines))
-        assert(data[-1] == self.END_OF_FILE)
+        data = self._file
+        assert(len(data) and data[-1] == self.END_OF_FILE)
 
         fw_list = list()
 
         size = len(data)
         blk_size = self.Firmware.BLOCK_SIZE
         offset = 0
-        l = list()
         while offset + blk_size < size:
-            l.extend(data[offset:offset + blk_size])
-            offset += blk_size
-
-            if data[offset] != self.END_OF_DATA:
-                continue
-
-            pc = (data[offset + 1], data[offset + 2])
-            exec_code = data[offset + 3]
+            # END_OF_DATA follows one of the data blocks
+            k = rcf_find(data[:size - 1], self.END_OF_DATA,
+                         offset + blk_size, blk_size)
+            if k < 0:
+                break
+
+            end = offset + blk_size * (k + 1)
+            ops = data[offset + self.Firmware.DATA_SIZE:end:blk_size]
+            if not rcf_all_equal(ops, MAGIC_COPY):
+                raise Exception("Error: sending data size must be 6")
+
+            pc = (data[end + 1], data[end + 2])
+            exec_code = data[end + 3]
             assert(exec_code == MAGIC_EXECUTE)
-            fw_list.append(self.Firmware(l, pc, exec_code))
-            offset += 4
-            l = list()
+            fw_list.append(self.Firmware(data[offset:end], pc, exec_code))
+            offset = end + 4
 
         self._fw_list = fw_list
 
@@ -142,11 +145,12 @@ class SramLoader:
     DATA_BASE = 17
 
 
+    # the page is sent again if another user of the driver changed it
     def __write(self, reg, value):
-        return self.write(reg, value)
+        return self.write(reg, value, self.PAGE_LOADER)
 
     def __read(self, reg):
-        return self.read(reg)
+        return self.read(reg, self.PAGE_LOADER)
 
     def __copy_fw_to_sram(self):
         # control reg & data reg
@@ -162,10 +166,34 @@ class SramLoader:
             self.__write(creg, op)
             ret = self.__read(creg)
             if ret != 0:
-                print(data, ret)
+                print(list(data), ret)
                 raise Exception
             idx += 1
 
+    def __copy_fw_to_sram_pipelined(self, window):
+        """
+        Send `window` blocks in one driver transaction. The read-back of the
+        control register is queued after each block and all of them are
+        checked when the transaction is done.
+        """
+        creg = self._sram_target()
+        dreg = self.DATA_BASE
+        phy = self.phyid()
+        blocks = self._fw.blocks()
+        for start in range(0, len(blocks), window):
+            ops = list()
+            for data, op in blocks[start:start + window]:
+                ops += [(phy, dreg + i, data[i]) for i in range(len(data))]
+                ops.append((phy, creg, op))
+                ops.append((phy, creg))
+
+            res = self.page_transact(self.PAGE_LOADER, ops)
+            status = [res[i] for i, op in enumerate(ops) if len(op) == 2]
+            for i, ret in enumerate(status):
+                if ret != 0:
+                    print(list(blocks[start + i][0]), ret)
+                    raise Exception
+
     def __exec(self):
         # control reg & data reg
         creg = self._sram_target()
@@ -175,14 +203,28 @@ class SramLoader:
         self.__write(dreg + 1, fw.pc[1])
         self.__write(creg, fw.exec_code)
 
-    def sram_load(self):
+    def sram_load(self, window = None):
+        """
+        window: None, wait for each block before sending the next one.
+                N, keep up to N blocks in one driver transaction.
+        return the throughput in words per second.
+        """
         self.set_page(self.PAGE_LOADER)
         if not self._sram_has_firmware():
             raise Exception("You should config firmware before")
 
-        self.__copy_fw_to_sram()
+        start = time.time()
+        if window:
+            self.__copy_fw_to_sram_pipelined(window)
+        else:
+            self.__copy_fw_to_sram()
         self.__exec()
 
+        words = len(self._fw.data)
+        rate = words / max(time.time() - start, 1e-9)
+        print("sram: {} words, {:.1f} words/s".format(words, rate))
+        return rate
+
     def sram_status(self):
         self.set_page(self.PAGE_LOADER)
         status = self.__read(self._sram_target())
@@ -1,6 +1,7 @@
 import sys
 import time
 from .interface import Interface
+from .rcf import rcf_load
 
 MAGIC_COPY = 0x8006
 MAGIC_EXECUTE = 0x4000
@@ -46,14 +47,12 @@ class RCFDecoder(object):
         return self._fw
 
     def _load_firmware(self):
-        with open(self._name, "r") as f:
-            self._file = f.read()
+        self._file = rcf_load(self._name)
 
     def _split_firmware(self):
         # except end of file
-        lines = self._file.split("\n")
-        data = list(map(self.bin2int, lines))
-        assert(data[-1] == self.END_OF_FILE)
+        data = self._file
+        assert(len(data) and data[-1] == self.END_OF_FILE)
         self._fw = data[0:-1]
 
 @Interface.register("sram-loader-tiny", dep = ["mdio"])
@@ -67,11 +66,12 @@ class SramLoader:
     ADDR_CTRL = 27
     ADDR_DATA = 28
 
+    # the page is sent again if another user of the driver changed it
     def __write(self, reg, value):
-        return self.write(reg, value)
+        return self.write(reg, value, self.PAGE_LOADER)
 
     def __read(self, reg):
-        return self.read(reg)
+        return self.read(reg, self.PAGE_LOADER)
 
     def _wait_op_done(self):
         timeout = 2
@@ -96,12 +96,71 @@ class SramLoader:
             self._wait_op_done()
             print(i)
 
-    def sram_load(self):
+    def __load_fw_to_sram_pipelined(self, window):
+        """
+        Send `window` (data, ctrl) pairs in one driver transaction. Each
+        pair is followed by the two polls of ADDR_CTRL of _wait_op_done(),
+        so an op has as much bus time to finish as in the blocking path.
+        The window saves the round trip of each poll, not its bus time.
+
+        The polls are only checked when the transaction is done. A pair
+        still busy at both polls fails the load, as in the blocking path,
+        but the later pairs of its window are already written: the
+        firmware in sram is then incomplete, sram_load() has to be run
+        again from the start.
+        """
+        bins = self._fw
+        phy = self.phyid()
+        step = 2 * window
+        for start in range(0, len(bins), step):
+            ops = list()
+            for i in range(start, min(start + step, len(bins)), 2):
+                data = bins[i]
+                ctrl = bins[i+1]
+                ops.append((phy, self.ADDR_DATA, data))
+                ops.append((phy, self.ADDR_CTRL, ctrl))
+                if (ctrl == RCFDecoder.MAGIC_EXEC):
+                    break
+                ops.append((phy, self.ADDR_CTRL))
+                ops.append((phy, self.ADDR_CTRL))
+
+            res = self.page_transact(self.PAGE_LOADER, ops)
+            status = [res[i] for i, op in enumerate(ops) if len(op) == 2]
+            end = start + sum(1 for op in ops if len(op) == 3)
+            for i in range(0, len(status), 2):
+                if 0 in status[i:i + 2]:
+                    continue
+                # status i is of the pair at word start + i
+                word = start + i
+                if word + 2 < end:
+                    raise ValueError(
+                        "timeout at word {}, words {} to {} written while "
+                        "busy".format(word, word + 2, end - 1))
+                raise ValueError("timeout at word {}".format(word))
+            if ops[-1] == (phy, self.ADDR_CTRL, RCFDecoder.MAGIC_EXEC):
+                break
+
+    def sram_load(self, window = None):
+        """
+        window: None, wait for each op before sending the next one.
+                N, send up to N (data, ctrl) pairs in one driver
+                transaction.
+        return the throughput in words per second.
+        """
         self.set_page(self.PAGE_LOADER)
         if not self._sram_has_firmware():
             raise Exception("You should config firmware before")
 
-        self.__load_fw_to_sram()
+        start = time.time()
+        if window:
+            self.__load_fw_to_sram_pipelined(window)
+        else:
+            self.__load_fw_to_sram()
+
+        words = len(self._fw)
+        rate = words / max(time.time() - start, 1e-9)
+        print("sram: {} words, {:.1f} words/s".format(words, rate))
+        return rate
 
     def sram_status(self):
         self.set_page(self.PAGE_LOADER)
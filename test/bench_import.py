@@ -0,0 +1,85 @@
+import os
+import sys
+import subprocess
+
+"""
+Import time of mdio_lib, each measure in a new interpreter. The backends
+are imported at the first use of their url scheme, so the import of
+mdio_lib loads neither ctypes/libftd2xx nor hid. The register map is
+parsed at the first equip() of reg_fields.
+
+usage:
+    cd test && python bench_import.py [runs [budget_ms]]
+"""
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# modules of the backends and the register map, not imported by
+# "import mdio_lib"
+BACKENDS = ["ctypes", "hid", "asyncio", "mdio_lib.driver.ftd2xx",
+            "mdio_lib.driver.ftdi", "mdio_lib.driver.mcp2210",
+            "mdio_lib.interface.reg"]
+
+TIMED = """
+import sys, time
+t = time.perf_counter()
+{stmt}
+t = time.perf_counter() - t
+print(t * 1e3)
+print(",".join(m for m in {backends!r} if m in sys.modules))
+"""
+
+
+def measure(stmt, runs, env = None):
+    """
+    return the best ms of stmt in runs new interpreters, the backend
+    modules it has imported
+    """
+    env = dict(os.environ, **(env or {}))
+    env["PYTHONPATH"] = os.pathsep.join(
+        [ROOT] + ([env["PYTHONPATH"]] if env.get("PYTHONPATH") else []))
+    code = TIMED.format(stmt = stmt, backends = BACKENDS)
+    best = None
+    for i in range(runs):
+        out = subprocess.check_output([sys.executable, "-c", code],
+                                      env = env).decode().splitlines()
+        # the last lines, after anything printed by stmt
+        ms = float(out[-2])
+        best = ms if best is None else min(best, ms)
+    return best, [m for m in out[-1].split(",") if m]
+
+
+if __name__ == "__main__":
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    budget = float(sys.argv[2]) if len(sys.argv) > 2 else None
+    sim = {"FTD2XX_BACKEND": "sim"}
+
+    # the stdlib modules mdio_lib needs anyway
+    base, _ = measure("import threading, queue, contextlib, importlib, re, csv",
+                      runs)
+    total, loaded = measure("import mdio_lib", runs)
+    print("{:<36} {:>8.2f} ms".format("stdlib it needs", base))
+    print("{:<36} {:>8.2f} ms".format("import mdio_lib", total))
+    print("{:<36} {:>8.2f} ms".format("  of mdio_lib itself", total - base))
+    print("{:<36} {}".format("  backends loaded", loaded or "none"))
+
+    for label, stmt in (
+        ("first fake://", "import mdio_lib; mdio_lib.Driver.find('fake://0')"),
+        ("first reg_fields",
+         "import mdio_lib; mdio_lib.Interface.equip("
+         "mdio_lib.Driver.find('fake://0'), 'reg_fields')"),
+        ("first sim://",
+         "import mdio_lib; mdio_lib.Driver.find('sim://ftdi@fake://0')"),
+        ("first ftdi:// (sim backend)",
+         "import mdio_lib; mdio_lib.Driver.get_class('ftdi')"),
+        ("all backends (sim backend)",
+         "import mdio_lib; [mdio_lib.Driver.get_class(name)"
+         " for name in mdio_lib.Driver.list()]"),
+    ):
+        ms, _ = measure(stmt, runs, sim)
+        print("{:<36} {:>8.2f} ms".format(label, ms))
+
+    assert not loaded, "backends imported by mdio_lib: {}".format(loaded)
+    if budget is not None and total - base > budget:
+        print("over the budget of {} ms".format(budget))
+        sys.exit(1)
@@ -0,0 +1,98 @@
+import os
+import sys
+import timeit
+sys.path.append("../")
+# no dongle is used, nor libftd2xx
+os.environ.setdefault("FTD2XX_BACKEND", "sim")
+from mdio_lib.driver.mdio_codec import FrameCodec
+
+"""
+Time to encode the mdio frames of the dongles, the list based encoders of
+before against the precomputed frames of FrameCodec.
+
+usage:
+    cd test && python bench_mdio_codec.py [rounds]
+"""
+
+# ftdi: the mpsse commands of the mdio frames
+OP_OUT = 0x10
+OP_IO = 0x34
+
+
+def old_ftdi_frame(op):
+    if len(op) == 2:
+        phy, reg = op
+        code, data, opcode = 0x60, [0xff, 0xff], OP_IO
+    else:
+        phy, reg, val = op
+        code, data, opcode = 0x50, [val >> 8, val], OP_OUT
+    frame = [0xff, 0xff, 0xff, 0xff,
+             (0x0f & (phy >> 1)) | code,
+             (phy << 7) | (reg << 2) | 0x02] + data + [0x7f, 0x87]
+    length = len(frame) - 1
+    return [opcode, length & 0xff, (length >> 8) & 0xff] + frame
+
+
+def old_ftdi_pack(ops):
+    buf = list()
+    for op in ops:
+        buf += old_ftdi_frame(op)
+    return bytes(bytearray(map(lambda x: 0xff & x, buf)))
+
+
+def old_mcp2210_frame(op):
+    if len(op) == 2:
+        phy, reg = op
+        op_phy_reg = (0x6 << 12) | ((phy & 0x1f) << 7) | ((reg & 0x1f)  << 2) | 0x2
+        return [0xff] * 4 + [(op_phy_reg >> 8), (op_phy_reg & 0xFF)] + [0xff, 0xff]
+    else:
+        phy, reg, val = op
+        op_phy_reg = (0x5 << 12) | ((phy & 0x1f) << 7) | ((reg & 0x1f)  << 2) | 0x2
+        return [0xff] * 4 + [(op_phy_reg >> 8), (op_phy_reg & 0xFF),
+                             (val >> 8) & 0xff, val & 0xff]
+
+
+def old_mcp2210_pack(ops):
+    data = list()
+    for op in ops:
+        data += old_mcp2210_frame(op)
+    return data + [0xff] * (56 - len(data))
+
+
+FTDI = FrameCodec(read_head = bytes([OP_IO, 9, 0]),
+                  write_head = bytes([OP_OUT, 9, 0]),
+                  tail = b"\x7f\x87")
+MCP2210 = FrameCodec()
+
+
+def new_ftdi_pack(ops):
+    return bytes(FTDI.pack(ops))
+
+
+def new_mcp2210_pack(ops):
+    return MCP2210.pack(ops, pad = 56 - len(ops) * 8)
+
+
+def bench(name, fn, ops, rounds):
+    t = min(timeit.repeat(lambda: fn(ops), number = rounds, repeat = 5))
+    us = t / rounds / len(ops) * 1e6
+    print("{:<28} {:>8.3f} us/op".format(name, us))
+    return us
+
+
+if __name__ == "__main__":
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    single = [(0x1a, 0x01)]
+    batch = [(0x1a, r) for r in range(4)] + [(0x1a, r, 0xbeef) for r in range(3)]
+
+    # the same bytes on the wire
+    for ops in (single, batch):
+        assert(old_ftdi_pack(ops) == new_ftdi_pack(ops))
+        assert(bytes(old_mcp2210_pack(ops)) == bytes(new_mcp2210_pack(ops)))
+
+    for label, ops in (("1 op", single), ("batch of 7", batch)):
+        for dongle, old, new in (("ftdi", old_ftdi_pack, new_ftdi_pack),
+                                 ("mcp2210", old_mcp2210_pack, new_mcp2210_pack)):
+            a = bench("{} list, {}".format(dongle, label), old, ops, rounds)
+            b = bench("{} codec, {}".format(dongle, label), new, ops, rounds)
+            print("{:<28} {:>8.1f} x".format("", a / b))
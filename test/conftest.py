@@ -0,0 +1,58 @@
+"""
+The checks run offline against the emulators of the dongles:
+    fake://0,sim     the stream FPGA on phy 0
+    mcp2210://sim    the MCP2210 HID emulator, fake://0,sim on every pin
+    ftdi://          libftd2xx replaced by FTD2XX_BACKEND=sim
+
+usage:
+    python -m pytest test
+"""
+
+import os
+import sys
+
+# before mdio_lib.driver.ftd2xx is imported
+os.environ.setdefault("FTD2XX_BACKEND", "sim")
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import pytest
+from mdio_lib import Driver, Interface
+
+PHY = 0
+
+
+@pytest.fixture
+def fake():
+    """
+    an opened fake://0,sim, its ops are stored
+    """
+    with Driver.opened("fake://0,sim") as drv:
+        drv.store_enable(True)
+        yield drv
+
+
+@pytest.fixture
+def fpga(fake):
+    """
+    reg_fields of the stream FPGA on fake
+    """
+    return equip(fake)
+
+
+def equip(drv, *names):
+    target = Interface.equip(drv, "mdio", *(names or ("reg_fields",)))
+    target.config_phyid(PHY)
+    return target
+
+
+def ops_of(drv, cmd = None, reg = None):
+    """
+    return the stored ops of drv, [(cmd, reg), ...], only the ones of cmd
+    and reg if they are given
+    """
+    ops = list()
+    for c in drv.store_dump():
+        r = int(c.args().split("reg=")[1].split()[0], 16)
+        if (cmd is None or c.command() == cmd) and (reg is None or r == reg):
+            ops.append((c.command(), r))
+    return ops
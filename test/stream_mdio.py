@@ -6,15 +6,19 @@ from mdio_lib import Interface
 from regfile_gen import *
 
 class StreamMdio(RegAccessor):
-    def __init__(self):
-        self.driver = Driver.find("mcp2210://")
+    def __init__(self, url = "mcp2210://", cs = 3):
+        # shared with the other users of the dongle in this process
+        self.bus = Driver.acquire(url)
+        # the fpga behind chip select cs of the dongle
+        self.driver = self.bus.target(cs)
         self.target = Interface.equip(self.driver, "mdio", "sram-loader-tiny", "reg_fields")
-        self.driver.open()
-        self.driver.dev_sel(3)
         self.target.config_phyid(0)
         self.mdio = self.target
         super().__init__(self.target)
 
+    def close(self):
+        Driver.release(self.bus)
+
     def verify_spi(self):
         print(hex(self.get_chip_ver()))
 
@@ -40,59 +44,35 @@ class StreamMdio(RegAccessor):
     def tx_config_send(self):
         self.tx_count_clr()
         time.sleep(0.1)
-        self.set_tx1_mode(1)
-        self.set_tx2_mode(1)
-        self.set_length_mode(0)
-        self.set_payload_mode(0)
-        self.set_tx2_enable(1)
-        self.set_tx1_enable(1)
+        # all fields below sit in one register, write it once
+        with self.target.batch():
+            self.target.set_tx1_mode(1)
+            self.target.set_tx2_mode(1)
+            self.target.set_length_mode(0)
+            self.target.set_payload_mode(0)
+            self.target.set_tx2_enable(1)
+            self.target.set_tx1_enable(1)
 
     def set_pkt_count(self, val):
-        tx_count_hi = self.set_pkt_count_hi((val>>32)&0xffff)
-        tx_count_mi = self.set_pkt_count_mi((val>>16)&0xffff)
-        tx_count_lo = self.set_pkt_count_lo(val&0xffff)
+        self.target.set_pkt_count(val)
 
     def get_tx1_count(self):
-        tx_count_hi = self.get_tx1_count_hi()
-        tx_count_mi = self.get_tx1_count_mi()
-        tx_count_lo = self.get_tx1_count_lo()
-        tx_count = tx_count_hi*(2**32) + tx_count_mi*(2**16) + tx_count_lo
-        return tx_count
+        return self.target.get_tx1_count()
 
     def get_rx1_count(self):
-        rx_count_hi = self.get_rx1_count_hi()
-        rx_count_mi = self.get_rx1_count_mi()
-        rx_count_lo = self.get_rx1_count_lo()
-        rx_count = rx_count_hi*(2**32) + rx_count_mi*(2**16) + rx_count_lo
-        return rx_count
+        return self.target.get_rx1_count()
 
     def get_tx2_count(self):
-        tx_count_hi = self.get_tx2_count_hi()
-        tx_count_mi = self.get_tx2_count_mi()
-        tx_count_lo = self.get_tx2_count_lo()
-        tx_count = tx_count_hi*(2**32) + tx_count_mi*(2**16) + tx_count_lo
-        return tx_count
+        return self.target.get_tx2_count()
 
     def get_rx2_count(self):
-        rx_count_hi = self.get_rx2_count_hi()
-        rx_count_mi = self.get_rx2_count_mi()
-        rx_count_lo = self.get_rx2_count_lo()
-        rx_count = rx_count_hi*(2**32) + rx_count_mi*(2**16) + rx_count_lo
-        return rx_count
+        return self.target.get_rx2_count()
 
     def get_rx1_err_count(self):
-        rx_crc_hi = self.get_rx1_crc_err_hi()
-        rx_crc_mi = self.get_rx1_crc_err_mi()
-        rx_crc_lo = self.get_rx1_crc_err_lo()
-        rx_crc = rx_crc_hi*(2**32) + rx_crc_mi*(2**16) + rx_crc_lo
-        return rx_crc
+        return self.target.get_rx1_crc_err()
 
     def get_rx2_err_count(self):
-        rx_crc_hi = self.get_rx2_crc_err_hi()
-        rx_crc_mi = self.get_rx2_crc_err_mi()
-        rx_crc_lo = self.get_rx2_crc_err_lo()
-        rx_crc = rx_crc_hi*(2**32) + rx_crc_mi*(2**16) + rx_crc_lo
-        return rx_crc
+        return self.target.get_rx2_crc_err()
 
     def set_tx_enable(self, val):
         self.set_tx1_enable(val)
@@ -101,17 +81,18 @@ class StreamMdio(RegAccessor):
     def print_count(self):
         self.set_tx_enable(0)
         time.sleep(0.1)
-        print("tx1 count", hex(self.get_tx1_count()))
-        print("rx1 count", hex(self.get_rx1_count()))
-        print("rx1 crc", hex(self.get_rx1_err_count()))
-        print("tx2 count", hex(self.get_tx2_count()))
-        print("rx2 count", hex(self.get_rx2_count()))
-        print("rx2 crc", hex(self.get_rx2_err_count()))
+        counts = self.target.get_composites()
+        print("tx1 count", hex(counts["tx1_count"]))
+        print("rx1 count", hex(counts["rx1_count"]))
+        print("rx1 crc", hex(counts["rx1_crc_err"]))
+        print("tx2 count", hex(counts["tx2_count"]))
+        print("rx2 count", hex(counts["rx2_count"]))
+        print("rx2 crc", hex(counts["rx2_crc_err"]))
 
 
 if __name__ == "__main__":
-    chip = StreamMdio()
-    chip.driver.dev_sel(3)
+    # e.g. python stream_mdio.py fake://0,sim
+    chip = StreamMdio(*sys.argv[1:2])
     chip.verify_spi()
     chip.set_pkt_count(0x1234)
     chip.tx_config_send()
@@ -0,0 +1,243 @@
+import asyncio
+import threading
+
+import pytest
+from mdio_lib import Driver, DriverPool
+from mdio_lib.driver.driver import DriverException
+from conftest import PHY, equip, ops_of
+
+REG_PAGE = 31
+
+
+# the page register, cached by the driver for all of its users
+
+def test_page_written_once_for_all_users(fake):
+    a, b = equip(fake), equip(fake)
+    assert a.get_phy1_ipg() == 12
+    assert b.get_phy2_ipg() == 12
+    assert a.get_chip_ver() == 0xbeef
+    assert len(ops_of(fake, "write", REG_PAGE)) == 1
+    assert b.page_writes_avoided() == 1
+
+
+def test_page_written_behind_the_interface(fake):
+    fpga, raw = equip(fake), equip(fake, "raw")
+    assert fpga.get_chip_ver() == 0xbeef
+    raw.raw_write(PHY, REG_PAGE, 3)
+    assert fake.cached_page(PHY) == 3
+    assert fpga.get_chip_ver() == 0xbeef
+    assert fake.cached_page(PHY) == 0
+
+
+def test_page_forgotten_by_a_failed_write(fake):
+    fpga = equip(fake)
+    fpga.get_chip_ver()
+
+    def broken(phy, reg, val):
+        raise IOError("unplugged")
+    fake._write = broken
+    with pytest.raises(IOError):
+        fake.write(PHY, REG_PAGE, 3)
+    assert fake.cached_page(PHY) is None
+
+
+# the shadow registers, kept by the driver
+
+def test_shadow_reads_once(fake, fpga):
+    fpga.shadow_enable(True)
+    assert fpga.get_phy1_ipg() == 12
+    assert fpga.get_phy1_ipg() == 12
+    assert len(ops_of(fake, "read", 0x1a)) == 1
+
+
+def test_shadow_keeps_no_readonly_register(fake, fpga):
+    fpga.shadow_enable(True)
+    fpga.get_tx1_done()
+    fpga.get_tx1_done()
+    assert len(ops_of(fake, "read", 0x02)) == 2
+
+
+def test_shadow_dropped_by_any_write(fake, fpga):
+    other, raw = equip(fake), equip(fake, "raw")
+    fpga.shadow_enable(True)
+    assert fpga.get_phy1_ipg() == 12
+
+    raw.raw_write(PHY, 0x1a, 99)
+    assert fpga.get_phy1_ipg() == 99
+    other.set_phy1_ipg(7)
+    assert fpga.get_phy1_ipg() == 7
+
+
+def test_shadow_dropped_by_a_write_of_unknown_page(fake, fpga):
+    fpga.shadow_enable(True)
+    assert fpga.get_phy1_ipg() == 12
+    fake.invalidate_page(PHY)
+    fake.write(PHY, 0x1a, 99)
+    assert fpga.get_phy1_ipg() == 99
+
+
+# batch()
+
+def test_batch_merges_the_writes_of_a_register(fake, fpga):
+    with fpga.batch():
+        fpga.set_tx1_mode(1)
+        fpga.set_tx2_mode(1)
+        fpga.set_payload_mode(2)
+        # the getters see the values before the block
+        assert fpga.get_tx1_mode() == 0
+
+    assert len(ops_of(fake, "write", 0x02)) == 1
+    sim = fake.sim(PHY)
+    assert (sim.field("tx1_mode"), sim.field("tx2_mode"),
+            sim.field("payload_mode")) == (1, 1, 2)
+
+
+def test_batch_dropped_if_the_block_raises(fake, fpga):
+    with pytest.raises(KeyError):
+        with fpga.batch():
+            fpga.set_tx1_mode(1)
+            raise KeyError("abort")
+    assert ops_of(fake, "write", 0x02) == []
+    assert fpga.get_tx1_mode() == 0
+
+
+def test_batch_nested_sent_by_the_outermost(fake, fpga):
+    with fpga.batch():
+        with fpga.batch():
+            fpga.set_phy1_ipg(20)
+        assert ops_of(fake, "write", 0x1a) == []
+        fpga.set_phy2_ipg(30)
+    assert (fpga.get_phy1_ipg(), fpga.get_phy2_ipg()) == (20, 30)
+
+
+# composites
+
+def test_composite_of_its_words(fake, fpga):
+    fpga.set_pkt_count_hi(1)
+    fpga.set_pkt_count_mi(2)
+    fpga.set_pkt_count_lo(3)
+    assert fpga.get_pkt_count() == (1 << 32) | (2 << 16) | 3
+
+
+def test_composite_read_again_when_torn(fake, fpga):
+    sim = fake.sim(PHY)
+    read = sim.read
+    # tx1_count_mi carries between the two reads of the first pass
+    mi = iter([1, 2])
+    sim.read = lambda reg: next(mi, 2) if reg == 0x09 else read(reg)
+
+    tx1_count = fpga.COMPOSITES["tx1_count"]
+    assert fpga.composite_read(tx1_count) == [2 << 16]
+
+
+def test_composite_keeps_changing(fake, fpga):
+    sim = fake.sim(PHY)
+    read = sim.read
+    words = iter(range(1, 1000))
+    sim.read = lambda reg: next(words) if reg == 0x09 else read(reg)
+
+    with pytest.raises(ValueError):
+        fpga.get_tx1_count()
+
+
+# stream()
+
+def test_stream_in_order(fake):
+    ops = [(PHY, 0x1a, v) if v % 3 == 0 else (PHY, 0x1a) for v in range(30)]
+    res = list(fake.stream(ops, window = 4))
+
+    expect = list()
+    last = 12
+    for op in ops:
+        if len(op) == 3:
+            last = op[2]
+        expect.append(last)
+    assert res == expect
+
+
+def test_stream_takes_ops_to_fill_the_window(fake):
+    taken = list()
+
+    def ops():
+        for i in range(100):
+            taken.append(i)
+            yield (PHY, 0x01)
+
+    stream = fake.stream(ops(), window = 8)
+    assert next(stream) == 0xbeef
+    assert len(taken) <= 8 + 1
+
+
+def test_stream_keeps_its_place_on_the_bus(fake):
+    stream = fake.stream([(PHY, 0x1a)] * 8, window = 4)
+    assert next(stream) == 12
+    # after the ops submitted by the stream, before the ones it takes next
+    assert fake.transact([(PHY, 0x1a, 9), (PHY, 0x1a)]) == [9, 9]
+    assert list(stream) == [12, 12, 12, 9, 9, 9, 9]
+
+
+# asyncio
+
+def test_atransact_merged_while_the_worker_is_busy(fake):
+    calls = list()
+    transact = fake.transact
+    fake.transact = lambda ops: calls.append(len(ops)) or transact(ops)
+
+    gate = threading.Event()
+    fake.worker().submit(gate.wait)
+
+    async def main():
+        reads = [fake.aread(PHY, 0x01) for i in range(10)]
+        loop = asyncio.get_running_loop()
+        loop.call_soon(gate.set)
+        return await asyncio.gather(*reads)
+
+    assert asyncio.run(main()) == [0xbeef] * 10
+    assert calls == [10]
+
+
+def test_async_fields(fake, fpga):
+    async def main():
+        await fpga.aset_phy1_ipg(33)
+        return await fpga.aget_phy1_ipg(), await fpga.aget_pkt_count()
+
+    assert asyncio.run(main()) == (33, 100)
+
+
+# acquire() and release()
+
+def test_acquire_counts_references():
+    drv = Driver.find("fake://0,sim")
+    assert Driver.acquire(drv) is drv
+    assert Driver.acquire(drv) is drv
+    worker = drv.worker()
+    assert sum(Driver.acquired().values()) == 2
+
+    Driver.release(drv)
+    assert worker.is_alive()
+    Driver.release(drv)
+    assert Driver.acquired() == {}
+    assert not worker.is_alive()
+    with pytest.raises(DriverException):
+        Driver.release(drv)
+
+
+def test_urls_of_no_shared_device_are_not_shared():
+    a = Driver.acquire("fake://0,sim")
+    b = Driver.acquire("fake://0,sim")
+    try:
+        assert a is not b
+    finally:
+        Driver.release(a)
+        Driver.release(b)
+
+
+def test_pool_on_its_own_workers():
+    with DriverPool(["fake://0,sim", "fake://0,sim", "mcp2210://sim"]) as pool:
+        fpgas = pool.equip("mdio", "reg_fields", phy = PHY)
+        threads = pool.map(lambda fpga: threading.get_ident(), fpgas)
+        assert pool.map(lambda fpga: fpga.get_chip_ver(), fpgas) == [0xbeef] * 3
+        workers = [drv.worker() for drv in pool.drivers]
+    assert len(set(threads)) == 3
+    assert not any(worker.is_alive() for worker in workers)
+    assert Driver.acquired() == {}
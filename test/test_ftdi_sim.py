@@ -0,0 +1,62 @@
+import os
+
+import pytest
+from mdio_lib import Driver
+from conftest import PHY
+
+pytestmark = pytest.mark.skipif(os.environ.get("FTD2XX_BACKEND") != "sim",
+                                reason = "libftd2xx is not emulated")
+
+
+@pytest.fixture
+def ftdi(fake):
+    """
+    an opened ftdi://0, the FT232H of the emulator wired to fake
+    """
+    from mdio_lib.driver.ftd2xx import _ftd2xx_sim
+    _ftd2xx_sim.reset()
+    _ftd2xx_sim.device(0).regfile = fake
+    drv = Driver.find("ftdi://0")
+    drv.open()
+    # the short read packets are not held for 16ms
+    drv._ftdi.ftdi_apply(latency = 2)
+    yield drv
+    drv.close()
+    drv.stop_worker()
+
+
+def test_read_write(ftdi, fake):
+    assert ftdi.read(PHY, 0x01) == 0xbeef
+    ftdi.write(PHY, 0x1a, 0x1234)
+    assert fake.read(PHY, 0x1a) == 0x1234
+    assert ftdi.read(PHY, 0x1a) == 0x1234
+
+
+def test_transact(ftdi):
+    ops = [(PHY, 0x1a, 7), (PHY, 0x1a), (PHY, 0x01), (PHY, 0x1a, 9), (PHY, 0x1a)]
+    assert ftdi.transact(ops) == [7, 7, 0xbeef, 9, 9]
+
+
+def test_stream(ftdi):
+    ops = [(PHY, 0x1a, v) if v % 2 else (PHY, 0x1a) for v in range(1, 40)]
+    expect = [v if v % 2 else v - 1 for v in range(1, 40)]
+    assert list(ftdi.stream(ops, window = 8)) == expect
+
+
+def test_short_read_resyncs(ftdi):
+    ftdi.write(PHY, 0x1a, 0x1234)
+    dev = ftdi._ftdi._dev
+    read_into = dev.read_into
+    # the last bytes of the response are left queued in the chip
+    dev.read_into = lambda nbytes, buf = None: read_into(nbytes - 3, buf)
+    with pytest.raises(Exception, match = "Couldn't read enough bytes"):
+        ftdi.read(PHY, 0x1a)
+    dev.read_into = read_into
+
+    assert ftdi.read(PHY, 0x1a) == 0x1234
+    assert ftdi.read_many([(PHY, 0x1a), (PHY, 0x01)]) == [0x1234, 0xbeef]
+
+
+def test_device_key_of_the_serial(ftdi):
+    assert ftdi.device_key() == ("ftdi", b"FTSIM0")
+    assert Driver.find("ftdi://FTSIM0").device_key() == ftdi.device_key()
@@ -0,0 +1,108 @@
+import pytest
+from mdio_lib import Driver, Interface
+from mdio_lib.driver.mcp2210 import MDIO_FRAME_SIZE, MDIO_XFER_LEN
+from mdio_lib.driver.mcp2210_sim import Mcp2210Sim
+from conftest import PHY
+
+
+@pytest.fixture
+def bus():
+    """
+    an opened mcp2210://sim, a fake://0,sim on every chip select
+    """
+    with Driver.opened("mcp2210://sim") as drv:
+        yield drv
+
+
+def regfile(bus, cs):
+    return bus.hid.target(cs).regfile
+
+
+def test_targets_are_devices_of_their_own(bus):
+    a, b = bus.target(3), bus.target(4)
+    assert a.read(PHY, 0x01) == 0xbeef
+    a.write(PHY, 0x1a, 3)
+    b.write(PHY, 0x1a, 4)
+    assert (a.read(PHY, 0x1a), b.read(PHY, 0x1a)) == (3, 4)
+    assert regfile(bus, 3).read(PHY, 0x1a) == 3
+
+
+def test_targets_share_the_bus(bus):
+    target = bus.target(3)
+    assert target.lock() is bus.lock()
+    assert target.worker() is bus.worker()
+
+
+def test_fields_of_a_target(bus):
+    fpga = Interface.equip(bus.target(3), "mdio", "reg_fields")
+    fpga.config_phyid(PHY)
+    assert fpga.get_chip_ver() == 0xbeef
+    fpga.set_phy1_ipg(20)
+    assert regfile(bus, 3).read(PHY, 0x1a) == 20
+    assert bus.target(3).cached_page(PHY) == 0
+    assert bus.target(4).cached_page(PHY) is None
+
+
+def test_transfer_length(bus):
+    bus.read(PHY, 0x01)
+    assert bus._xfer_cfg == (MDIO_FRAME_SIZE, 0)
+    assert bus.transact([(PHY, 0x01)] * 3) == [0xbeef] * 3
+    assert bus._xfer_cfg == (MDIO_XFER_LEN, 0)
+    # 7 frames of a report and the single one left
+    bus.spi_stats_clean()
+    assert bus.transact([(PHY, 0x01)] * 8) == [0xbeef] * 8
+    assert bus.spi_stats()["transfers"] == 2
+    assert bus._xfer_cfg == (MDIO_FRAME_SIZE, 0)
+
+
+def test_schedule_by_chip_select(bus):
+    bus.store_enable(True)
+    bus.read(PHY, 0x01)
+    t3 = bus.target(3)
+    jobs = [
+        (t3, [(PHY, 0x1a, 3), (PHY, 0x1a)]),
+        (4, [(PHY, 0x1a, 4)]),
+        (0, [(PHY, 0x1a)]),
+        (3, [(PHY, 0x01)]),
+        (4, [(PHY, 0x1a)]),
+    ]
+    switches = bus.cs_switches
+    assert bus.schedule(jobs) == [[3, 3], [4], [12], [0xbeef], [4]]
+    # the current chip select first, then one switch to each other
+    assert bus.cs_switches - switches == 2
+    assert len(bus.store_dump()) == 1 + 6
+
+
+def test_schedule_after_the_stream(bus):
+    t3 = bus.target(3)
+    stream = t3.stream([(PHY, 0x1a, v) for v in range(1, 30)], window = 14)
+    assert next(stream) == 1
+    # after the ops submitted by the stream, before the ones it takes next
+    assert bus.schedule([(t3, [(PHY, 0x1a)])]) == [[14]]
+    assert list(stream) == list(range(2, 30))
+    assert t3.read(PHY, 0x1a) == 29
+
+
+@pytest.mark.parametrize("kw", [dict(busy = 0.3, seed = 1), dict(partial = 8)])
+def test_busy_and_partial_responses(kw):
+    sim = Mcp2210Sim(default_target = lambda: Driver.find("fake://0,sim"), **kw)
+    drv = Driver.find("mcp2210://")
+    drv.hid_factory = lambda: sim
+    drv.open()
+    try:
+        ops = [(PHY, 0x1a, 5), (PHY, 0x1a), (PHY, 0x01)] * 5
+        assert drv.transact(ops) == [5, 5, 0xbeef] * 5
+        s = drv.spi_stats()
+        assert s["busy"] > 0 if "busy" in kw else s["polls"] > 0
+    finally:
+        drv.close()
+        drv.stop_worker()
+
+
+def test_acquire_the_bus_of_the_targets():
+    drv = Driver.acquire("mcp2210://sim")
+    worker = drv.target(3).worker()
+    assert drv.target(3).read(PHY, 0x01) == 0xbeef
+    Driver.release(drv)
+    assert not worker.is_alive()
+    assert drv.hid is None
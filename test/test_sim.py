@@ -0,0 +1,66 @@
+import pytest
+from mdio_lib import Driver
+from mdio_lib.driver.sim import SimFault, SimTarget, Mcp2210Model, FtdiModel
+from conftest import PHY
+
+
+def sim(opts, inner = "fake://0,sim"):
+    return Driver.opened("sim://{}@{}".format(opts, inner))
+
+
+def test_mcp2210_trips_of_seven_ops():
+    with sim("mcp2210") as drv:
+        assert drv.transact([(PHY, 0x01)] * 14) == [0xbeef] * 14
+        s = drv.stats()
+    assert (s["ops"], s["trips"]) == (14, 2)
+    assert s["elapsed"] == pytest.approx(
+        2 * 2 * Mcp2210Model.USB_FRAME + 14 * 64 / Mcp2210Model.MDC)
+
+
+def test_ftdi_trip_of_a_transact():
+    with sim("ftdi,latency=2") as drv:
+        drv.transact([(PHY, 0x01)] * 14)
+        assert (drv.stats()["ops"], drv.stats()["trips"]) == (14, 1)
+        # a short read packet waits for the latency timer
+        assert drv.stats()["elapsed"] > 2e-3
+
+        drv.stats_clean()
+        drv.write(PHY, 0x1a, 3)
+        assert drv.stats()["elapsed"] < FtdiModel.LATENCY
+        assert drv.read(PHY, 0x1a) == 3
+
+
+def test_short_reads_repeat_the_trip():
+    with sim("short=0.5,seed=1") as drv:
+        for i in range(20):
+            assert drv.read(PHY, 0x01) == 0xbeef
+        s = drv.stats()
+    assert s["short"] > 0
+    assert s["trips"] == 20 + s["short"]
+
+
+def test_strict_raises_the_fault():
+    with sim("busy=1,strict") as drv:
+        with pytest.raises(SimFault):
+            drv.write(PHY, 0x1a, 3)
+        assert drv.stats()["busy"] == 1
+
+
+def test_no_driver_to_simulate(capsys):
+    assert Driver.find("sim://mcp2210") is None
+    assert Driver.find("sim://mcp2210@nodrv://") is None
+    assert "URL: sim://opts@url" in capsys.readouterr().out
+
+
+def test_targets_share_the_model():
+    with sim("mcp2210", "mcp2210://sim") as drv:
+        target = drv.target(3)
+        assert isinstance(target, SimTarget)
+        assert target.cs == 3
+        assert target.worker() is drv.worker()
+        assert target.lock() is drv.lock()
+
+        assert target.read(PHY, 0x01) == 0xbeef
+        assert drv.target(4).transact([(PHY, 0x01)] * 8) == [0xbeef] * 8
+        s = drv.stats()
+    assert (s["ops"], s["trips"]) == (9, 3)